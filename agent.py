@@ -1,23 +1,48 @@
 import os
 import json
-from openai import OpenAI
-from tools import TOOLS, execute_tool, get_plants_context
-from deepeval.tracing import observe
-from deepeval.metrics import ToolCorrectnessMetric, ArgumentCorrectnessMetric
+import time
+import threading
+from tools import TOOLS, execute_tool, validate_tool_arguments, run_tool
+from tool_registry import ToolArgumentError
+from fast_replies import render_reply
+from intent_router import intent_router
+from metrics import stage, record_stage, observe_usage, observe_context_tokens
+from prompt_context import build_context
+from sessions import DEFAULT_SESSION_ID, get_session_store
+from response_cache import response_cache
+from conversation_memory import conversation_memory
+from tracing import observe, EVAL_MODE
 
-tool_correctness = ToolCorrectnessMetric()
-argument_correctness = ArgumentCorrectnessMetric()
-EVAL_MODE = os.getenv("DEEPEVAL_EVAL_MODE", "false").lower() == "true"
+_llm_metrics = []
 
-def observe_llm():
-    if EVAL_MODE:
-        return observe(
-            type="llm",
-            metrics=[tool_correctness, argument_correctness]
-        )
-    return observe(type="llm")
+def llm_metrics():
+    """Tool-use metrics attached to model calls in evaluation runs, built on first use"""
+    if not EVAL_MODE:
+        return None
+    if not _llm_metrics:
+        from deepeval.metrics import ToolCorrectnessMetric, ArgumentCorrectnessMetric
+        _llm_metrics.extend([ToolCorrectnessMetric(), ArgumentCorrectnessMetric()])
+    return _llm_metrics
 
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# Point at a local stand-in (see fake_openai.py) for offline load tests
+OPENAI_BASE_URL = os.getenv('SAGE_OPENAI_BASE_URL') or os.getenv('OPENAI_BASE_URL')
+# Replaying a cassette (see cassette.py) needs no key either
+REPLAYING = os.getenv('SAGE_CASSETTE_MODE', 'off').lower() == 'replay'
+OPENAI_API_KEY = os.getenv('OPENAI_API_KEY') or ('sk-local' if OPENAI_BASE_URL or REPLAYING else None)
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """The OpenAI client, created on first use so importing this module stays cheap"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                from cassette import http_client
+                _client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, http_client=http_client())
+    return _client
 
 SYSTEM_PROMPT = """You are Sage, a helpful and friendly plant care assistant. You ONLY help with plant care and plant suggestions. You help users:
 1. Add plants to their collection
@@ -34,7 +59,9 @@ Always respond in natural, friendly language - never return raw data structures
 - When user asks about care schedules or what needs care "today", "this week", etc., ALWAYS use get_care_schedule tool first to get accurate current date and schedule information
 - Pay close attention to the days_until field in care schedule results - negative numbers mean overdue, 0 means due today, 1-7 means due this week
 - Maintain conversation context - remember what was just discussed. If you just asked about setting up a fertilizing schedule and they say "yes", help them set up fertilizing. If they asked about watering, help with watering.
+- When the user adds or schedules several plants at once, use bulk_add_plants or bulk_update_care_schedules in a single call rather than one call per plant
 - The get_care_schedule tool provides current date context and covers both watering and fertilizing schedules
+- When the user says they watered or fertilized plants, record it with complete_care_tasks (one call for all of them) so their schedules move on; use get_care_history for questions about past care
 - Do not suggest to send reminders to users
 
 When suggesting plants, consider:
@@ -46,54 +73,229 @@ When suggesting plants, consider:
 
 Always use the provided tools to add plants, update schedules, check dates, or get watering and fertilising information when needed."""
 
-# Store conversation context
-conversation_context = {
-    "last_added_plant_id": None,
-    "pending_care_setup": False,
-    "pending_care_type": None,
-    "last_plant_name": None,
-    "last_mentioned_plant_id": None,
-    "conversation_history": []
+# Progress text shown to streaming clients while a tool runs
+TOOL_PROGRESS = {
+    "add_plant": "Adding plant…",
+    "update_care_schedule": "Updating care schedule…",
+    "bulk_add_plants": "Adding plants…",
+    "bulk_update_care_schedules": "Updating care schedules…",
+    "get_care_schedule": "Checking care schedule…",
+    "add_to_wishlist": "Adding to wishlist…",
+    "remove_from_wishlist": "Removing from wishlist…",
+    "mark_plant_dead": "Updating your collection…",
+    "complete_care_tasks": "Marking tasks done…",
+    "get_care_history": "Checking care history…"
 }
 
-def run_agent_conversation(user_message, trace_id=None):
-    """Run agent conversation with tool calling and context awareness"""
-    global conversation_context
-    
-    # Add current message to history
-    conversation_context["conversation_history"].append({"role": "user", "content": user_message})
+@observe(type="agent")
+def run_agent_conversation(user_message, trace_id=None, session_id=None, stats=None):
+    """Run agent conversation with tool calling and context awareness
+
+    If `stats` is a dict it is filled with per-turn details such as context_tokens.
+    """
+    session_id = session_id or DEFAULT_SESSION_ID
+    store = get_session_store()
+    with stage("session_load"):
+        conversation_context = store.get(session_id)
+    try:
+        routed = _route_locally(conversation_context, user_message, stats)
+        if routed is not None:
+            return routed
+        cache_key, cached = _cached_reply(conversation_context, user_message, stats)
+        if cached is not None:
+            return cached
+        started = time.perf_counter()
+        response_content, tools_used = _run_turn(conversation_context, user_message, trace_id, stats, session_id)
+        intent_router.record_model_turn((time.perf_counter() - started) * 1000)
+        if cache_key is not None:
+            response_cache.put(cache_key, response_content, tools_used)
+        return response_content, tools_used
+    finally:
+        with stage("session_save"):
+            _save_session(store, session_id, conversation_context)
+
+def stream_agent_conversation(user_message, trace_id=None, session_id=None, stats=None):
+    """Run a conversation turn, yielding (event, data) pairs as tokens and tool calls arrive"""
+    session_id = session_id or DEFAULT_SESSION_ID
+    store = get_session_store()
+    with stage("session_load"):
+        conversation_context = store.get(session_id)
+    try:
+        routed = _route_locally(conversation_context, user_message, stats)
+        if routed is not None:
+            yield "token", routed[0]
+            yield "done", {"tools_used": routed[1] or [], "stats": stats or {}}
+            return
+        cache_key, cached = _cached_reply(conversation_context, user_message, stats)
+        if cached is not None:
+            yield "token", cached[0]
+            yield "done", {"tools_used": cached[1], "stats": stats or {}}
+            return
+        
+        started = time.perf_counter()
+        reply = ""
+        for event, data in _stream_turn(conversation_context, user_message, trace_id, stats, session_id):
+            if event == "token":
+                reply += data
+            elif event == "tool":
+                # Only text streamed after the tools ran is the final reply
+                reply = ""
+            elif event == "done":
+                intent_router.record_model_turn((time.perf_counter() - started) * 1000)
+                if cache_key is not None:
+                    response_cache.put(cache_key, reply, data["tools_used"])
+            yield event, data
+    finally:
+        with stage("session_save"):
+            _save_session(store, session_id, conversation_context)
+
+def _save_session(store, session_id, conversation_context):
+    """Move the turn's messages into conversation memory, then save the rest of the session"""
+    conversation_memory.record_turn(session_id, conversation_context)
+    store.save(session_id, conversation_context)
+
+def _add_to_history(conversation_context, role, content):
+    """Queue a message for conversation memory; without it, the session keeps the recent messages itself"""
+    conversation_context["conversation_history"].append({"role": role, "content": content})
     
     # Keep only last 6 messages (3 exchanges) for context
-    if len(conversation_context["conversation_history"]) > 6:
+    if not conversation_memory.enabled and len(conversation_context["conversation_history"]) > 6:
         conversation_context["conversation_history"] = conversation_context["conversation_history"][-6:]
+
+def _route_locally(conversation_context, user_message, stats=None):
+    """Answer high-confidence lookups without the model; returns (response, tools_used) or None"""
+    with stage("router"):
+        routed = intent_router.route(user_message, execute_tool)
+    if routed is None:
+        return None
+    response_content, tools_used, intent = routed
+    if stats is not None:
+        stats["reply_path"] = "router"
+        stats["intent"] = intent
+    _add_to_history(conversation_context, "user", user_message)
+    _add_to_history(conversation_context, "assistant", response_content)
+    return response_content, tools_used or None
+
+def _cached_reply(conversation_context, user_message, stats=None):
+    """Look the turn up in the response cache; returns (cache key, cached (response, tools_used))"""
+    if not response_cache.enabled:
+        return None, None
+    cache_key = response_cache.key_for(user_message)
+    cached = response_cache.get(cache_key)
+    if stats is not None:
+        stats["response_cache"] = "hit" if cached is not None else "miss"
+    if cached is None:
+        return cache_key, None
+    
+    if stats is not None:
+        stats["reply_path"] = "cache"
+    response_content, tools_used = cached
+    _add_to_history(conversation_context, "user", user_message)
+    _add_to_history(conversation_context, "assistant", response_content)
+    return cache_key, (response_content, list(tools_used))
+
+def _prepare_turn(conversation_context, user_message, trace_id, stats=None, session_id=DEFAULT_SESSION_ID):
+    """Record the user message and build the prompt messages and request headers
+
+    Earlier turns go in as chat messages: the session's summary and recent
+    messages from conversation memory, then this turn's.
+    """
+    _add_to_history(conversation_context, "user", user_message)
     
-    context = get_plants_context()
+    context_str, context_info = build_context(user_message, conversation_context)
+    if context_info["mentioned_plant_ids"]:
+        conversation_context["last_mentioned_plant_id"] = context_info["mentioned_plant_ids"][0]
+    if stats is not None:
+        stats["context_tokens"] = context_info["context_tokens"]
+        stats["context_rows"] = context_info["context_rows"]
+    observe_context_tokens(context_info["context_tokens"])
     
-    context_str = f"User's current plants: {json.dumps(context['plants'], indent=2)}\n"
-    context_str += f"Care schedules: {json.dumps(context['schedules'], indent=2)}\n"
-    context_str += f"Wishlist: {json.dumps(context['wishlist'], indent=2)}\n"
-    context_str += f"Recent conversation: {json.dumps(conversation_context['conversation_history'], indent=2)}"
+    with stage("memory_load"):
+        history, history_tokens = conversation_memory.history(session_id)
+    if stats is not None:
+        stats["history_tokens"] = history_tokens
     
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT + "\n\n" + context_str},
-        {"role": "user", "content": user_message}
-    ]
+    messages = [{"role": "system", "content": SYSTEM_PROMPT + "\n\n" + context_str}]
+    messages.extend(history)
+    # This turn's messages, ending with the user message
+    messages.extend(conversation_context["conversation_history"])
     
     # Add trace_id for OpenAI tracing if provided
     extra_headers = {}
     if trace_id:
         extra_headers["X-Trace-ID"] = trace_id
     
-    @observe_llm()
-    def call_open_ai(messages):
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            tools=TOOLS,
-            extra_headers=extra_headers if extra_headers else None
-        )
-        return response
-    response  = call_open_ai(messages)
+    return messages, extra_headers
+
+def _execute_tool_call(tool_name, raw_arguments):
+    """Parse arguments and run one tool; safe to call from worker threads"""
+    cleaned_arguments = {}
+    started = time.perf_counter()
+    try:
+        # Rejected here, before the tool opens a connection
+        cleaned_arguments = validate_tool_arguments(tool_name, raw_arguments)
+        result = run_tool(tool_name, cleaned_arguments)
+    except ToolArgumentError as e:
+        result = {"error": f"Invalid arguments: {e}"}
+    except Exception as e:
+        result = {"error": f"Tool execution failed: {str(e)}"}
+    record_stage("tool", time.perf_counter() - started, tool_name)
+    return cleaned_arguments, result
+
+def _record_tool_result(conversation_context, tool_call_id, tool_name, cleaned_arguments, result, messages):
+    """Update conversation context from a tool result and append the tool message"""
+    if result.get("success") and cleaned_arguments.get("plant_id"):
+        conversation_context["last_mentioned_plant_id"] = cleaned_arguments["plant_id"]
+    
+    if tool_name == "add_plant" and result.get("success"):
+        conversation_context["last_added_plant_id"] = result.get("plant_id")
+        conversation_context["last_mentioned_plant_id"] = result.get("plant_id")
+        conversation_context["pending_care_setup"] = True
+        conversation_context["last_plant_name"] = cleaned_arguments.get("name")
+    elif tool_name == "bulk_add_plants" and result.get("success"):
+        last = result["plants"][-1]
+        conversation_context["last_added_plant_id"] = last["plant_id"]
+        conversation_context["last_mentioned_plant_id"] = last["plant_id"]
+        conversation_context["pending_care_setup"] = not result.get("schedules_set")
+        conversation_context["last_plant_name"] = last["name"]
+    elif tool_name in ("update_care_schedule", "bulk_update_care_schedules") and result.get("success"):
+        conversation_context["pending_care_setup"] = False
+        conversation_context["pending_care_type"] = None
+    
+    messages.append({
+        "role": "tool",
+        "tool_call_id": tool_call_id,
+        "content": json.dumps(result)
+    })
+
+def _run_tool_call(conversation_context, tool_call_id, tool_name, raw_arguments, messages):
+    """Execute one tool call, update conversation context and append the tool message"""
+    cleaned_arguments, result = _execute_tool_call(tool_name, raw_arguments)
+    _record_tool_result(conversation_context, tool_call_id, tool_name, cleaned_arguments, result, messages)
+    return cleaned_arguments, result
+
+def _template_reply(user_message, outcomes, stats=None):
+    """Templated reply when the tool outcomes need no phrasing by the model, else None"""
+    reply = render_reply(user_message, outcomes)
+    if stats is not None:
+        stats["reply_path"] = "template" if reply is not None else "model"
+    return reply
+
+@observe(type="llm", metrics=llm_metrics)
+def call_open_ai(messages, extra_headers=None):
+    return get_client().chat.completions.create(
+        model="gpt-4o-mini",
+        messages=messages,
+        tools=TOOLS,
+        extra_headers=extra_headers if extra_headers else None
+    )
+
+def _run_turn(conversation_context, user_message, trace_id, stats=None, session_id=DEFAULT_SESSION_ID):
+    messages, extra_headers = _prepare_turn(conversation_context, user_message, trace_id, stats, session_id)
+    
+    with stage("llm_first"):
+        response = call_open_ai(messages, extra_headers)
+    observe_usage("first", response.usage)
 
     assistant_message = response.choices[0].message
     
@@ -102,45 +304,113 @@ def run_agent_conversation(user_message, trace_id=None):
         messages.append(assistant_message)
 
         tools_used = []
+        outcomes = []
         
         for tool_call in assistant_message.tool_calls:
-            tool_name = tool_call.function.name
-            try:
-                arguments = json.loads(tool_call.function.arguments)
-                # Clean up any malformed keys (remove trailing colons)
-                cleaned_arguments = {k.rstrip(':'): v for k, v in arguments.items()}
-                result = execute_tool(tool_name, cleaned_arguments)
-            except Exception as e:
-                result = {"error": f"Tool execution failed: {str(e)}"}
-            
-            # Update conversation context based on tool results
-            if tool_name == "add_plant" and result.get("success"):
-                conversation_context["last_added_plant_id"] = result.get("plant_id")
-                conversation_context["pending_care_setup"] = True
-                conversation_context["last_plant_name"] = cleaned_arguments.get("name")
-            elif tool_name == "update_care_schedule" and result.get("success"):
-                conversation_context["pending_care_setup"] = False
-                conversation_context["pending_care_type"] = None
-            
-            tools_used.append(tool_name)
-            
-            messages.append({
-                "role": "tool",
-                "tool_call_id": tool_call.id,
-                "content": json.dumps(result)
-            })
+            cleaned_arguments, result = _run_tool_call(conversation_context, tool_call.id, tool_call.function.name,
+                                                       tool_call.function.arguments, messages)
+            tools_used.append(tool_call.function.name)
+            outcomes.append((tool_call.function.name, cleaned_arguments, result))
+        
+        response_content = _template_reply(user_message, outcomes, stats)
+        if response_content is not None:
+            _add_to_history(conversation_context, "assistant", response_content)
+            return response_content, tools_used
         
         # Get final response after tool execution
-        final_response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            extra_headers=extra_headers if extra_headers else None
-        )
+        with stage("llm_second"):
+            final_response = get_client().chat.completions.create(
+                model="gpt-4o-mini",
+                messages=messages,
+                extra_headers=extra_headers if extra_headers else None
+            )
+        observe_usage("second", final_response.usage)
         
         response_content = final_response.choices[0].message.content
-        conversation_context["conversation_history"].append({"role": "assistant", "content": response_content})
+        _add_to_history(conversation_context, "assistant", response_content)
         return response_content, tools_used
     
+    if stats is not None:
+        stats["reply_path"] = "direct"
     response_content = assistant_message.content
-    conversation_context["conversation_history"].append({"role": "assistant", "content": response_content})
-    return response_content, None
\ No newline at end of file
+    _add_to_history(conversation_context, "assistant", response_content)
+    return response_content, None
+
+def _stream_completion(messages, extra_headers, tools=None, tool_calls=None, call="first"):
+    """Yield content deltas from a streamed completion, collecting tool call deltas into tool_calls
+
+    Time spent waiting on the API is recorded as the llm_<call> stage; time the
+    consumer holds a token is not.
+    """
+    kwargs = {"tools": tools} if tools else {}
+    waited = 0.0
+    started = time.perf_counter()
+    stream = get_client().chat.completions.create(
+        model="gpt-4o-mini",
+        messages=messages,
+        stream=True,
+        # Without this the API sends no usage block on streams
+        stream_options={"include_usage": True},
+        extra_headers=extra_headers if extra_headers else None,
+        **kwargs
+    )
+    for chunk in stream:
+        if getattr(chunk, "usage", None) is not None:
+            observe_usage(call, chunk.usage)
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            waited += time.perf_counter() - started
+            yield delta.content
+            started = time.perf_counter()
+        for tool_delta in delta.tool_calls or []:
+            # Tool call ids and names arrive once; arguments arrive in pieces
+            while len(tool_calls) <= tool_delta.index:
+                tool_calls.append({"id": None, "type": "function", "function": {"name": "", "arguments": ""}})
+            tool_call = tool_calls[tool_delta.index]
+            if tool_delta.id:
+                tool_call["id"] = tool_delta.id
+            if tool_delta.function and tool_delta.function.name:
+                tool_call["function"]["name"] += tool_delta.function.name
+            if tool_delta.function and tool_delta.function.arguments:
+                tool_call["function"]["arguments"] += tool_delta.function.arguments
+    record_stage(f"llm_{call}", waited + time.perf_counter() - started)
+
+def _stream_turn(conversation_context, user_message, trace_id, stats=None, session_id=DEFAULT_SESSION_ID):
+    messages, extra_headers = _prepare_turn(conversation_context, user_message, trace_id, stats, session_id)
+    
+    tool_calls = []
+    content = ""
+    for token in _stream_completion(messages, extra_headers, tools=TOOLS, tool_calls=tool_calls):
+        content += token
+        yield "token", token
+    
+    tools_used = None
+    if tool_calls:
+        messages.append({"role": "assistant", "content": content or None, "tool_calls": tool_calls})
+        tools_used = []
+        outcomes = []
+        
+        for tool_call in tool_calls:
+            tool_name = tool_call["function"]["name"]
+            yield "tool", {"name": tool_name, "status": TOOL_PROGRESS.get(tool_name, "Working…")}
+            cleaned_arguments, result = _run_tool_call(conversation_context, tool_call["id"], tool_name,
+                                                       tool_call["function"]["arguments"], messages)
+            tools_used.append(tool_name)
+            outcomes.append((tool_name, cleaned_arguments, result))
+        
+        content = _template_reply(user_message, outcomes, stats)
+        if content is not None:
+            yield "token", content
+        else:
+            # Stream the final response after tool execution
+            content = ""
+            for token in _stream_completion(messages, extra_headers, call="second"):
+                content += token
+                yield "token", token
+    elif stats is not None:
+        stats["reply_path"] = "direct"
+    
+    _add_to_history(conversation_context, "assistant", content)
+    yield "done", {"tools_used": tools_used or [], "stats": stats or {}}
@@ -0,0 +1,121 @@
+import os
+import time
+import asyncio
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from tools import TOOLS
+from sessions import DEFAULT_SESSION_ID, get_session_store
+from response_cache import response_cache
+from agent import (OPENAI_API_KEY, OPENAI_BASE_URL, llm_metrics, _prepare_turn, _execute_tool_call,
+                   _record_tool_result, _add_to_history, _cached_reply, _template_reply, _route_locally,
+                   _save_session)
+from intent_router import intent_router
+from tracing import observe
+from metrics import stage, observe_usage
+
+# SQLite work (context load, tools, session store) runs here so the event loop never blocks on it
+DB_THREADS = int(os.getenv("SAGE_DB_THREADS", "8"))
+db_executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix="sage-db")
+
+_async_client = None
+
+def get_async_client():
+    """The AsyncOpenAI client, created on first use"""
+    global _async_client
+    if _async_client is None:
+        from openai import AsyncOpenAI
+        from cassette import async_http_client
+        _async_client = AsyncOpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, http_client=async_http_client())
+    return _async_client
+
+async def run_in_db_thread(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    # Carry the caller's context so stage and query timings land in this request's breakdown
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(db_executor, functools.partial(context.run, func, *args, **kwargs))
+
+@observe(type="agent")
+async def run_agent_conversation_async(user_message, trace_id=None, session_id=None, stats=None):
+    """Async counterpart of agent.run_agent_conversation; tool calls from one reply run concurrently"""
+    session_id = session_id or DEFAULT_SESSION_ID
+    store = get_session_store()
+    with stage("session_load"):
+        conversation_context = await run_in_db_thread(store.get, session_id)
+    try:
+        routed = await run_in_db_thread(_route_locally, conversation_context, user_message, stats)
+        if routed is not None:
+            return routed
+        cache_key, cached = await run_in_db_thread(_cached_reply, conversation_context, user_message, stats)
+        if cached is not None:
+            return cached
+        started = time.perf_counter()
+        response_content, tools_used = await _run_turn_async(conversation_context, user_message, trace_id, stats,
+                                                               session_id)
+        intent_router.record_model_turn((time.perf_counter() - started) * 1000)
+        if cache_key is not None:
+            response_cache.put(cache_key, response_content, tools_used)
+        return response_content, tools_used
+    finally:
+        with stage("session_save"):
+            await run_in_db_thread(_save_session, store, session_id, conversation_context)
+
+@observe(type="llm", metrics=llm_metrics)
+async def call_open_ai_async(messages, extra_headers=None):
+    return await get_async_client().chat.completions.create(
+        model="gpt-4o-mini",
+        messages=messages,
+        tools=TOOLS,
+        extra_headers=extra_headers if extra_headers else None
+    )
+
+async def _run_turn_async(conversation_context, user_message, trace_id, stats=None, session_id=DEFAULT_SESSION_ID):
+    messages, extra_headers = await run_in_db_thread(_prepare_turn, conversation_context, user_message,
+                                                     trace_id, stats, session_id)
+
+    with stage("llm_first"):
+        response = await call_open_ai_async(messages, extra_headers)
+    observe_usage("first", response.usage)
+
+    assistant_message = response.choices[0].message
+
+    if assistant_message.tool_calls:
+        messages.append(assistant_message)
+
+        # Calls in one assistant message can't depend on each other's results, so run them together
+        results = await asyncio.gather(*(
+            run_in_db_thread(_execute_tool_call, tool_call.function.name, tool_call.function.arguments)
+            for tool_call in assistant_message.tool_calls
+        ))
+
+        # Apply results in call order so context updates match the blocking engine
+        tools_used = []
+        outcomes = []
+        for tool_call, (cleaned_arguments, result) in zip(assistant_message.tool_calls, results):
+            _record_tool_result(conversation_context, tool_call.id, tool_call.function.name,
+                                cleaned_arguments, result, messages)
+            tools_used.append(tool_call.function.name)
+            outcomes.append((tool_call.function.name, cleaned_arguments, result))
+
+        response_content = _template_reply(user_message, outcomes, stats)
+        if response_content is not None:
+            _add_to_history(conversation_context, "assistant", response_content)
+            return response_content, tools_used
+
+        with stage("llm_second"):
+            final_response = await get_async_client().chat.completions.create(
+                model="gpt-4o-mini",
+                messages=messages,
+                extra_headers=extra_headers if extra_headers else None
+            )
+        observe_usage("second", final_response.usage)
+
+        response_content = final_response.choices[0].message.content
+        _add_to_history(conversation_context, "assistant", response_content)
+        return response_content, tools_used
+
+    if stats is not None:
+        stats["reply_path"] = "direct"
+    response_content = assistant_message.content
+    _add_to_history(conversation_context, "assistant", response_content)
+    return response_content, None
@@ -1,14 +1,24 @@
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, Response, request, g, jsonify, render_template_string, stream_with_context
+import json
+import time
 import uuid
 from dotenv import load_dotenv
 load_dotenv()
 
-from database import init_db, get_db
-from agent import run_agent_conversation
-from datetime import datetime, timedelta
+from database import ensure_initialized, get_db, get_data_stamp, pool_stats, current_db_path
+from sessions import get_session_store
+from conversation_memory import conversation_memory
+from agent import run_agent_conversation, stream_agent_conversation
+from schedule_engine import query_care_schedule
+from tools import tool_stats, execute_tool
+from tracing import tracing_stats
+from intent_router import intent_router
+from payload_cache import payload_cache
+import metrics
+from datetime import datetime, timezone
+import clock
 
 app = Flask(__name__)
-init_db()
 
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -35,10 +45,12 @@ HTML_TEMPLATE = """
         .schedule-item.due-today { border-left-color: #FF5722; }
         .task-info { font-weight: bold; color: #2d5a27; font-size: 14px; }
         .plant-info { color: #666; font-size: 12px; }
+        .done-button { float: right; padding: 2px 10px; font-size: 12px; }
         .wishlist-item { background: #fff3e0; border-radius: 8px; padding: 8px; margin: 5px 0; border-left: 4px solid #FF9800; }
         .wishlist-name { font-weight: bold; color: #e65100; font-size: 14px; }
         .wishlist-notes { color: #666; font-size: 12px; }
         .section { margin-bottom: 20px; }
+        .tool-status { color: #555; font-size: 12px; font-style: italic; }
     </style>
 </head>
 <body>
@@ -70,6 +82,23 @@ HTML_TEMPLATE = """
     </div>
 
     <script>
+        function formatResponse(text) {
+            return text
+                .replace(/\\*\\*(.*?)\\*\\*/g, '<strong>$1</strong>')
+                .replace(/\\*(.*?)\\*/g, '<em>$1</em>')
+                .replace(/\\n/g, '<br>');
+        }
+        
+        function addAssistantMessage(html) {
+            var chat = document.getElementById('chat');
+            var bubble = document.createElement('div');
+            bubble.className = 'message assistant';
+            bubble.innerHTML = html;
+            chat.appendChild(bubble);
+            chat.scrollTop = chat.scrollHeight;
+            return bubble;
+        }
+        
         function sendMessage() {
             var input = document.getElementById('message');
             var message = input.value.trim();
@@ -80,6 +109,14 @@ HTML_TEMPLATE = """
             input.value = '';
             chat.scrollTop = chat.scrollHeight;
             
+            if (window.ReadableStream && window.TextDecoder) {
+                streamMessage(message);
+            } else {
+                sendMessageJson(message);
+            }
+        }
+        
+        function sendMessageJson(message) {
             fetch('/chat', {
                 method: 'POST',
                 headers: {'Content-Type': 'application/json'},
@@ -87,27 +124,115 @@ HTML_TEMPLATE = """
             })
             .then(function(response) { return response.json(); })
             .then(function(data) {
-                var formattedResponse = data.response
-                    .replace(/\\*\\*(.*?)\\*\\*/g, '<strong>$1</strong>')
-                    .replace(/\\*(.*?)\\*/g, '<em>$1</em>')
-                    .replace(/\\n/g, '<br>');
-                chat.innerHTML += '<div class="message assistant">' + formattedResponse + '</div>';
-                chat.scrollTop = chat.scrollHeight;
+                addAssistantMessage(formatResponse(data.response));
                 loadSchedule();
                 loadWishlist();
             })
             .catch(function(error) {
-                chat.innerHTML += '<div class="message assistant">Error: Could not send message.</div>';
+                addAssistantMessage('Error: Could not send message.');
             });
         }
         
-        function loadSchedule() {
-            fetch('/api/schedule')
-            .then(function(response) { 
-                if (!response.ok) throw new Error('Schedule API failed');
-                return response.json(); 
+        function streamMessage(message) {
+            var chat = document.getElementById('chat');
+            var bubble = addAssistantMessage('<div class="tool-status">Thinking…</div>');
+            var text = '';
+            var status = 'Thinking…';
+            var received = false;
+            
+            function render() {
+                var html = status ? '<div class="tool-status">' + status + '</div>' : '';
+                bubble.innerHTML = html + formatResponse(text);
+                chat.scrollTop = chat.scrollHeight;
+            }
+            
+            function handleEvent(event, data) {
+                received = true;
+                if (event === 'token') {
+                    text += data;
+                    status = '';
+                } else if (event === 'tool') {
+                    status = data.status;
+                } else if (event === 'error') {
+                    text += 'Error: ' + data.message;
+                    status = '';
+                } else if (event === 'done') {
+                    status = '';
+                    loadSchedule();
+                    loadWishlist();
+                }
+                render();
+            }
+            
+            fetch('/chat/stream', {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({message: message})
             })
+            .then(function(response) {
+                if (!response.ok || !response.body) throw new Error('Stream failed');
+                var reader = response.body.getReader();
+                var decoder = new TextDecoder();
+                var buffer = '';
+                
+                function pump() {
+                    return reader.read().then(function(result) {
+                        if (result.done) return;
+                        buffer += decoder.decode(result.value, {stream: true});
+                        // Server-Sent Events are separated by a blank line
+                        var events = buffer.split('\\n\\n');
+                        buffer = events.pop();
+                        for (var i = 0; i < events.length; i++) {
+                            var event = 'message';
+                            var data = '';
+                            var lines = events[i].split('\\n');
+                            for (var j = 0; j < lines.length; j++) {
+                                if (lines[j].indexOf('event: ') === 0) event = lines[j].slice(7);
+                                else if (lines[j].indexOf('data: ') === 0) data += lines[j].slice(6);
+                            }
+                            if (data) handleEvent(event, JSON.parse(data));
+                        }
+                        return pump();
+                    });
+                }
+                return pump();
+            })
+            .catch(function(error) {
+                if (!received) {
+                    // Nothing streamed yet, so retry on the plain JSON endpoint
+                    chat.removeChild(bubble);
+                    sendMessageJson(message);
+                } else {
+                    text += '<br>Error: Connection interrupted.';
+                    status = '';
+                    render();
+                }
+            });
+        }
+        
+        // Last ETag seen per URL; a 304 means the sidebar already shows that data
+        var etags = {};
+        
+        function fetchIfChanged(url) {
+            var headers = {};
+            if (etags[url]) headers['If-None-Match'] = etags[url];
+            return fetch(url, {headers: headers, cache: 'no-store'})
+            .then(function(response) {
+                if (response.status === 304) return null;
+                if (!response.ok) throw new Error(url + ' failed');
+                etags[url] = response.headers.get('ETag');
+                return response.json();
+            })
+            .catch(function(error) {
+                delete etags[url];
+                throw error;
+            });
+        }
+        
+        function loadSchedule() {
+            fetchIfChanged('/api/schedule')
             .then(function(data) {
+                if (data === null) return;
                 var container = document.getElementById('schedule-container');
                 if (data.length === 0) {
                     container.innerHTML = '<p>No care schedules set.</p>';
@@ -131,6 +256,9 @@ HTML_TEMPLATE = """
                     var icon = item.task_type === 'watering' ? '💧' : '🌱';
                     
                     html += '<div class="schedule-item ' + statusClass + '">';
+                    if (item.days_until <= 0) {
+                        html += '<button class="done-button" onclick="completeTask(' + item.plant_id + ', \\'' + item.task_type + '\\')">Done</button>';
+                    }
                     html += '<div class="task-info">' + icon + ' ' + item.plant_name + '</div>';
                     html += '<div class="plant-info">' + item.task_type + ' - ' + statusText + '</div>';
                     html += '</div>';
@@ -143,13 +271,22 @@ HTML_TEMPLATE = """
             });
         }
         
-        function loadWishlist() {
-            fetch('/api/wishlist')
-            .then(function(response) { 
-                if (!response.ok) throw new Error('Wishlist API failed');
-                return response.json(); 
+        function completeTask(plantId, taskType) {
+            fetch('/api/care/complete', {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({tasks: [{plant_id: plantId, task_type: taskType}]})
             })
+            .then(function() { loadSchedule(); })
+            .catch(function(error) {
+                console.error('Complete task error:', error);
+            });
+        }
+        
+        function loadWishlist() {
+            fetchIfChanged('/api/wishlist')
             .then(function(data) {
+                if (data === null) return;
                 var container = document.getElementById('wishlist-container');
                 if (data.length === 0) {
                     container.innerHTML = '<p>No plants in wishlist.</p>';
@@ -199,84 +336,244 @@ def sage_icon():
     from flask import send_file
     return send_file('sage.svg', mimetype='image/svg+xml')
 
+SESSION_COOKIE = 'sage_session'
+SESSION_HEADER = 'X-Session-ID'
+
+def get_session_id():
+    """Session id from the header or cookie; a new one is minted if neither is set"""
+    session_id = request.headers.get(SESSION_HEADER) or request.cookies.get(SESSION_COOKIE)
+    return session_id or uuid.uuid4().hex
+
+def with_session_cookie(response, session_id):
+    if request.cookies.get(SESSION_COOKIE) != session_id:
+        response.set_cookie(SESSION_COOKIE, session_id, httponly=True, samesite='Lax')
+    return response
+
 @app.route('/chat', methods=['POST'])
 def chat():
     data = request.json
     user_message = data['message']
     trace_id = str(uuid.uuid4())
+    session_id = get_session_id()
     
     try:
-        response, tools_used = run_agent_conversation(user_message, trace_id)
-        return jsonify({'response': response, 'tools_used': tools_used or []})
+        stats = {}
+        response, tools_used = run_agent_conversation(user_message, trace_id, session_id, stats)
+        stats['timings_ms'] = metrics.current_breakdown()
+        return with_session_cookie(jsonify({'response': response, 'tools_used': tools_used or [], 'stats': stats}),
+                                   session_id)
     except Exception as e:
-        return jsonify({'response': f'Error: {str(e)}'})
+        return with_session_cookie(jsonify({'response': f'Error: {str(e)}'}), session_id)
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    data = request.json
+    user_message = data['message']
+    trace_id = str(uuid.uuid4())
+    session_id = get_session_id()
+    
+    def generate():
+        try:
+            for event, payload in stream_agent_conversation(user_message, trace_id, session_id, {}):
+                yield sse_event(event, payload)
+        except Exception as e:
+            yield sse_event('error', {'message': str(e)})
+            yield sse_event('done', {'tools_used': []})
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return with_session_cookie(response, session_id)
+
+# Hard cap on one page of /api/schedule
+MAX_SCHEDULE_LIMIT = 1000
+
+def _int_arg(name, default=None, minimum=0, maximum=None):
+    value = request.args.get(name)
+    if value in (None, ''):
+        return default
+    value = int(value)
+    if value < minimum or (maximum is not None and value > maximum):
+        raise ValueError(f"{name} must be between {minimum} and {maximum if maximum is not None else 'any'}")
+    return value
+
+def conditional_json(etag, last_modified, build):
+    """JSON response validated by `etag`; 304 without calling build() when the client is current
+
+    build() returns (payload, extra headers) and runs at most once per URL and ETag.
+    """
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
+    else:
+        not_modified = request.if_modified_since is not None and last_modified <= request.if_modified_since
+
+    if not_modified:
+        payload_cache.count_not_modified()
+        response = Response(status=304)
+    else:
+        def serialize():
+            payload, headers = build()
+            return json.dumps(payload).encode('utf-8'), headers
+        # Data versions count per database, so the same ETag can belong to two databases
+        key = (current_db_path(), request.path, request.query_string)
+        body, headers = payload_cache.get_or_build(key, etag, serialize)
+        response = Response(body, mimetype='application/json', headers=headers)
+
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # Let browsers keep the body but always revalidate it
+    response.cache_control.no_cache = True
+    return response
 
 @app.route('/api/schedule', methods=['GET'])
 def get_schedule():
     try:
-        conn = get_db()
-        
-        count = conn.execute('SELECT COUNT(*) FROM care_schedules').fetchone()[0]
-        
-        if count == 0:
-            conn.close()
-            return jsonify([])
-        
-        query = """
-        SELECT p.name as plant_name, cs.task_type, cs.frequency_days, cs.last_completed
-        FROM plants p
-        JOIN care_schedules cs ON p.id = cs.plant_id
-        WHERE (p.status = 'alive' OR p.status IS NULL) AND cs.task_type = 'watering'
-        ORDER BY cs.last_completed ASC
-        """
-        
-        results = conn.execute(query).fetchall()
-        conn.close()
-        
-        schedule_data = []
-        current_date = datetime.now()
-        
-        for row in results:
-            try:
-                last_completed = datetime.fromisoformat(row[3])
-                next_due = last_completed + timedelta(days=row[2])
-                days_until = (next_due - current_date).days
-                
-                schedule_data.append({
-                    'plant_name': row[0],
-                    'task_type': row[1],
-                    'frequency_days': row[2],
-                    'last_completed': row[3],
-                    'days_until': days_until
-                })
-            except Exception:
-                continue
-        
-        return jsonify(schedule_data)
-        
+        filters = {
+            'within_days': _int_arg('within_days'),
+            'task_type': request.args.get('task_type') or None,
+            'location': request.args.get('location') or None,
+            'status': request.args.get('status') or None,
+            'limit': _int_arg('limit', MAX_SCHEDULE_LIMIT, minimum=1, maximum=MAX_SCHEDULE_LIMIT),
+            'offset': _int_arg('offset', 0),
+        }
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    def build():
+        rows, has_more = query_care_schedule(today=today, **filters)
+        schedule_data = [{
+            'plant_id': row['plant_id'],
+            'plant_name': row['plant_name'],
+            'task_type': row['task_type'],
+            'frequency_days': row['frequency_days'],
+            'last_completed': row['last_completed'],
+            'next_due_date': row['next_due_date'],
+            'days_until': row['days_until'],
+        } for row in rows]
+        headers = {}
+        if has_more:
+            headers['X-Next-Offset'] = str(filters['offset'] + len(schedule_data))
+        return schedule_data, headers
+
+    try:
+        version, modified_at = get_data_stamp()
+        # days_until changes at midnight even when the data doesn't
+        today = clock.today()
+        midnight = datetime.combine(today, datetime.min.time()).timestamp()
+        last_modified = datetime.fromtimestamp(max(modified_at, midnight), timezone.utc)
+        return conditional_json(f'{version}-{today.isoformat()}', last_modified, build)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/wishlist', methods=['GET'])
 def get_wishlist():
-    try:
+    def build():
         conn = get_db()
-        
-        count = conn.execute('SELECT COUNT(*) FROM wishlist').fetchone()[0]
-        
-        if count == 0:
+        try:
+            wishlist = conn.execute('SELECT * FROM wishlist ORDER BY created_at DESC').fetchall()
+        finally:
             conn.close()
-            return jsonify([])
-            
-        wishlist = conn.execute('SELECT * FROM wishlist ORDER BY created_at DESC').fetchall()
-        conn.close()
-        
-        result = [dict(w) for w in wishlist]
-        return jsonify(result)
-        
+        return [dict(w) for w in wishlist], {}
+
+    try:
+        version, modified_at = get_data_stamp()
+        return conditional_json(str(version), datetime.fromtimestamp(modified_at, timezone.utc), build)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/care/complete', methods=['POST'])
+def complete_care():
+    """Mark care tasks done: {"tasks": [{"plant_id": 1, "task_type": "watering"}, ...]}"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object with a tasks list'}), 400
+    try:
+        result = execute_tool('complete_care_tasks', data)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    return jsonify(result), 200 if result.get('success') else 400
+
+@app.route('/api/care/history', methods=['GET'])
+def get_care_history():
+    try:
+        arguments = {
+            'plant_id': _int_arg('plant_id', minimum=1),
+            'task_type': request.args.get('task_type') or None,
+            'recent': _int_arg('recent', 5, maximum=50),
+        }
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    def build():
+        result = execute_tool('get_care_history', arguments)
+        if 'error' in result:
+            raise ValueError(result['error'])
+        return result['care_history'], {}
+
+    try:
+        version, modified_at = get_data_stamp()
+        return conditional_json(str(version), datetime.fromtimestamp(modified_at, timezone.utc), build)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/db/stats', methods=['GET'])
+def get_db_stats():
+    return jsonify(pool_stats())
+
+@app.route('/api/sessions/stats', methods=['GET'])
+def get_session_stats():
+    return jsonify(get_session_store().stats())
+
+@app.route('/api/memory/stats', methods=['GET'])
+def get_memory_stats():
+    return jsonify(conversation_memory.stats())
+
+@app.route('/api/tools/stats', methods=['GET'])
+def get_tool_stats():
+    return jsonify(tool_stats())
+
+@app.route('/api/router/stats', methods=['GET'])
+def get_router_stats():
+    return jsonify(intent_router.stats())
+
+@app.route('/api/traces/stats', methods=['GET'])
+def get_trace_stats():
+    return jsonify(tracing_stats())
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# Migrations run before the first request rather than at import, so workers start fast
+@app.before_request
+def initialize_database():
+    ensure_initialized()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    metrics.begin_breakdown()
+
+@app.after_request
+def observe_request_latency(response):
+    started = g.get('request_started')
+    if started is not None:
+        # Route patterns, not raw paths, keep label cardinality bounded
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe_request(route, request.method, response.status_code, time.perf_counter() - started)
+    return response
+
+@app.teardown_request
+def end_request_breakdown(exc):
+    metrics.end_breakdown()
+
 if __name__ == '__main__':
     print("Starting Sage Plant Care AI at http://localhost:5001")
     app.run(debug=True, port=5001)
\ No newline at end of file
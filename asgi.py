@@ -0,0 +1,155 @@
+"""ASGI entry point, e.g. `uvicorn asgi:app --workers 4`
+
+POST /chat runs on the asyncio agent engine so one process can hold many
+in-flight conversations. Every other route is served by the Flask app on a
+worker thread, streaming its response body as it is produced.
+"""
+import sys
+import json
+import time
+import uuid
+import asyncio
+from io import BytesIO
+from http.cookies import SimpleCookie
+from concurrent.futures import ThreadPoolExecutor
+from app import app as flask_app, SESSION_COOKIE, SESSION_HEADER
+from agent_async import run_agent_conversation_async, run_in_db_thread, db_executor
+from database import close_pool, ensure_initialized, is_initialized
+import metrics
+
+wsgi_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="sage-wsgi")
+
+_DONE = object()
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    body = await _read_body(receive)
+    if scope["path"] == "/chat" and scope["method"] == "POST":
+        # Servers without lifespan support initialise on the first chat instead, off the event loop
+        if not is_initialized():
+            await run_in_db_thread(ensure_initialized)
+        await _chat(scope, body, send)
+    else:
+        await _call_flask(scope, body, send)
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await asyncio.get_running_loop().run_in_executor(db_executor, ensure_initialized)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            db_executor.shutdown(wait=False)
+            wsgi_executor.shutdown(wait=False)
+            close_pool()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def _read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+def _headers(scope):
+    return {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+
+async def _chat(scope, body, send):
+    headers = _headers(scope)
+    cookies = SimpleCookie(headers.get("cookie", ""))
+    cookie_session = cookies[SESSION_COOKIE].value if SESSION_COOKIE in cookies else None
+    session_id = headers.get(SESSION_HEADER.lower()) or cookie_session or uuid.uuid4().hex
+    started = time.perf_counter()
+    metrics.begin_breakdown()
+
+    try:
+        user_message = json.loads(body)["message"]
+        stats = {}
+        response, tools_used = await run_agent_conversation_async(user_message, str(uuid.uuid4()), session_id, stats)
+        stats["timings_ms"] = metrics.current_breakdown()
+        payload = {"response": response, "tools_used": tools_used or [], "stats": stats}
+    except Exception as e:
+        payload = {"response": f"Error: {str(e)}"}
+    metrics.observe_request("/chat", "POST", 200, time.perf_counter() - started)
+    metrics.end_breakdown()
+
+    response_headers = [(b"content-type", b"application/json")]
+    if cookie_session != session_id:
+        cookie = f"{SESSION_COOKIE}={session_id}; HttpOnly; Path=/; SameSite=Lax"
+        response_headers.append((b"set-cookie", cookie.encode("latin-1")))
+    await send({"type": "http.response.start", "status": 200, "headers": response_headers})
+    await send({"type": "http.response.body", "body": json.dumps(payload).encode("utf-8")})
+
+def _wsgi_environ(scope, body):
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"],
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": (scope.get("client") or ("", 0))[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name == "CONTENT_TYPE" or name == "CONTENT_LENGTH":
+            environ[name] = value
+        else:
+            key = "HTTP_" + name
+            environ[key] = environ[key] + "," + value if key in environ else value
+    return environ
+
+async def _call_flask(scope, body, send):
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    response_start = {}
+
+    def start_response(status, headers, exc_info=None):
+        response_start["status"] = int(status.split(" ", 1)[0])
+        response_start["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+        return lambda data: loop.call_soon_threadsafe(queue.put_nowait, data)
+
+    def run():
+        # The whole WSGI call stays on one thread so Flask's request context is pushed and popped there
+        try:
+            result = flask_app(_wsgi_environ(scope, body), start_response)
+            try:
+                for chunk in result:
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk)
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+
+    future = loop.run_in_executor(wsgi_executor, run)
+    started = False
+    while True:
+        chunk = await queue.get()
+        if not started:
+            await send({"type": "http.response.start", "status": response_start.get("status", 500),
+                        "headers": response_start.get("headers", [])})
+            started = True
+        if chunk is _DONE:
+            break
+        if chunk:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+    await future
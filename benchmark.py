@@ -0,0 +1,200 @@
+"""Scale benchmarks for the agent tools and the schedule route
+
+Times each tool against synthetic collections of increasing size, tracks
+memory, flags paths that grow faster than linearly and compares against a
+saved baseline:
+
+    python benchmark.py --sizes 1000,10000,100000 --save-baseline bench_baseline.json
+    python benchmark.py --sizes 1000,10000,100000 --baseline bench_baseline.json
+"""
+import os
+import gc
+import sys
+import json
+import math
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+from itertools import count
+from statistics import median
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-local")
+
+from database import set_db_path, close_pool
+from synthetic_data import generate
+import tools
+import prompt_context
+import schedule_engine
+from payload_cache import payload_cache
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+# Exponent of time vs size above which a path is reported as superlinear
+SUPERLINEAR_EXPONENT = 1.2
+
+def _clear_caches():
+    tools.clear_context_cache()
+    prompt_context.clear_index_cache()
+    schedule_engine.clear_schedule_index()
+
+def _get_uncached(client, path):
+    """Time the query and serialization, not the payload cache"""
+    payload_cache.clear()
+    return client.get(path)
+
+def make_cases(size):
+    """(name, callable) pairs; each callable runs one operation"""
+    names = count()
+    plant_ids = count(1)
+
+    def wishlist_roundtrip():
+        name = f"Benchmark Plant {next(names)}"
+        tools.add_to_wishlist_tool(name)
+        tools.remove_from_wishlist_tool(name=name.upper())
+
+    def update_schedule():
+        tools.update_care_schedule_tool((next(plant_ids) * 7919) % size + 1, watering_days=5, fertilizing_days=30)
+
+    def plants_context_cold():
+        _clear_caches()
+        tools.get_plants_context()
+
+    def prompt_context_warm():
+        prompt_context.build_context("how is my monstera doing?", {})
+
+    return [
+        ("get_care_schedule_tool", tools.get_care_schedule_tool),
+        ("add_remove_wishlist", wishlist_roundtrip),
+        ("update_care_schedule_tool", update_schedule),
+        ("get_plants_context_cold", plants_context_cold),
+        ("get_plants_context_warm", tools.get_plants_context),
+        ("build_prompt_context", prompt_context_warm),
+    ]
+
+def time_case(func, repeat, min_time):
+    """Median and min milliseconds over at least `repeat` runs and `min_time` seconds"""
+    func()  # warm up connections and caches
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < repeat or time.perf_counter() - started < min_time:
+        gc.disable()
+        t0 = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - t0) * 1000)
+        gc.enable()
+        if len(timings) >= repeat * 20:
+            break
+    return {"median_ms": median(timings), "min_ms": min(timings), "runs": len(timings)}
+
+def peak_memory_kb(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+def dataset_path(data_dir, size, seed):
+    return os.path.join(data_dir, f"sage_bench_{size}_{seed}.db")
+
+def run(sizes, data_dir, repeat=5, min_time=0.2, seed=0, include_route=True, log=print):
+    results = {}
+    client = None
+    os.makedirs(data_dir, exist_ok=True)
+
+    for size in sizes:
+        path = dataset_path(data_dir, size, seed)
+        if not os.path.exists(path):
+            log(f"Generating {size} plants -> {path}")
+            generate(path, plants=size, seed=seed)
+        # Work on a scratch copy so write benchmarks don't grow the cached dataset
+        scratch = path + ".run"
+        shutil.copyfile(path, scratch)
+        set_db_path(scratch)
+        _clear_caches()
+        if include_route and client is None:
+            # Imported only when the route is timed, so --no-route runs never load Flask
+            from app import app
+            client = app.test_client()
+
+        cases = make_cases(size)
+        if client is not None:
+            cases.append(("GET /api/schedule", lambda: _get_uncached(client, "/api/schedule")))
+            cases.append(("GET /api/schedule cached", lambda: client.get("/api/schedule")))
+
+        results[size] = {}
+        for name, func in cases:
+            stats = time_case(func, repeat, min_time)
+            stats["peak_kb"] = peak_memory_kb(func)
+            results[size][name] = stats
+            log(f"  {size:>9} {name:<28} median {stats['median_ms']:>10.2f} ms  peak {stats['peak_kb']:>10.0f} KB")
+
+        close_pool()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(scratch + suffix):
+                os.remove(scratch + suffix)
+    return results
+
+def scaling(results):
+    """Per-case exponent k in time ~ size^k between consecutive sizes"""
+    sizes = sorted(results)
+    report = {}
+    for name in results[sizes[0]]:
+        exponents = []
+        for small, large in zip(sizes, sizes[1:]):
+            t_small, t_large = results[small][name]["median_ms"], results[large][name]["median_ms"]
+            if t_small > 0 and t_large > 0:
+                exponents.append(math.log(t_large / t_small) / math.log(large / small))
+        if exponents:
+            report[name] = {"exponents": exponents, "superlinear": max(exponents) > SUPERLINEAR_EXPONENT}
+    return report
+
+def compare(results, baseline, tolerance):
+    """Cases whose median got slower than baseline by more than `tolerance`"""
+    regressions = []
+    for size, cases in results.items():
+        for name, stats in cases.items():
+            old = baseline.get(str(size), {}).get(name)
+            if old and stats["median_ms"] > old["median_ms"] * (1 + tolerance):
+                regressions.append((size, name, old["median_ms"], stats["median_ms"]))
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Sage tools across collection sizes")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="comma separated plant counts, e.g. 1000,10000,100000,1000000")
+    parser.add_argument("--data-dir", default=tempfile.gettempdir(), help="where generated datasets are cached")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds per case")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-route", action="store_true", help="skip the Flask /api/schedule case")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--save-baseline", help="write results as a baseline JSON file")
+    parser.add_argument("--baseline", help="compare against this baseline JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = run(sizes, args.data_dir, args.repeat, args.min_time, args.seed, not args.no_route)
+
+    scale = scaling(results) if len(sizes) > 1 else {}
+    for name, info in scale.items():
+        exponents = ", ".join(f"{e:.2f}" for e in info["exponents"])
+        flag = "  <- superlinear" if info["superlinear"] else ""
+        print(f"{name:<28} scaling exponents {exponents}{flag}")
+
+    output = {str(size): cases for size, cases in results.items()}
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(output, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for size, name, old, new in regressions:
+            print(f"REGRESSION {name} @ {size}: {old:.2f} ms -> {new:.2f} ms", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,197 @@
+"""Record and replay of the agent's OpenAI calls
+
+Sits under the OpenAI clients as an httpx transport, so blocking, streaming and
+async calls are all covered:
+
+    SAGE_CASSETTE_MODE=record SAGE_CASSETTE=cassettes/eval.jsonl python evaluation.py
+    SAGE_CASSETTE_MODE=replay SAGE_CASSETTE=cassettes/eval.jsonl python evaluation.py
+
+Each request is keyed by a hash of its normalized JSON body. Replay never
+touches the network; a request that was not recorded (usually because the
+prompt, context or tool schemas changed) fails with a 404 saying what differs.
+"""
+import os
+import json
+import hashlib
+import threading
+import httpx
+
+# off, record (call the API and save every exchange) or replay (serve saved exchanges only)
+CASSETTE_MODE = os.getenv("SAGE_CASSETTE_MODE", "off").lower()
+CASSETTE_PATH = os.getenv("SAGE_CASSETTE", "cassettes/sage.jsonl")
+
+REPLAYING = CASSETTE_MODE == "replay"
+
+def normalize_request(body):
+    """Canonical JSON of a request body, so key order and whitespace don't change the key"""
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        return (body or b"").decode("utf-8", "replace")
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+def request_key(method, path, body):
+    normalized = normalize_request(body)
+    return hashlib.sha256(f"{method} {path}\n{normalized}".encode("utf-8")).hexdigest()[:32]
+
+def _last_user_message(payload):
+    for message in reversed(payload.get("messages") or []):
+        if message.get("role") == "user":
+            return message.get("content") or ""
+    return ""
+
+def _describe_difference(payload, recorded):
+    """Which parts of a request differ from the nearest recorded one"""
+    differences = [key for key in sorted(set(payload) | set(recorded)) if key != "messages"
+                   and payload.get(key) != recorded.get(key)]
+    messages, recorded_messages = payload.get("messages") or [], recorded.get("messages") or []
+    if len(messages) != len(recorded_messages):
+        differences.append(f"messages (count {len(messages)} vs {len(recorded_messages)})")
+    else:
+        differences.extend(f"messages[{i}] ({message.get('role')})"
+                           for i, (message, old) in enumerate(zip(messages, recorded_messages)) if message != old)
+    return ", ".join(differences) or "nothing visible (request keys changed)"
+
+class Cassette:
+    """Saved exchanges in a JSONL file, loaded once and appended to while recording"""
+
+    def __init__(self, path=CASSETTE_PATH, mode=CASSETTE_MODE):
+        self.path = path
+        self.mode = mode
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "recorded": 0}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]] = entry
+
+    def lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            self._stats["hits" if entry is not None else "misses"] += 1
+        return entry
+
+    def record(self, key, method, path, body, status, content_type, content):
+        entry = {
+            "key": key,
+            "method": method,
+            "path": path,
+            "request": json.loads(normalize_request(body)) if body else {},
+            "status": status,
+            "content_type": content_type,
+            "body": content.decode("utf-8"),
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._stats["recorded"] += 1
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def explain_miss(self, body):
+        """Human-readable reason a request has no recording"""
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            return "request body is not JSON"
+        user_message = _last_user_message(payload)
+        with self._lock:
+            nearest = [entry["request"] for entry in self._entries.values()
+                       if _last_user_message(entry["request"]) == user_message]
+        if not nearest:
+            return f"no recording for user message {user_message[:80]!r}"
+        # Compare against the same call of the turn (first or after tools) where possible
+        count = len(payload.get("messages") or [])
+        nearest.sort(key=lambda recorded: len(recorded.get("messages") or []) == count)
+        return f"recorded request for {user_message[:80]!r} differs in {_describe_difference(payload, nearest[-1])}"
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        stats.update(mode=self.mode, path=self.path)
+        return stats
+
+    def replay_response(self, request):
+        key = request_key(request.method, request.url.path, request.content)
+        entry = self.lookup(key)
+        if entry is not None:
+            return httpx.Response(entry["status"], headers={"content-type": entry["content_type"]},
+                                  content=entry["body"].encode("utf-8"), request=request)
+        # 404 so the client raises at once instead of retrying
+        message = (f"Cassette miss in {self.path}: {self.explain_miss(request.content)}. "
+                   f"Re-record with SAGE_CASSETTE_MODE=record.")
+        return httpx.Response(404, json={"error": {"message": message, "type": "cassette_miss", "code": key}},
+                              request=request)
+
+    def record_response(self, request, response):
+        content = response.content
+        # Errors and rate limits are not worth replaying
+        if response.status_code < 400:
+            self.record(request_key(request.method, request.url.path, request.content), request.method,
+                        request.url.path, request.content, response.status_code,
+                        response.headers.get("content-type", "application/json"), content)
+        return httpx.Response(response.status_code, headers={"content-type": response.headers.get(
+            "content-type", "application/json")}, content=content, request=request)
+
+class CassetteTransport(httpx.BaseTransport):
+    def __init__(self, cassette, transport=None):
+        self.cassette = cassette
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request):
+        if self.cassette.mode == "replay":
+            return self.cassette.replay_response(request)
+        response = self.transport.handle_request(request)
+        try:
+            response.read()
+        finally:
+            response.close()
+        return self.cassette.record_response(request, response)
+
+class AsyncCassetteTransport(httpx.AsyncBaseTransport):
+    def __init__(self, cassette, transport=None):
+        self.cassette = cassette
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request):
+        if self.cassette.mode == "replay":
+            return self.cassette.replay_response(request)
+        response = await self.transport.handle_async_request(request)
+        try:
+            await response.aread()
+        finally:
+            await response.aclose()
+        return self.cassette.record_response(request, response)
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+def get_cassette():
+    """The process-wide cassette, or None when SAGE_CASSETTE_MODE is off"""
+    global _cassette
+    if CASSETTE_MODE not in ("record", "replay"):
+        return None
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette()
+    return _cassette
+
+def http_client():
+    """httpx client for OpenAI(http_client=...), or None to use the default"""
+    cassette = get_cassette()
+    return httpx.Client(transport=CassetteTransport(cassette)) if cassette else None
+
+def async_http_client():
+    """httpx client for AsyncOpenAI(http_client=...), or None to use the default"""
+    cassette = get_cassette()
+    return httpx.AsyncClient(transport=AsyncCassetteTransport(cassette)) if cassette else None
+
+def cassette_stats():
+    cassette = get_cassette()
+    return cassette.stats() if cassette else {"mode": "off"}
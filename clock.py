@@ -0,0 +1,17 @@
+"""The date and time that due dates, schedules and new rows are computed from
+
+SAGE_TODAY pins them to an ISO date (midnight) or date and time, so recorded
+evaluation runs send the same prompts and tool results on any day they are
+replayed. Unset, they follow the system clock.
+"""
+import os
+from datetime import datetime
+
+_PINNED = os.getenv("SAGE_TODAY")
+PINNED_NOW = datetime.fromisoformat(_PINNED) if _PINNED else None
+
+def now():
+    return PINNED_NOW or datetime.now()
+
+def today():
+    return now().date()
@@ -0,0 +1,249 @@
+"""Per-session conversation history in SQLite with a rolling summary
+
+Every message is kept in the conversation_messages table. The model is sent
+the session's summary plus the messages the summary does not cover yet, as
+chat messages, newest within a token budget. Once the uncovered messages pass
+SAGE_MEMORY_COMPACT_TOKENS, a background thread (the turn itself, while a
+cassette records or replays) folds all but the most recent
+SAGE_MEMORY_RECENT_TOKENS of them into the summary, so the history sent with
+a turn stays the same size however long the conversation runs. Summaries are
+stored, so each message is summarised once.
+"""
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from database import get_db, transaction, current_db_path, use_db
+from metrics import stage, observe_usage
+from prompt_context import estimate_tokens
+from sessions import SESSION_TTL_SECONDS
+
+MEMORY_ENABLED = os.getenv("SAGE_MEMORY", "true").lower() == "true"
+# Newest messages kept word for word when older ones are summarised
+MEMORY_RECENT_TOKENS = int(os.getenv("SAGE_MEMORY_RECENT_TOKENS", "800"))
+# Uncovered messages allowed before a compaction is scheduled; also the most history sent with a turn
+MEMORY_COMPACT_TOKENS = int(os.getenv("SAGE_MEMORY_COMPACT_TOKENS", "1600"))
+MEMORY_SUMMARY_TOKENS = int(os.getenv("SAGE_MEMORY_SUMMARY_TOKENS", "300"))
+MEMORY_TTL_SECONDS = int(os.getenv("SAGE_MEMORY_TTL_SECONDS", str(SESSION_TTL_SECONDS)))
+# Under a cassette, compaction runs in line so every run sends each turn the same history
+BACKGROUND_COMPACTION = os.getenv("SAGE_CASSETTE_MODE", "off").lower() not in ("record", "replay")
+
+# Messages read per turn, whatever their size
+RECENT_MESSAGE_LIMIT = 100
+
+SUMMARY_PROMPT = """You maintain the memory of Sage, a plant care assistant. Update the summary of the conversation with the new messages. Keep plant names, locations, care schedules, the user's preferences and anything still unresolved; drop greetings and small talk. Write plain sentences, at most {words} words."""
+
+def _model_summary(summary, messages):
+    """Fold `messages` into `summary` with the chat model"""
+    from agent import get_client
+    transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+    response = get_client().chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": SUMMARY_PROMPT.format(words=MEMORY_SUMMARY_TOKENS * 3 // 4)},
+            {"role": "user", "content": f"Summary so far: {summary or '(none)'}\n\nNew messages:\n{transcript}"}
+        ],
+        max_tokens=MEMORY_SUMMARY_TOKENS
+    )
+    observe_usage("summary", response.usage)
+    return (response.choices[0].message.content or "").strip()
+
+def _extractive_summary(summary, messages):
+    """Fallback when the model is unavailable: the user's own words, newest kept when over budget"""
+    lines = [summary] if summary else []
+    lines.extend(f"User said: {message['content'][:200]}" for message in messages if message["role"] == "user")
+    text = "\n".join(lines)
+    limit = MEMORY_SUMMARY_TOKENS * 4
+    return text[-limit:] if len(text) > limit else text
+
+class ConversationMemory:
+    # Pruning is a table scan, so only do it every so many turns
+    PRUNE_EVERY = 200
+
+    def __init__(self, enabled=MEMORY_ENABLED, recent_tokens=MEMORY_RECENT_TOKENS,
+                 compact_tokens=MEMORY_COMPACT_TOKENS, ttl_seconds=MEMORY_TTL_SECONDS,
+                 summarize=_model_summary, background=BACKGROUND_COMPACTION):
+        self.enabled = enabled
+        self.recent_tokens = recent_tokens
+        self.compact_tokens = compact_tokens
+        self.ttl_seconds = ttl_seconds
+        self.summarize = summarize
+        self.background = background
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sage-memory")
+        # (db path, session_id) with a compaction queued or running
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._turns = 0
+        self._stats = {"messages": 0, "compactions": 0, "compaction_ms": 0.0, "fallbacks": 0,
+                       "failures": 0, "expired": 0}
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _unsummarized(self, conn, session_id, limit=RECENT_MESSAGE_LIMIT):
+        """(summary, covered_through, uncovered messages newest first)"""
+        row = conn.execute('SELECT summary, covered_through FROM conversation_summaries WHERE session_id = ?',
+                           (session_id,)).fetchone()
+        summary, covered_through = (row[0], row[1]) if row else ("", 0)
+        rows = conn.execute(
+            '''SELECT id, role, content, tokens FROM conversation_messages
+               WHERE session_id = ? AND id > ? ORDER BY id DESC LIMIT ?''',
+            (session_id, covered_through, limit)
+        ).fetchall()
+        return summary, covered_through, [dict(row) for row in rows]
+
+    @staticmethod
+    def _newest_within(messages, budget):
+        """How many of `messages` (newest first) fit in `budget` tokens; at least one"""
+        used = 0
+        for count, message in enumerate(messages):
+            used += message["tokens"]
+            if used > budget and count:
+                return count
+        return len(messages)
+
+    def history(self, session_id):
+        """Chat messages carrying the session's earlier conversation, oldest first, and their token count"""
+        if not self.enabled:
+            return [], 0
+        conn = get_db()
+        try:
+            summary, _, messages = self._unsummarized(conn, session_id)
+        finally:
+            conn.close()
+        # Normally every uncovered message fits; the cap only bites while a compaction is behind
+        messages = messages[:self._newest_within(messages, self.compact_tokens)]
+        history = [{"role": message["role"], "content": message["content"]} for message in reversed(messages)]
+        tokens = sum(message["tokens"] for message in messages)
+        if summary:
+            history.insert(0, {"role": "system", "content": f"Summary of the earlier conversation: {summary}"})
+            tokens += estimate_tokens(summary)
+        return history, tokens
+
+    def record_turn(self, session_id, conversation_context):
+        """Move the turn's messages from the session context into the table and compact if due"""
+        messages = conversation_context["conversation_history"]
+        if not self.enabled or not messages:
+            return
+        now = time.time()
+        with transaction() as conn:
+            conn.executemany(
+                '''INSERT INTO conversation_messages (session_id, role, content, tokens, created_at)
+                   VALUES (?, ?, ?, ?, ?)''',
+                [(session_id, message["role"], message["content"] or "", estimate_tokens(message["content"] or ""),
+                  now) for message in messages]
+            )
+            uncovered = conn.execute(
+                '''SELECT COALESCE(SUM(tokens), 0) FROM conversation_messages
+                   WHERE session_id = ? AND id > COALESCE(
+                       (SELECT covered_through FROM conversation_summaries WHERE session_id = ?), 0)''',
+                (session_id, session_id)
+            ).fetchone()[0]
+        conversation_context["conversation_history"] = []
+        with self._lock:
+            self._stats["messages"] += len(messages)
+            self._turns += 1
+            prune = self._turns % self.PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+        if uncovered > self.compact_tokens:
+            if self.background:
+                self.schedule_compaction(session_id)
+            else:
+                self._compact_queued((current_db_path(), session_id))
+
+    def schedule_compaction(self, session_id):
+        """Queue a compaction for the session on the memory thread; returns its future, or None if one is queued"""
+        key = (current_db_path(), session_id)
+        with self._lock:
+            if key in self._pending:
+                return None
+            self._pending.add(key)
+        return self._executor.submit(self._compact_queued, key)
+
+    def _compact_queued(self, key):
+        path, session_id = key
+        try:
+            with use_db(path):
+                self.compact(session_id)
+        except Exception:
+            self._count("failures")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def compact(self, session_id):
+        """Fold all but the most recent messages into the summary; returns True if the summary changed"""
+        conn = get_db()
+        try:
+            summary, covered_through, messages = self._unsummarized(conn, session_id, limit=-1)
+        finally:
+            conn.close()
+        keep = self._newest_within(messages, self.recent_tokens)
+        folded = list(reversed(messages[keep:]))
+        if not folded:
+            return False
+        started = time.perf_counter()
+        with stage("memory_compaction"):
+            try:
+                new_summary = self.summarize(summary, folded)
+            except Exception:
+                new_summary = None
+            if not new_summary:
+                self._count("fallbacks")
+                new_summary = _extractive_summary(summary, folded)
+        with transaction() as conn:
+            # Another process may have compacted this session meanwhile
+            row = conn.execute('SELECT covered_through FROM conversation_summaries WHERE session_id = ?',
+                               (session_id,)).fetchone()
+            if (row[0] if row else 0) != covered_through:
+                return False
+            conn.execute(
+                '''INSERT INTO conversation_summaries (session_id, summary, covered_through, updated_at)
+                   VALUES (?, ?, ?, ?)
+                   ON CONFLICT (session_id) DO UPDATE SET summary = excluded.summary,
+                       covered_through = excluded.covered_through, updated_at = excluded.updated_at''',
+                (session_id, new_summary, folded[-1]["id"], time.time())
+            )
+        self._count("compactions")
+        self._count("compaction_ms", (time.perf_counter() - started) * 1000)
+        return True
+
+    def prune(self):
+        """Drop the messages and summary of every session idle for longer than the TTL
+
+        A session is pruned whole, by its newest message, so a long-running
+        conversation keeps the messages its summary does not cover yet.
+        """
+        cutoff = time.time() - self.ttl_seconds
+        with transaction() as conn:
+            stale = conn.execute(
+                '''SELECT session_id FROM conversation_messages
+                   WHERE session_id IN (SELECT DISTINCT session_id FROM conversation_messages WHERE created_at < ?)
+                   GROUP BY session_id HAVING MAX(created_at) < ?''',
+                (cutoff, cutoff)
+            ).fetchall()
+            expired = 0
+            for (session_id,) in stale:
+                expired += conn.execute('DELETE FROM conversation_messages WHERE session_id = ?',
+                                        (session_id,)).rowcount
+                conn.execute('DELETE FROM conversation_summaries WHERE session_id = ?', (session_id,))
+        self._count("expired", expired)
+
+    def clear(self, session_id):
+        with transaction() as conn:
+            conn.execute('DELETE FROM conversation_messages WHERE session_id = ?', (session_id,))
+            conn.execute('DELETE FROM conversation_summaries WHERE session_id = ?', (session_id,))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["compactions_pending"] = len(self._pending)
+        stats["avg_compaction_ms"] = round(stats["compaction_ms"] / stats["compactions"], 1) if stats["compactions"] else 0.0
+        stats["compaction_ms"] = round(stats["compaction_ms"], 1)
+        stats.update(enabled=self.enabled, background=self.background, recent_tokens=self.recent_tokens, compact_tokens=self.compact_tokens,
+                     ttl_seconds=self.ttl_seconds)
+        return stats
+
+conversation_memory = ConversationMemory()
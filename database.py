@@ -1,37 +1,443 @@
 import sqlite3
+import queue
+import threading
+import time
+import contextvars
+from contextlib import contextmanager
 from datetime import datetime
+from metrics import METRICS_ENABLED, observe_query
+
+DB_PATH = 'plants.db'
+
+# Idle connections kept open per pool; extra connections are closed on release
+POOL_SIZE = 8
+BUSY_TIMEOUT_SECONDS = 5.0
+
+PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA cache_size = -16000',
+    'PRAGMA mmap_size = 268435456',
+    'PRAGMA temp_store = MEMORY',
+)
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() hands it back to the pool"""
+
+    pool = None
+
+    # sqlite3 steps a statement once inside execute(), so this is time to the first row
+    def execute(self, sql, *args):
+        if not METRICS_ENABLED:
+            return super().execute(sql, *args)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, *args)
+        finally:
+            observe_query(sql, time.perf_counter() - started)
+
+    def executemany(self, sql, *args):
+        if not METRICS_ENABLED:
+            return super().executemany(sql, *args)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, *args)
+        finally:
+            observe_query(sql, time.perf_counter() - started)
+
+    def close(self):
+        if self.pool is None:
+            super().close()
+        else:
+            self.pool.release(self)
+
+    def really_close(self):
+        super().close()
+
+class ConnectionPool:
+    """Long-lived, WAL-mode connections shared across requests"""
+
+    def __init__(self, path, size=POOL_SIZE, timeout=BUSY_TIMEOUT_SECONDS):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._checked_out = set()
+        # Set by close_all(); connections still checked out are closed when they come back
+        self.closed = False
+        self._stats = {
+            "created": 0,
+            "reused": 0,
+            "released": 0,
+            "discarded": 0,
+            "rollbacks_on_release": 0,
+            "peak_in_use": 0,
+        }
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout,
+                               check_same_thread=False, factory=PooledConnection)
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        conn.pool = self
+        return conn
+
+    def acquire(self):
+        try:
+            conn = self._idle.get_nowait()
+            reused = True
+        except queue.Empty:
+            conn = self._connect()
+            reused = False
+        with self._lock:
+            self._stats["reused" if reused else "created"] += 1
+            self._checked_out.add(id(conn))
+            self._stats["peak_in_use"] = max(self._stats["peak_in_use"], len(self._checked_out))
+        return conn
+
+    def release(self, conn):
+        with self._lock:
+            if id(conn) not in self._checked_out:
+                return
+            self._checked_out.discard(id(conn))
+            self._stats["released"] += 1
+            if conn.in_transaction:
+                self._stats["rollbacks_on_release"] += 1
+        if conn.in_transaction:
+            conn.rollback()
+        # Decided under the lock so close_all() can't drain the queue between the check and the put
+        with self._lock:
+            kept = not self.closed and self._idle.qsize() < self.size
+            if kept:
+                self._idle.put(conn)
+            else:
+                self._stats["discarded"] += 1
+        if not kept:
+            conn.really_close()
+
+    def close_all(self):
+        """Close idle connections now and checked-out ones as they are released"""
+        with self._lock:
+            self.closed = True
+        while True:
+            try:
+                self._idle.get_nowait().really_close()
+            except queue.Empty:
+                break
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_use"] = len(self._checked_out)
+        stats["idle"] = self._idle.qsize()
+        stats["size"] = self.size
+        stats["path"] = self.path
+        stats["closed"] = self.closed
+        return stats
+
+# database path -> pool
+_pools = {}
+_pool_lock = threading.Lock()
+
+# Per-thread/task override of DB_PATH, set by use_db()
+_db_path = contextvars.ContextVar("sage_db_path", default=None)
+
+def current_db_path():
+    """Database file get_db() opens in this context"""
+    return _db_path.get() or DB_PATH
+
+@contextmanager
+def use_db(path):
+    """Point get_db() at `path` for the enclosed block in this thread or task only
+
+    Lets several databases (e.g. one clone per evaluation case) be used at once;
+    the async engine's DB threads inherit the override.
+    """
+    token = _db_path.set(path)
+    try:
+        yield path
+    finally:
+        _db_path.reset(token)
+
+def get_pool(path=None):
+    path = path or current_db_path()
+    pool = _pools.get(path)
+    if pool is None:
+        with _pool_lock:
+            pool = _pools.get(path)
+            if pool is None:
+                pool = _pools[path] = ConnectionPool(path)
+    return pool
+
+def _create_base_tables(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS plants
+                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                     name TEXT NOT NULL,
+                     species TEXT,
+                     location TEXT,
+                     notes TEXT,
+                     status TEXT DEFAULT 'alive',
+                     created_at TEXT)''')
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS care_schedules
+                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                     plant_id INTEGER,
+                     task_type TEXT,
+                     frequency_days INTEGER,
+                     last_completed TEXT,
+                     FOREIGN KEY (plant_id) REFERENCES plants(id))''')
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS wishlist
+                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                     name TEXT NOT NULL,
+                     notes TEXT,
+                     created_at TEXT)''')
+
+def _add_scientific_name(conn):
+    # Older databases were created with this column; bring new ones in line
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(plants)')]
+    if 'scientific_name' not in columns:
+        conn.execute('ALTER TABLE plants ADD COLUMN scientific_name TEXT')
+
+def _add_hot_path_indexes(conn):
+    # Keep the newest row per (plant, task) so the unique index can be built
+    conn.execute('''DELETE FROM care_schedules WHERE id NOT IN
+                    (SELECT MAX(id) FROM care_schedules GROUP BY plant_id, task_type)''')
+    conn.execute('''CREATE UNIQUE INDEX IF NOT EXISTS idx_care_schedules_plant_task
+                    ON care_schedules (plant_id, task_type)''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_plants_status ON plants (status)')
+    # Matches the LOWER(name) = LOWER(?) lookups in the wishlist tools
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_wishlist_name_lower ON wishlist (LOWER(name))')
+
+def _create_sessions_table(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS sessions
+                    (session_id TEXT PRIMARY KEY,
+                     data TEXT NOT NULL,
+                     updated_at REAL NOT NULL)''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions (updated_at)')
+
+def _create_meta_table(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS meta
+                    (key TEXT PRIMARY KEY,
+                     value INTEGER NOT NULL)''')
+    conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('data_version', 0)")
+
+def _add_next_due(conn):
+    # Stored so "what's due" queries can range-scan an index instead of
+    # computing dates for every row; triggers keep it in step with writes
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(care_schedules)')]
+    if 'next_due' not in columns:
+        conn.execute('ALTER TABLE care_schedules ADD COLUMN next_due TEXT')
+    conn.execute('''UPDATE care_schedules
+                    SET next_due = date(last_completed, '+' || frequency_days || ' days')''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS care_schedules_next_due_insert
+                    AFTER INSERT ON care_schedules
+                    BEGIN
+                        UPDATE care_schedules
+                        SET next_due = date(NEW.last_completed, '+' || NEW.frequency_days || ' days')
+                        WHERE id = NEW.id;
+                    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS care_schedules_next_due_update
+                    AFTER UPDATE OF last_completed, frequency_days ON care_schedules
+                    BEGIN
+                        UPDATE care_schedules
+                        SET next_due = date(NEW.last_completed, '+' || NEW.frequency_days || ' days')
+                        WHERE id = NEW.id;
+                    END''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_care_schedules_next_due ON care_schedules (next_due)')
+
+def _add_data_modified_at(conn):
+    # Unix time of the last data version bump, for HTTP Last-Modified headers
+    conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('data_modified_at', CAST(strftime('%s', 'now') AS INTEGER))")
+
+def _create_conversation_memory_tables(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS conversation_messages
+                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                     session_id TEXT NOT NULL,
+                     role TEXT NOT NULL,
+                     content TEXT NOT NULL,
+                     tokens INTEGER NOT NULL,
+                     created_at REAL NOT NULL)''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_conversation_messages_session ON conversation_messages (session_id, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_conversation_messages_created_at ON conversation_messages (created_at)')
+    # One rolling summary per session covering its messages up to covered_through
+    conn.execute('''CREATE TABLE IF NOT EXISTS conversation_summaries
+                    (session_id TEXT PRIMARY KEY,
+                     summary TEXT NOT NULL,
+                     covered_through INTEGER NOT NULL,
+                     updated_at REAL NOT NULL)''')
+
+def _create_care_events(conn):
+    # Append-only log of completed care tasks
+    conn.execute('''CREATE TABLE IF NOT EXISTS care_events
+                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                     plant_id INTEGER NOT NULL,
+                     task_type TEXT NOT NULL,
+                     completed_at TEXT NOT NULL,
+                     created_at TEXT NOT NULL,
+                     FOREIGN KEY (plant_id) REFERENCES plants(id))''')
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_care_events_plant_task
+                    ON care_events (plant_id, task_type, completed_at)''')
+    for action in ('UPDATE', 'DELETE'):
+        conn.execute(f'''CREATE TRIGGER IF NOT EXISTS care_events_no_{action.lower()}
+                         BEFORE {action} ON care_events
+                         BEGIN
+                             SELECT RAISE(ABORT, 'care_events is append-only');
+                         END''')
+    # Per (plant, task) totals kept in step with the log, so history reads never scan it.
+    # A completion extends the streak when it lands by the due date the previous one set.
+    conn.execute('''CREATE TABLE IF NOT EXISTS care_rollups
+                    (plant_id INTEGER NOT NULL,
+                     task_type TEXT NOT NULL,
+                     completions INTEGER NOT NULL,
+                     first_completed TEXT NOT NULL,
+                     last_completed TEXT NOT NULL,
+                     current_streak INTEGER NOT NULL,
+                     longest_streak INTEGER NOT NULL,
+                     PRIMARY KEY (plant_id, task_type))''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS care_events_rollup
+                    AFTER INSERT ON care_events
+                    BEGIN
+                        INSERT INTO care_rollups (plant_id, task_type, completions, first_completed,
+                                                  last_completed, current_streak, longest_streak)
+                        VALUES (NEW.plant_id, NEW.task_type, 1, NEW.completed_at, NEW.completed_at, 1, 1)
+                        ON CONFLICT (plant_id, task_type) DO UPDATE SET
+                            completions = completions + 1,
+                            first_completed = MIN(first_completed, excluded.first_completed),
+                            last_completed = MAX(last_completed, excluded.last_completed),
+                            -- Back-dated completions count, but don't change streaks
+                            current_streak = CASE
+                                WHEN excluded.last_completed < last_completed THEN current_streak
+                                WHEN date(excluded.last_completed) <= date(last_completed, '+' || COALESCE(
+                                    (SELECT frequency_days FROM care_schedules
+                                     WHERE plant_id = NEW.plant_id AND task_type = NEW.task_type), 0) || ' days')
+                                THEN current_streak + 1
+                                ELSE 1 END;
+                        UPDATE care_rollups SET longest_streak = MAX(longest_streak, current_streak)
+                        WHERE plant_id = NEW.plant_id AND task_type = NEW.task_type;
+                        UPDATE care_schedules SET last_completed = NEW.completed_at
+                        WHERE plant_id = NEW.plant_id AND task_type = NEW.task_type
+                          AND (last_completed IS NULL OR last_completed < NEW.completed_at);
+                    END''')
+
+# (version, description, migration) - append only, never reorder
+MIGRATIONS = [
+    (1, "base tables", _create_base_tables),
+    (2, "plants.scientific_name column", _add_scientific_name),
+    (3, "care schedule, plant status and wishlist name indexes", _add_hot_path_indexes),
+    (4, "agent sessions table", _create_sessions_table),
+    (5, "meta table with data_version counter", _create_meta_table),
+    (6, "care_schedules.next_due column, triggers and index", _add_next_due),
+    (7, "meta data_modified_at timestamp", _add_data_modified_at),
+    (8, "conversation messages and summaries tables", _create_conversation_memory_tables),
+    (9, "care_events log, care_rollups table and their triggers", _create_care_events),
+]
+
+def schema_version(conn=None):
+    if conn is not None:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+    conn = get_db()
+    try:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+    finally:
+        conn.close()
+
+def migrate():
+    """Apply pending migrations in order and record the schema version"""
+    applied = []
+    if schema_version() >= MIGRATIONS[-1][0]:
+        return applied
+    for version, description, migration in MIGRATIONS:
+        with transaction() as conn:
+            # Re-check under the write lock in case another process got here first
+            if schema_version(conn) >= version:
+                continue
+            migration(conn)
+            conn.execute(f'PRAGMA user_version = {int(version)}')
+            applied.append((version, description))
+    return applied
 
 def init_db():
-    conn = sqlite3.connect('plants.db')
-    c = conn.cursor()
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS plants
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  name TEXT NOT NULL,
-                  species TEXT,
-                  location TEXT,
-                  notes TEXT,
-                  status TEXT DEFAULT 'alive',
-                  created_at TEXT)''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS care_schedules
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  plant_id INTEGER,
-                  task_type TEXT,
-                  frequency_days INTEGER,
-                  last_completed TEXT,
-                  FOREIGN KEY (plant_id) REFERENCES plants(id))''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS wishlist
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  name TEXT NOT NULL,
-                  notes TEXT,
-                  created_at TEXT)''')
-    
-    conn.commit()
-    conn.close()
-
-def get_db():
-    conn = sqlite3.connect('plants.db')
-    conn.row_factory = sqlite3.Row
-    return conn
\ No newline at end of file
+    return migrate()
+
+# Database paths already migrated by this process
+_initialized = set()
+_init_lock = threading.Lock()
+
+def is_initialized(path=None):
+    return (path or current_db_path()) in _initialized
+
+def ensure_initialized():
+    """Run init_db() for the current database once per process; a set lookup after that"""
+    path = current_db_path()
+    if path in _initialized:
+        return
+    with _init_lock:
+        if path not in _initialized:
+            init_db()
+            _initialized.add(path)
+
+def get_db(path=None):
+    """Borrow a pooled connection (to `path`, or the current database); call close() to return it"""
+    return get_pool(path).acquire()
+
+@contextmanager
+def transaction():
+    """Run a write transaction, taking the write lock up front"""
+    conn = get_db()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def bump_data_version(conn):
+    """Advance the data version inside the caller's write transaction; returns the new version"""
+    conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'data_version'")
+    conn.execute("UPDATE meta SET value = CAST(strftime('%s', 'now') AS INTEGER) WHERE key = 'data_modified_at'")
+    return conn.execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()[0]
+
+def get_data_version(conn=None):
+    """Monotonic counter bumped by every write to plants, schedules or wishlist"""
+    if conn is not None:
+        return conn.execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()[0]
+    conn = get_db()
+    try:
+        return conn.execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()[0]
+    finally:
+        conn.close()
+
+def get_data_stamp():
+    """(data version, unix time it was reached) read together"""
+    conn = get_db()
+    try:
+        rows = dict(conn.execute("SELECT key, value FROM meta WHERE key IN ('data_version', 'data_modified_at')").fetchall())
+    finally:
+        conn.close()
+    return rows['data_version'], rows.get('data_modified_at', 0)
+
+def pool_stats():
+    return get_pool().stats()
+
+def set_db_path(path):
+    """Point get_db() at another database file (benchmarks, load tests)"""
+    global DB_PATH
+    close_pool()
+    DB_PATH = path
+
+def close_pool(path=None):
+    """Close the idle connections of one database's pool, or of every pool when `path` is None
+
+    Used at shutdown, before swapping files and when an evaluation clone is done.
+    """
+    with _pool_lock:
+        pools = list(_pools.values()) if path is None else [_pools[path]] if path in _pools else []
+        for pool in pools:
+            pool.close_all()
+            del _pools[pool.path]
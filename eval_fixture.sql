@@ -0,0 +1,42 @@
+-- The collection every evaluation case starts from (evaluation.py --db overrides it).
+-- Dates are fixed; evaluation.py pins SAGE_TODAY to match, so prompts don't change from day to day.
+
+INSERT INTO plants (id, name, species, scientific_name, location, notes, created_at, status) VALUES (1, 'jasmine', 'arabian jasmine', 'jasminum sambac', 'balcony', 'Dead', '2025-12-14T23:24:08.125769', 'dead');
+INSERT INTO plants (id, name, species, scientific_name, location, notes, created_at, status) VALUES (2, 'Begonia', '', '', 'outdoor', '', '2025-12-14T23:34:01.963461', 'alive');
+INSERT INTO plants (id, name, species, scientific_name, location, notes, created_at, status) VALUES (3, 'petunias', '', 'Petunia', 'outdoor, sunny side', '', '2025-12-15T22:46:53.353341', 'alive');
+INSERT INTO plants (id, name, species, scientific_name, location, notes, created_at, status) VALUES (4, 'parsley', NULL, NULL, NULL, NULL, '2025-12-16T00:39:26.689881', 'dead');
+INSERT INTO plants (id, name, species, scientific_name, location, notes, created_at, status) VALUES (5, 'basil', NULL, NULL, NULL, NULL, '2025-12-16T13:08:04.181693', 'dead');
+INSERT INTO plants (id, name, species, scientific_name, location, notes, created_at, status) VALUES (6, 'mint', NULL, NULL, NULL, NULL, '2025-12-16T13:08:04.183395', 'dead');
+INSERT INTO plants (id, name, species, scientific_name, location, notes, created_at, status) VALUES (7, 'dragronsap', NULL, NULL, 'balcony, sunny side', NULL, '2025-12-16T13:29:05.535279', 'alive');
+INSERT INTO plants (id, name, species, scientific_name, location, notes, created_at, status) VALUES (8, 'calathea', NULL, NULL, 'kitchen', NULL, '2025-12-16T13:48:14.989372', 'alive');
+INSERT INTO plants (id, name, species, scientific_name, location, notes, created_at, status) VALUES (9, 'Thyme', NULL, NULL, NULL, 'Looking to grow my own herbs!', '2025-12-16T13:50:17.899053', 'dead');
+INSERT INTO plants (id, name, species, scientific_name, location, notes, created_at, status) VALUES (26, 'Pothos', 'Epipremnum aureum', NULL, 'indoor', NULL, '2025-12-16T20:05:04.745989', 'alive');
+INSERT INTO plants (id, name, species, scientific_name, location, notes, created_at, status) VALUES (27, 'lemon dwarf', NULL, NULL, NULL, NULL, '2025-12-17T00:05:50.515405', 'alive');
+INSERT INTO plants (id, name, species, scientific_name, location, notes, created_at, status) VALUES (28, 'coriander', 'Coriandrum sativum', NULL, NULL, NULL, '2025-12-17T01:48:05.010660', 'alive');
+INSERT INTO plants (id, name, species, scientific_name, location, notes, created_at, status) VALUES (29, 'dill', NULL, NULL, NULL, 'Looking to grow my own herbs!', '2025-12-17T04:19:20.262042', 'dead');
+INSERT INTO plants (id, name, species, scientific_name, location, notes, created_at, status) VALUES (30, 'mint', NULL, NULL, 'balcony', '', '2025-12-17T04:43:47.293721', 'alive');
+
+INSERT INTO care_schedules (plant_id, task_type, frequency_days, last_completed) VALUES (2, 'watering', 6, '2025-12-14T23:34:01.965581');
+INSERT INTO care_schedules (plant_id, task_type, frequency_days, last_completed) VALUES (3, 'watering', 3, '2025-12-15T22:50:24.496599');
+INSERT INTO care_schedules (plant_id, task_type, frequency_days, last_completed) VALUES (2, 'fertilizing', 28, '2025-12-16T13:34:59.627965');
+INSERT INTO care_schedules (plant_id, task_type, frequency_days, last_completed) VALUES (3, 'fertilizing', 28, '2025-12-16T13:34:59.629504');
+INSERT INTO care_schedules (plant_id, task_type, frequency_days, last_completed) VALUES (8, 'watering', 7, '2025-12-16T13:48:46.186135');
+INSERT INTO care_schedules (plant_id, task_type, frequency_days, last_completed) VALUES (8, 'fertilizing', 28, '2025-12-16T13:48:46.186666');
+INSERT INTO care_schedules (plant_id, task_type, frequency_days, last_completed) VALUES (7, 'watering', 6, '2025-12-16T15:04:22.053344');
+INSERT INTO care_schedules (plant_id, task_type, frequency_days, last_completed) VALUES (26, 'watering', 7, '2025-12-16T20:05:28.406108');
+INSERT INTO care_schedules (plant_id, task_type, frequency_days, last_completed) VALUES (26, 'fertilizing', 28, '2025-12-16T20:05:28.406925');
+INSERT INTO care_schedules (plant_id, task_type, frequency_days, last_completed) VALUES (27, 'watering', 7, '2025-12-17T01:45:20.857537');
+INSERT INTO care_schedules (plant_id, task_type, frequency_days, last_completed) VALUES (27, 'fertilizing', 28, '2025-12-17T01:45:20.860580');
+INSERT INTO care_schedules (plant_id, task_type, frequency_days, last_completed) VALUES (9, 'watering', 7, '2025-12-17T04:19:20.263968');
+INSERT INTO care_schedules (plant_id, task_type, frequency_days, last_completed) VALUES (9, 'fertilizing', 28, '2025-12-17T04:19:20.264133');
+INSERT INTO care_schedules (plant_id, task_type, frequency_days, last_completed) VALUES (30, 'watering', 7, '2025-12-17T04:44:00.398716');
+INSERT INTO care_schedules (plant_id, task_type, frequency_days, last_completed) VALUES (30, 'fertilizing', 28, '2025-12-17T04:44:00.399393');
+
+INSERT INTO wishlist (name, notes, created_at) VALUES ('Aloe Vera', NULL, '2025-12-16T15:10:23.165624');
+INSERT INTO wishlist (name, notes, created_at) VALUES ('Cactus', 'Looking to add some low-maintenance plants to my collection.', '2025-12-16T19:36:24.035128');
+INSERT INTO wishlist (name, notes, created_at) VALUES ('Kumquat', NULL, '2025-12-17T02:39:20.497265');
+INSERT INTO wishlist (name, notes, created_at) VALUES ('Sage', 'Looking to grow my own herbs!', '2025-12-17T04:21:39.248581');
+INSERT INTO wishlist (name, notes, created_at) VALUES ('Marigold', NULL, '2025-12-17T04:45:47.053438');
+INSERT INTO wishlist (name, notes, created_at) VALUES ('Lavender', NULL, '2025-12-17T04:45:47.057429');
+
+UPDATE meta SET value = value + 1 WHERE key = 'data_version';
@@ -1,144 +1,195 @@
 from typing import List
+import os
+import uuid
+import sqlite3
+import asyncio
+import tempfile
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+
+load_dotenv()
+os.environ["DEEPEVAL_EVAL_MODE"] = "true"  # Override for evaluation; read when agent is imported
+# The date eval_fixture.sql was taken on; due dates in prompts and tool results follow it,
+# so recorded cassettes replay the same on any day
+os.environ.setdefault("SAGE_TODAY", "2025-12-18")
+
 from deepeval import evaluate
+from deepeval.evaluate import AsyncConfig, CacheConfig
 from deepeval.test_case import Turn, LLMTestCase, ToolCall
 from deepeval.metrics import ConversationCompletenessMetric, GoalAccuracyMetric, TurnRelevancyMetric, ToolCorrectnessMetric
 from deepeval.simulator import ConversationSimulator
 from deepeval.dataset import ConversationalGolden
 from agent import run_agent_conversation
-from database import init_db
+from agent_async import run_agent_conversation_async
+from database import init_db, use_db, close_pool
 from json_to_csv import convert_deepeval_to_csv
-import shutil
-import os
-
-load_dotenv()
-os.environ["DEEPEVAL_EVAL_MODE"] = "true"  # Override for evaluation
+import cassette
 
-#### Backup database before evaluation ###
-if os.path.exists('plants.db'):
-    shutil.copy2('plants.db', 'plants_backup.db')
-    print("Database backed up to plants_backup.db")
+# Cases and simulated conversations run at once, each against its own copy of the database
+EVAL_WORKERS = int(os.getenv("SAGE_EVAL_WORKERS", "4"))
 
-init_db()
+# Every case starts from this collection unless --db names a database to copy
+EVAL_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eval_fixture.sql")
 
+# When the agent's calls are replayed from a cassette, metric scores come from DeepEval's own cache
+CACHE_CONFIG = CacheConfig(use_cache=cassette.REPLAYING)
 
 ### Unit testing for tool use ###
-input1 = "Can you help me add potatoes to my plant collections? I'm having them in the balcony"
-response1, tools1 = run_agent_conversation(input1)
-test_case1 = LLMTestCase(
-    input=input1,
-    actual_output=response1,
-    tools_called=[ToolCall(name=tool) for tool in (tools1 or [])],
-    expected_tools=[
-        ToolCall(
-            name="add_plant"
-        )
-    ]
-)
-
-input2 = "Anything I need to water today?"
-response2, tools2 = run_agent_conversation(input2)
-test_case2 = LLMTestCase(
-    input=input2,
-    actual_output=response2,
-    tools_called=[ToolCall(name=tool) for tool in (tools2 or [])],
-    expected_tools=[
-        ToolCall(
-            name="get_care_schedule"
-        )
-    ]
-)
-input3 = "I'd love to have some kumquat. Can you add that to the wishlist"
-response3, tools3 = run_agent_conversation(input3)
-test_case3 = LLMTestCase( 
-    input=input3,
-    actual_output=response3,
-    tools_called=[ToolCall(name=tool) for tool in (tools3 or [])],
-    expected_tools=[
-        ToolCall(
-            name="add_to_wishlist"
-        )
-    ]
-) 
-
-def run_test_cases(test_cases: List[LLMTestCase]):
-    """Run evaluation on tool use""" 
-    test_case_results = evaluate(test_cases=[test_case1, test_case2, test_case3], 
-                                 metrics=[
-                                ToolCorrectnessMetric(strict_mode=True)]
-                                )
-    return test_case_results
- 
+# (input, expected tools)
+TOOL_CASES = [
+    ("Can you help me add potatoes to my plant collections? I'm having them in the balcony", ["add_plant"]),
+    ("Anything I need to water today?", ["get_care_schedule"]),
+    ("I'd love to have some kumquat. Can you add that to the wishlist", ["add_to_wishlist"]),
+]
+
 ### Testing with simulated conversations ###
 # Define conversation scenarios
-conversation_golden1 = ConversationalGolden(
-    scenario="User wants to add plants to their collection and update plant care schedule",
-    expected_outcome="Successfully add plants and update care schedules using appropriate tools",
-    user_description="Plant enthusiast with existing collection needing care management"
-)
-
-conversation_golden2 = ConversationalGolden(
-    scenario="User wants plant suggestions for their balcony",
-    expected_outcome="Provide relevant plant suggestions and add to wishlist",
-    user_description="Beginner gardener in Sydney setting up balcony garden"
-)
-
-conversation_golden3 = ConversationalGolden(
-    scenario="User wants to check current plant collection and care schedules",
-    expected_outcome="Retrieve and display plant information and watering schedules",
-    user_description="Plant owner checking on care requirements"
-)
-
-async def model_callback(input: str, turns: List[Turn], thread_id: str) -> Turn:
-    """Callback function for Sage agent"""
-    response, tools_used = run_agent_conversation(input)
-    return Turn(role="assistant", content=response)
-
-def run_evaluation():
+CONVERSATION_GOLDENS = [
+    ConversationalGolden(
+        scenario="User wants to add plants to their collection and update plant care schedule",
+        expected_outcome="Successfully add plants and update care schedules using appropriate tools",
+        user_description="Plant enthusiast with existing collection needing care management"
+    ),
+    ConversationalGolden(
+        scenario="User wants plant suggestions for their balcony",
+        expected_outcome="Provide relevant plant suggestions and add to wishlist",
+        user_description="Beginner gardener in Sydney setting up balcony garden"
+    ),
+    ConversationalGolden(
+        scenario="User wants to check current plant collection and care schedules",
+        expected_outcome="Retrieve and display plant information and watering schedules",
+        user_description="Plant owner checking on care requirements"
+    ),
+]
+
+def clone_database(source, directory):
+    """Copy `source` into `directory` and migrate the copy; returns its path
+
+    With no `source` the copy is built from EVAL_FIXTURE. Otherwise SQLite's
+    backup API is used, so the copy is consistent even while the app is writing.
+    """
+    path = os.path.join(directory, f"eval-{uuid.uuid4().hex}.db")
+    if source is None:
+        with use_db(path):
+            init_db()
+        close_pool(path)
+        with open(EVAL_FIXTURE, encoding="utf-8") as f:
+            fixture = f.read()
+        conn = sqlite3.connect(path)
+        try:
+            conn.executescript(fixture)
+        finally:
+            conn.close()
+    else:
+        # sqlite3.connect would create a missing file, and every case would run against no data
+        if not os.path.isfile(source):
+            raise FileNotFoundError(f"Database to evaluate not found: {source}")
+        src, dst = sqlite3.connect(source), sqlite3.connect(path)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
+    with use_db(path):
+        init_db()
+    return path
+
+def run_tool_case(case, source, directory):
+    """Run one tool-use case on a fresh database clone and session"""
+    user_input, expected_tools = case
+    path = clone_database(source, directory)
+    try:
+        with use_db(path):
+            response, tools = run_agent_conversation(user_input, session_id=f"eval-{uuid.uuid4().hex}")
+    finally:
+        close_pool(path)
+    return LLMTestCase(
+        input=user_input,
+        actual_output=response,
+        tools_called=[ToolCall(name=tool) for tool in (tools or [])],
+        expected_tools=[ToolCall(name=tool) for tool in expected_tools]
+    )
+
+def build_tool_test_cases(cases=TOOL_CASES, source=None, workers=EVAL_WORKERS):
+    with tempfile.TemporaryDirectory(prefix="sage-eval-") as directory:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda case: run_tool_case(case, source, directory), cases))
+
+def run_test_cases(test_cases: List[LLMTestCase], workers=EVAL_WORKERS):
+    """Run evaluation on tool use"""
+    test_case_results = evaluate(test_cases=test_cases,
+                                 metrics=[ToolCorrectnessMetric(strict_mode=True)],
+                                 async_config=AsyncConfig(max_concurrent=workers), cache_config=CACHE_CONFIG)
+    return test_case_results
+
+def make_model_callback(source, directory):
+    """Simulator callback giving each simulated conversation its own database clone and session
+
+    Returns (callback, clone paths by thread id).
+    """
+    paths = {}
+
+    async def model_callback(input: str, turns: List[Turn], thread_id: str) -> Turn:
+        """Callback function for Sage agent"""
+        path = paths.get(thread_id)
+        if path is None:
+            path = paths[thread_id] = await asyncio.to_thread(clone_database, source, directory)
+        with use_db(path):
+            response, tools_used = await run_agent_conversation_async(input, session_id=f"eval-{thread_id}")
+        return Turn(role="assistant", content=response)
+
+    return model_callback, paths
+
+def run_evaluation(goldens=CONVERSATION_GOLDENS, source=None, workers=EVAL_WORKERS):
     """Run evaluation using conversation goldens with multi-turn metrics"""
+    with tempfile.TemporaryDirectory(prefix="sage-eval-") as directory:
+        model_callback, paths = make_model_callback(source, directory)
+
+        # Create simulator
+        simulator = ConversationSimulator(model_callback=model_callback, max_concurrent=workers)
+
+        # Generate test cases
+        try:
+            conversational_test_cases = simulator.simulate(conversational_goldens=goldens)
+        finally:
+            for path in paths.values():
+                close_pool(path)
 
-    # Create simulator
-    simulator = ConversationSimulator(model_callback=model_callback, max_concurrent=1)
-    
-    # Generate test cases
-    conversational_test_cases = simulator.simulate(
-        conversational_goldens=[conversation_golden1, conversation_golden2, conversation_golden3]
-    )
-    
     # Define metrics for conversational evaluation
     metrics = [
         GoalAccuracyMetric(threshold=0.5, model="gpt-4o-mini"),
         ConversationCompletenessMetric(threshold=0.8, model="gpt-4o-mini"),
         TurnRelevancyMetric(threshold=0.8, model="gpt-4o-mini"),
     ]
-    
+
     # Run evaluation
-    results = evaluate(test_cases=conversational_test_cases, metrics=metrics)
+    results = evaluate(test_cases=conversational_test_cases, metrics=metrics,
+                       async_config=AsyncConfig(max_concurrent=workers), cache_config=CACHE_CONFIG)
     return results
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate the Sage agent with DeepEval")
+    parser.add_argument("--workers", type=int, default=EVAL_WORKERS,
+                        help="cases and simulated conversations run concurrently")
+    parser.add_argument("--db", help="database each case starts from (never modified; default: eval_fixture.sql)")
+    args = parser.parse_args()
+
     print("Running Sage agent evaluation...")
     print("Runing tests for tool use validation")
-    tool_use_results = run_test_cases([test_case2, test_case3])
+    tool_use_results = run_test_cases(build_tool_test_cases(source=args.db, workers=args.workers),
+                                      workers=args.workers)
 
     # Convert results to CSV
     if os.path.exists('.deepeval/.deepeval-cache.json'):
         convert_deepeval_to_csv('.deepeval/.deepeval-cache.json', 'deepeval_cache.csv')
         print("Cache results exported to deepeval_cache.csv")
-    
 
     print("Runing tests for multi-turn evaluation")
-    multi_turn_results = run_evaluation()
+    multi_turn_results = run_evaluation(source=args.db, workers=args.workers)
     print("\nEvaluation completed!")
-    
+
     # Convert results to CSV
     if os.path.exists('.deepeval/.latest_test_run.json'):
         convert_deepeval_to_csv('.deepeval/.latest_test_run.json', 'deepeval_results.csv')
         print("Results exported to deepeval_results.csv")
-
-    
-    # Restore database
-    if os.path.exists('plants_backup.db'):
-        shutil.copy2('plants_backup.db', 'plants.db')
-        os.remove('plants_backup.db')
-        print("Database restored")
\ No newline at end of file
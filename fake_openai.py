@@ -0,0 +1,215 @@
+"""Offline stand-in for the OpenAI chat completions API
+
+Serves scripted tool calls and replies with configurable latency so the app
+can be load tested without network access or API spend:
+
+    python fake_openai.py --port 8099 --latency-ms 300
+    SAGE_OPENAI_BASE_URL=http://localhost:8099/v1 python app.py
+"""
+import re
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# (pattern, tool name, arguments) - checked in order against the latest user message.
+# String argument values are formatted with the pattern's named groups.
+DEFAULT_SCRIPT = [
+    (r"remove (?P<name>[\w ]+?) from (?:my |the )?wishlist", "remove_from_wishlist", {"name": "{name}"}),
+    (r"add (?P<name>[\w ]+?) to (?:my |the )?wishlist", "add_to_wishlist", {"name": "{name}"}),
+    (r"\b(water|fertili[sz]e|fertili[sz]ing|due|schedule)\b", "get_care_schedule", {}),
+    (r"^add (?:a |an |some )?(?P<name>[a-z ]+?)(?: (?:in|on|to) (?:the |my )(?P<location>[a-z ]+))?[.!]*$",
+     "add_plant", {"name": "{name}", "location": "{location}"}),
+]
+
+class FakeOpenAI:
+    """Scripted responder plus request counters"""
+
+    def __init__(self, script=None, latency_ms=0, jitter_ms=0, token_ms=0, seed=None):
+        self.script = [(re.compile(pattern, re.IGNORECASE), tool, arguments)
+                       for pattern, tool, arguments in (script or DEFAULT_SCRIPT)]
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.token_ms = token_ms
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "tool_calls": 0, "replies": 0, "streams": 0}
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def delay(self):
+        jitter = self.random.uniform(0, self.jitter_ms) if self.jitter_ms else 0
+        if self.latency_ms or jitter:
+            time.sleep((self.latency_ms + jitter) / 1000)
+
+    def _match_tool(self, text):
+        for pattern, tool, arguments in self.script:
+            match = pattern.search(text)
+            if match:
+                groups = {k: (v or "").strip() for k, v in match.groupdict().items()}
+                filled = {}
+                for key, value in arguments.items():
+                    if isinstance(value, str):
+                        value = value.format(**groups)
+                        if not value:
+                            continue
+                    filled[key] = value
+                return tool, filled
+        return None
+
+    def _reply_for_tool_result(self, content):
+        try:
+            result = json.loads(content)
+        except (TypeError, ValueError):
+            return "All done!"
+        if "care_schedule" in result:
+            tasks = result["care_schedule"]
+            overdue = sum(1 for task in tasks if task.get("days_until", 0) < 0)
+            return f"You have {len(tasks)} care tasks scheduled and {overdue} of them are overdue."
+        return result.get("message") or result.get("error") or "All done!"
+
+    def respond(self, request):
+        """Return (message dict, finish_reason) for a chat completions request body"""
+        self._count("requests")
+        messages = request.get("messages", [])
+        last = messages[-1] if messages else {}
+        if last.get("role") == "tool":
+            # Phrase every tool result that came back in this round
+            replies = []
+            for message in reversed(messages):
+                if message.get("role") != "tool":
+                    break
+                replies.append(self._reply_for_tool_result(message.get("content")))
+            self._count("replies")
+            return {"role": "assistant", "content": " ".join(reversed(replies))}, "stop"
+
+        text = last.get("content") or ""
+        match = self._match_tool(text) if request.get("tools") else None
+        if match:
+            tool, arguments = match
+            self._count("tool_calls")
+            tool_call = {"id": f"call_{uuid.uuid4().hex[:24]}", "type": "function",
+                         "function": {"name": tool, "arguments": json.dumps(arguments)}}
+            return {"role": "assistant", "content": None, "tool_calls": [tool_call]}, "tool_calls"
+
+        self._count("replies")
+        return {"role": "assistant",
+                "content": "I'd be happy to help with your plants! Tell me more about what you need."}, "stop"
+
+def _usage(request, message):
+    prompt_chars = sum(len(m.get("content") or "") for m in request.get("messages", []))
+    completion_chars = len(message.get("content") or "") + len(json.dumps(message.get("tool_calls") or []))
+    prompt_tokens, completion_tokens = prompt_chars // 4, completion_chars // 4
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+def make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/stats":
+                self._send_json(200, dict(fake.stats))
+            else:
+                self._send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            fake.delay()
+            message, finish_reason = fake.respond(request)
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+            created = int(time.time())
+            model = request.get("model", "gpt-4o-mini")
+
+            if not request.get("stream"):
+                self._send_json(200, {
+                    "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                    "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                    "usage": _usage(request, message),
+                })
+                return
+
+            fake._count("streams")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+
+            def send_chunk(delta, finish=None):
+                chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                         "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            send_chunk({"role": "assistant", "content": ""})
+            if message.get("tool_calls"):
+                deltas = [dict(call, index=i) for i, call in enumerate(message["tool_calls"])]
+                send_chunk({"tool_calls": deltas})
+            else:
+                for token in re.findall(r"\S+\s*", message["content"]):
+                    if fake.token_ms:
+                        time.sleep(fake.token_ms / 1000)
+                    send_chunk({"content": token})
+            send_chunk({}, finish_reason)
+            if (request.get("stream_options") or {}).get("include_usage"):
+                # Like the real API: a last chunk with no choices carrying the usage block
+                usage = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                         "model": model, "choices": [], "usage": _usage(request, message)}
+                self.wfile.write(f"data: {json.dumps(usage)}\n\n".encode("utf-8"))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+    return Handler
+
+def start_server(port=0, host="127.0.0.1", **options):
+    """Start the fake API on a background thread; returns (server, base_url)"""
+    fake = FakeOpenAI(**options)
+    server = ThreadingHTTPServer((host, port), make_handler(fake))
+    server.daemon_threads = True
+    server.fake = fake
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+def load_script(path):
+    with open(path) as f:
+        return [(rule["pattern"], rule["tool"], rule.get("arguments", {})) for rule in json.load(f)]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline OpenAI chat completions stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=0, help="fixed delay per request")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="extra random delay per request")
+    parser.add_argument("--token-ms", type=float, default=0, help="delay between streamed tokens")
+    parser.add_argument("--script", help="JSON list of {pattern, tool, arguments} rules")
+    parser.add_argument("--seed", type=int, help="seed for latency jitter")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(FakeOpenAI(
+        script=load_script(args.script) if args.script else None,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, token_ms=args.token_ms, seed=args.seed)))
+    print(f"Fake OpenAI API at http://{args.host}:{args.port}/v1")
+    server.serve_forever()
@@ -0,0 +1,199 @@
+import os
+import re
+import time
+import threading
+from database import get_db
+from tracing import EVAL_MODE
+
+# Off under evaluation so the model, not the router, answers the eval cases
+INTENT_ROUTER_ENABLED = os.getenv("SAGE_INTENT_ROUTER", "false" if EVAL_MODE else "true").lower() == "true"
+INTENT_MIN_CONFIDENCE = float(os.getenv("SAGE_INTENT_MIN_CONFIDENCE", "0.8"))
+
+# Items listed in a locally answered reply before it trails off
+MAX_LISTED = 10
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+# A lookup has to be phrased as a question or a request to show something
+_LOOKUP = re.compile(r"\?\s*$|^(what|what's|whats|which|anything|any|do|does|is|are|show|list|check|give|tell|can|could)\b")
+
+# Anything that changes data, reports care done or asks about it, or asks for judgement goes to the model
+_HAND_OFF = re.compile(r"\b(add|remove|delete|set|update|change|make|mark|died|dead|dying|every|how|why|should|"
+                       r"recommend|suggest|tips?|advice|often|much|bought|got|new|buy|move|moved|repot|not|don't|dont|"
+                       r"watered|fed|fertili[sz]ed|did|have|already|just)\b")
+
+_WATERING = re.compile(r"\bwater(s|ed|ing)?\b")
+_FERTILIZING = re.compile(r"\b(fertili[sz](e|es|ed|ing|er)|feed(ing)?|fed)\b")
+_SCHEDULE = re.compile(r"\b(due|overdue|schedule|care|chores?|tasks?|upcoming|coming up)\b")
+_WISHLIST = re.compile(r"\bwish ?list\b")
+
+_OVERDUE = re.compile(r"\b(overdue|late|missed|behind)\b")
+_TODAY = re.compile(r"\b(today|tonight|now)\b")
+_TOMORROW = re.compile(r"\btomorrow\b")
+_WEEK = re.compile(r"\b(this|next|coming) week\b|\bweek\b")
+_DAYS = re.compile(r"\b(?:next|in|within) (\d{1,3}) days?\b")
+
+# Every other word in a message we answer locally must come from here;
+# an unknown word (usually a plant name) lowers confidence below the cut-off
+_VOCABULARY = set("""
+i i'm im my me we our you your it its it's the a an to do does need needs needed has any anything
+something is are there that this these those what what's whats which for be on in of at up all still yet left
+now right today tonight tomorrow week next coming upcoming within day days due overdue late missed behind
+show list check give tell can could please plants plant schedule care chores chore tasks task hey hi hello sage
+so far again currently get see water waters watering fertilize fertilizes fertilizing
+fertilise fertilises fertilising fertilizer fertiliser feed feeding wishlist wish
+""".split())
+
+SCHEDULE_INTENT = "schedule_lookup"
+WISHLIST_INTENT = "wishlist_lookup"
+
+def classify(message):
+    """(intent, confidence, slots) for a user message; intent is None when nothing matches"""
+    text = (message or "").lower().strip()
+    if not text or _HAND_OFF.search(text) or not _LOOKUP.search(text):
+        return None, 0.0, {}
+
+    if _WISHLIST.search(text):
+        intent, slots = WISHLIST_INTENT, {}
+    elif _WATERING.search(text) or _FERTILIZING.search(text) or _SCHEDULE.search(text):
+        intent = SCHEDULE_INTENT
+        watering, fertilizing = bool(_WATERING.search(text)), bool(_FERTILIZING.search(text))
+        slots = {"task_type": "watering" if watering and not fertilizing else
+                              "fertilizing" if fertilizing and not watering else None}
+        days = _DAYS.search(text)
+        if _OVERDUE.search(text):
+            slots["status"] = "overdue"
+        elif days:
+            slots["within_days"] = int(days.group(1))
+        elif _WEEK.search(text):
+            slots["within_days"] = 7
+        elif _TOMORROW.search(text):
+            slots["within_days"] = 1
+        elif _TODAY.search(text) or watering or fertilizing or "due" in text:
+            # "anything to water?" means due now, including anything overdue
+            slots["within_days"] = 0
+    else:
+        return None, 0.0, {}
+
+    tokens = _TOKEN.findall(text.replace("wish list", "wishlist"))
+    known = sum(1 for token in tokens if token in _VOCABULARY or token.isdigit())
+    coverage = known / len(tokens) if tokens else 0.0
+    return intent, round(0.95 * coverage ** 3, 3), slots
+
+def _window(slots):
+    if slots.get("status") == "overdue":
+        return "overdue"
+    days = slots.get("within_days")
+    if days is None:
+        return "coming up"
+    if days == 0:
+        return "due today"
+    if days == 1:
+        return "due by tomorrow"
+    if days == 7:
+        return "due this week"
+    return f"due in the next {days} days"
+
+def _when(days_until):
+    if days_until < 0:
+        return f"overdue by {-days_until} day{'s' if days_until != -1 else ''}"
+    if days_until == 0:
+        return "due today"
+    return f"due in {days_until} day{'s' if days_until != 1 else ''}"
+
+def render_schedule(result, slots):
+    tasks = result.get("care_schedule", [])
+    noun = slots.get("task_type") or "care"
+    if not tasks:
+        return f"No {noun} is {_window(slots)} - your plants are all set!"
+
+    lines = [f"Here's the {noun} that's {_window(slots)}:"]
+    for task in tasks[:MAX_LISTED]:
+        lines.append(f"- **{task['plant_name']}**: {task['task_type']} ({_when(task['days_until'])})")
+    if len(tasks) > MAX_LISTED or result.get("has_more"):
+        lines.append("...and more after that.")
+    return "\n".join(lines)
+
+def render_wishlist(items):
+    if not items:
+        return "Your wishlist is empty. Want some suggestions for plants to add?"
+    lines = ["Here's what's on your wishlist:"]
+    for item in items[:MAX_LISTED]:
+        notes = f" - {item['notes']}" if item["notes"] else ""
+        lines.append(f"- **{item['name']}**{notes}")
+    if len(items) > MAX_LISTED:
+        lines.append("...and more after that.")
+    return "\n".join(lines)
+
+def _load_wishlist():
+    conn = get_db()
+    try:
+        return [dict(row) for row in conn.execute(
+            'SELECT name, notes FROM wishlist ORDER BY created_at DESC LIMIT ?', (MAX_LISTED + 1,))]
+    finally:
+        conn.close()
+
+class IntentRouter:
+    """Answers high-confidence lookups locally and counts what that saves"""
+
+    def __init__(self, enabled=INTENT_ROUTER_ENABLED, min_confidence=INTENT_MIN_CONFIDENCE):
+        self.enabled = enabled
+        self.min_confidence = min_confidence
+        self._lock = threading.Lock()
+        self._stats = {"considered": 0, "routed": 0, "handed_off": 0, "local_ms": 0.0,
+                       "model_turns": 0, "model_ms": 0.0, "by_intent": {}}
+
+    def route(self, user_message, run_tool):
+        """(reply, tools_used, intent) when answered locally, else None
+
+        `run_tool(name, arguments)` runs a registered tool so its stats are recorded.
+        """
+        if not self.enabled:
+            return None
+        started = time.perf_counter()
+        intent, confidence, slots = classify(user_message)
+        if intent is None or confidence < self.min_confidence:
+            with self._lock:
+                self._stats["considered"] += 1
+                self._stats["handed_off"] += 1
+            return None
+
+        if intent == SCHEDULE_INTENT:
+            arguments = {key: value for key, value in slots.items() if value is not None}
+            arguments["limit"] = MAX_LISTED
+            result = run_tool("get_care_schedule", arguments)
+            if "error" in result:
+                with self._lock:
+                    self._stats["considered"] += 1
+                    self._stats["handed_off"] += 1
+                return None
+            reply, tools_used = render_schedule(result, slots), ["get_care_schedule"]
+        else:
+            reply, tools_used = render_wishlist(_load_wishlist()), []
+
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._stats["considered"] += 1
+            self._stats["routed"] += 1
+            self._stats["local_ms"] += elapsed
+            self._stats["by_intent"][intent] = self._stats["by_intent"].get(intent, 0) + 1
+        return reply, tools_used, intent
+
+    def record_model_turn(self, elapsed_ms):
+        """Latency of a turn the model answered, to estimate what routing saves"""
+        with self._lock:
+            self._stats["model_turns"] += 1
+            self._stats["model_ms"] += elapsed_ms
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["by_intent"] = dict(stats["by_intent"])
+        stats["hit_rate"] = stats["routed"] / stats["considered"] if stats["considered"] else 0.0
+        stats["avg_local_ms"] = stats["local_ms"] / stats["routed"] if stats["routed"] else 0.0
+        stats["avg_model_ms"] = stats["model_ms"] / stats["model_turns"] if stats["model_turns"] else 0.0
+        stats["estimated_saved_ms"] = stats["routed"] * max(stats["avg_model_ms"] - stats["avg_local_ms"], 0.0)
+        stats.update(enabled=self.enabled, min_confidence=self.min_confidence)
+        return stats
+
+intent_router = IntentRouter()
@@ -1,76 +1,380 @@
+"""Convert DeepEval result and cache files to CSV, JSON Lines or a columnar file
+
+The input is parsed incrementally, so rows are written as they are read and
+memory stays flat however large the file is. A per-metric summary (pass rate,
+score percentiles) is computed in the same pass:
+
+    python json_to_csv.py .deepeval/.latest_test_run.json results.jsonl --summary
+"""
 import json
 import csv
 import sys
+import argparse
+import tempfile
+
+CHUNK_SIZE = 1 << 16
+
+# Metric reasons are cut to this many characters
+REASON_LENGTH = 200
+
+# Headers written when a file has no metric rows, by input kind
+RUN_FIELDS = ['test_case', 'test_name', 'success', 'metric_name', 'metric_score', 'metric_threshold',
+              'metric_success', 'metric_reason']
+CACHE_FIELDS = ['test_case', 'prompt', 'success', 'metric_name', 'metric_score', 'metric_threshold',
+                'metric_success', 'metric_reason']
+
+# Score histogram bins over [0, 1] used for percentiles
+SCORE_BINS = 1000
+
+# Columns with at most this many distinct values are dictionary-encoded in the columnar format
+DICTIONARY_MAX = 255
+
+_NUMBER_CHARS = "0123456789.eE+-"
+
+class StreamReader:
+    """Reads a JSON document from a file a chunk at a time
+
+    members() and items() walk objects and arrays without loading them; value()
+    decodes the next value whole.
+    """
+
+    def __init__(self, f, chunk_size=None):
+        self.f = f
+        self.chunk_size = chunk_size or CHUNK_SIZE
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """Read more input, at least doubling the unread part so large values decode in linear time"""
+        if self.eof:
+            return False
+        chunk = self.f.read(max(self.chunk_size, len(self.buf) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character, without consuming it"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\n\r":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON input")
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} but found {found!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number at the end of the buffer may continue in the next chunk, even
+            # after a '.' or exponent the decoder stopped short of ("-0." -> -0)
+            rest = self.buf[end:]
+            if (not rest or isinstance(value, (int, float)) and not rest.strip(_NUMBER_CHARS)) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def members(self):
+        """Yield an object's keys; read each value (value(), members(), items()) before the next key"""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("}")
+            return
+
+    def items(self):
+        """Yield once per array element; read each element before the next"""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("]")
+            return
+
+def _reason(metric):
+    reason = metric.get('reason') or ''
+    return reason[:REASON_LENGTH] + '...' if len(reason) > REASON_LENGTH else reason
+
+def iter_rows(f, kinds=None):
+    """Yield one row per metric result from an open DeepEval test run or cache file
+
+    Rows come out in file order. If `kinds` is a list, the input's kind
+    ('cache' or 'run') is appended to it as soon as it is known.
+    """
+    reader = StreamReader(f)
+    for key in reader.members():
+        if key == 'test_cases_lookup_map':
+            if kinds is not None:
+                kinds.append('cache')
+            # Handle cache file format
+            for test_case_counter, test_key in enumerate(reader.members(), 1):
+                test_data = reader.value()
+                # Keys are serialized test cases; only one is decoded at a time
+                prompt = json.loads(test_key).get('input')
+                for cached_metric in test_data.get('cached_metrics_data') or []:
+                    metric = cached_metric['metric_data']
+                    yield {
+                        'test_case': f'test_case{test_case_counter}',
+                        'prompt': prompt,
+                        'success': metric['success'],
+                        'metric_name': metric['name'],
+                        'metric_score': metric['score'],
+                        'metric_threshold': metric['threshold'],
+                        'metric_success': metric['success'],
+                        'metric_reason': _reason(metric)
+                    }
+        elif key == 'testRunData':
+            if kinds is not None:
+                kinds.append('run')
+            for run_key in reader.members():
+                if run_key not in ('conversationalTestCases', 'testCases'):
+                    reader.value()
+                    continue
+                prefix = 'conversational' if run_key == 'conversationalTestCases' else 'regular'
+                for i, _ in enumerate(reader.items()):
+                    test_case = reader.value()
+                    for metric in test_case.get('metricsData') or []:
+                        yield {
+                            'test_case': f"{prefix}_{i}",
+                            'test_name': test_case.get('name', f'test_{i}'),
+                            'success': test_case.get('success', False),
+                            'metric_name': metric['name'],
+                            'metric_score': metric['score'],
+                            'metric_threshold': metric['threshold'],
+                            'metric_success': metric['success'],
+                            'metric_reason': _reason(metric)
+                        }
+        else:
+            reader.value()
+
+class MetricSummary:
+    """Pass rate and score distribution of one metric in constant memory"""
+
+    def __init__(self, bins=SCORE_BINS):
+        self.bins = [0] * bins
+        self.count = 0
+        self.passed = 0
+        self.scored = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, score, success):
+        self.count += 1
+        self.passed += bool(success)
+        if score is None:
+            return
+        self.scored += 1
+        self.total += score
+        self.min = score if self.min is None else min(self.min, score)
+        self.max = score if self.max is None else max(self.max, score)
+        index = int(min(max(score, 0.0), 1.0) * len(self.bins))
+        self.bins[min(index, len(self.bins) - 1)] += 1
+
+    def percentile(self, pct):
+        """Score at `pct`, to within one histogram bin"""
+        if not self.scored:
+            return None
+        rank = max(pct / 100 * self.scored, 1)
+        seen = 0
+        for index, count in enumerate(self.bins):
+            seen += count
+            if seen >= rank:
+                upper = (index + 1) / len(self.bins)
+                return round(min(max(upper, self.min), self.max), 4)
+        return self.max
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'passed': self.passed,
+            'pass_rate': self.passed / self.count if self.count else 0.0,
+            'mean_score': self.total / self.scored if self.scored else None,
+            'min_score': self.min,
+            'p50_score': self.percentile(50),
+            'p90_score': self.percentile(90),
+            'p99_score': self.percentile(99),
+            'max_score': self.max,
+        }
+
+class ResultSummary:
+    def __init__(self):
+        self.rows = 0
+        self.test_cases = 0
+        self._last_test_case = None
+        self.metrics = {}
+
+    def add(self, row):
+        self.rows += 1
+        # Rows of one test case are contiguous
+        if row['test_case'] != self._last_test_case:
+            self.test_cases += 1
+            self._last_test_case = row['test_case']
+        metric = self.metrics.get(row['metric_name'])
+        if metric is None:
+            metric = self.metrics[row['metric_name']] = MetricSummary()
+        metric.add(row['metric_score'], row['metric_success'])
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'test_cases': self.test_cases,
+            'metrics': {name: metric.as_dict() for name, metric in sorted(self.metrics.items())},
+        }
+
+class CsvWriter:
+    def __init__(self, f):
+        self.f = f
+        self.writer = None
+
+    def write(self, row):
+        if self.writer is None:
+            self.writer = csv.DictWriter(self.f, fieldnames=list(row))
+            self.writer.writeheader()
+        self.writer.writerow(row)
+
+    def close(self, empty_fields=RUN_FIELDS):
+        if self.writer is None:
+            csv.DictWriter(self.f, fieldnames=empty_fields).writeheader()
+
+class JsonlWriter:
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, row):
+        self.f.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+    def close(self, empty_fields=None):
+        pass
+
+class ColumnarWriter:
+    """One JSON object holding an array per column; repetitive columns are stored as a dictionary plus codes
+
+    Columns are spooled to temporary files until close(), so memory stays flat.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.fields = None
+        self.rows = 0
+        self._spools = {}
+        self._distinct = {}
+
+    def write(self, row):
+        if self.fields is None:
+            self.fields = list(row)
+            for field in self.fields:
+                self._spools[field] = tempfile.TemporaryFile('w+', encoding='utf-8')
+                self._distinct[field] = {}
+        self.rows += 1
+        for field in self.fields:
+            encoded = json.dumps(row.get(field), ensure_ascii=False)
+            self._spools[field].write(encoded + '\n')
+            distinct = self._distinct[field]
+            if distinct is not None and encoded not in distinct:
+                if len(distinct) >= DICTIONARY_MAX:
+                    # Too many distinct values to be worth a dictionary
+                    self._distinct[field] = None
+                else:
+                    distinct[encoded] = len(distinct)
+
+    def _write_values(self, spool, encode):
+        spool.seek(0)
+        first = True
+        for line in spool:
+            self.f.write(('' if first else ',') + encode(line.rstrip('\n')))
+            first = False
+
+    def close(self, empty_fields=None):
+        self.f.write(f'{{"format":"columnar","rows":{self.rows},"columns":{{')
+        for position, field in enumerate(self.fields or []):
+            spool, distinct = self._spools[field], self._distinct[field]
+            self.f.write(('' if position == 0 else ',') + json.dumps(field) + ':')
+            if distinct is not None:
+                self.f.write('{"dictionary":[' + ','.join(distinct) + '],"codes":[')
+                self._write_values(spool, lambda encoded: str(distinct[encoded]))
+            else:
+                self.f.write('{"values":[')
+                self._write_values(spool, lambda encoded: encoded)
+            self.f.write(']}')
+            spool.close()
+        self.f.write('}}\n')
+
+WRITERS = {"csv": CsvWriter, "jsonl": JsonlWriter, "columnar": ColumnarWriter}
+
+def _format_for(output_file):
+    if output_file.endswith('.jsonl'):
+        return 'jsonl'
+    if output_file.endswith('.json'):
+        return 'columnar'
+    return 'csv'
+
+def convert_deepeval_results(json_file, output_file, fmt=None):
+    """Stream the metric rows of a DeepEval result or cache file to `output_file`; returns the summary
+
+    `fmt` is csv, jsonl or columnar; by default it follows the output file's extension.
+    """
+    writer_class = WRITERS[fmt or _format_for(output_file)]
+    summary = ResultSummary()
+    with open(json_file, 'r', encoding='utf-8') as f, open(output_file, 'w', newline='', encoding='utf-8') as out:
+        writer = writer_class(out)
+        kinds = []
+        for row in iter_rows(f, kinds):
+            writer.write(row)
+            summary.add(row)
+        writer.close(CACHE_FIELDS if kinds and kinds[0] == 'cache' else RUN_FIELDS)
+    return summary.as_dict()
 
 def convert_deepeval_to_csv(json_file, csv_file):
-    with open(json_file, 'r') as f:
-        data = json.load(f)
-    
-    rows = []
-    
-    # Handle cache file format
-    if 'test_cases_lookup_map' in data:
-        test_case_counter = 1
-        for test_key, test_data in data['test_cases_lookup_map'].items():
-            test_input = json.loads(test_key)
-            for cached_metric in test_data['cached_metrics_data']:
-                metric = cached_metric['metric_data']
-                rows.append({
-                    'test_case': f'test_case{test_case_counter}',
-                    'prompt': test_input['input'],
-                    'success': metric['success'],
-                    'metric_name': metric['name'],
-                    'metric_score': metric['score'],
-                    'metric_threshold': metric['threshold'],
-                    'metric_success': metric['success'],
-                    'metric_reason': metric['reason'][:200] + '...' if len(metric['reason']) > 200 else metric['reason']
-                })
-            test_case_counter += 1
-        
-        # Write to CSV and return early for cache files
-        with open(csv_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=['test_case', 'prompt', 'success', 'metric_name', 'metric_score', 'metric_threshold', 'metric_success', 'metric_reason'])
-            writer.writeheader()
-            writer.writerows(rows)
-        return
-    
-    # Process conversational test cases
-    for i, test_case in enumerate(data['testRunData']['conversationalTestCases']):
-        for metric in test_case['metricsData']:
-            rows.append({
-                'test_case': f"conversational_{i}",
-                'test_name': test_case['name'],
-                'success': test_case['success'],
-                'metric_name': metric['name'],
-                'metric_score': metric['score'],
-                'metric_threshold': metric['threshold'],
-                'metric_success': metric['success'],
-                'metric_reason': metric['reason'][:200] + '...' if len(metric['reason']) > 200 else metric['reason']
-            })
-    
-    # Process regular test cases
-    for i, test_case in enumerate(data['testRunData']['testCases']):
-        for metric in test_case.get('metricsData', []):
-            rows.append({
-                'test_case': f"regular_{i}",
-                'test_name': test_case.get('name', f'test_{i}'),
-                'success': test_case.get('success', False),
-                'metric_name': metric['name'],
-                'metric_score': metric['score'],
-                'metric_threshold': metric['threshold'],
-                'metric_success': metric['success'],
-                'metric_reason': metric['reason'][:200] + '...' if len(metric['reason']) > 200 else metric['reason']
-            })
-    
-    # Write to CSV
-    with open(csv_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=['test_case', 'test_name', 'success', 'metric_name', 'metric_score', 'metric_threshold', 'metric_success', 'metric_reason'])
-        writer.writeheader()
-        writer.writerows(rows)
+    return convert_deepeval_results(json_file, csv_file, 'csv')
 
 if __name__ == "__main__":
-    convert_deepeval_to_csv('.deepeval/.latest_test_run.json', 'deepeval_results.csv')
-    print("Converted to deepeval_results.csv")
-    
-    convert_deepeval_to_csv('.deepeval/.deepeval-cache.json', 'deepeval_cache.csv')
-    print("Converted cache to deepeval_cache.csv")
\ No newline at end of file
+    if len(sys.argv) == 1:
+        convert_deepeval_to_csv('.deepeval/.latest_test_run.json', 'deepeval_results.csv')
+        print("Converted to deepeval_results.csv")
+
+        convert_deepeval_to_csv('.deepeval/.deepeval-cache.json', 'deepeval_cache.csv')
+        print("Converted cache to deepeval_cache.csv")
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="Convert DeepEval result or cache files")
+    parser.add_argument("input", help="a .latest_test_run.json or .deepeval-cache.json file")
+    parser.add_argument("output")
+    parser.add_argument("--format", choices=sorted(WRITERS),
+                        help="default: jsonl for .jsonl, columnar for .json, otherwise csv")
+    parser.add_argument("--summary", action="store_true", help="print per-metric pass rates and score percentiles")
+    args = parser.parse_args()
+    summary = convert_deepeval_results(args.input, args.output, args.format)
+    print(f"Wrote {summary['rows']} rows from {summary['test_cases']} test cases to {args.output}")
+    if args.summary:
+        print(json.dumps(summary['metrics'], indent=2))
@@ -0,0 +1,204 @@
+"""Load generator for the Sage HTTP API
+
+Drives /chat, /api/schedule and /api/wishlist at a fixed concurrency and
+reports latency percentiles, throughput and error rate:
+
+    python loadtest.py --url http://localhost:5001 --concurrency 8 --requests 400
+
+With --local it needs no running server or network: it starts fake_openai.py
+and the Flask app in-process against a throwaway copy of plants.db.
+"""
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import shutil
+import argparse
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+CHAT_MESSAGES = [
+    "Anything I need to water today?",
+    "What's due this week?",
+    "Add lavender to my wishlist",
+    "Remove lavender from my wishlist",
+    "What plants would suit a shady balcony?",
+    "add a snake plant in the living room",
+]
+
+DEFAULT_MIX = "chat=2,schedule=1,wishlist=1"
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = int(weight or 1)
+    unknown = set(weights) - {"chat", "schedule", "wishlist"}
+    if unknown:
+        raise ValueError(f"Unknown endpoints in mix: {', '.join(sorted(unknown))}")
+    # Weighted round robin keeps runs deterministic
+    return [name for name, weight in weights.items() for _ in range(weight)]
+
+class LoadTest:
+    def __init__(self, base_url, concurrency=4, total_requests=200, duration=None, mix=DEFAULT_MIX, timeout=60):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.total_requests = total_requests
+        self.duration = duration
+        self.plan = parse_mix(mix)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._issued = 0
+        self.samples = []
+
+    def _next_index(self, deadline):
+        with self._lock:
+            if deadline is not None:
+                if time.perf_counter() >= deadline:
+                    return None
+            elif self._issued >= self.total_requests:
+                return None
+            self._issued += 1
+            return self._issued - 1
+
+    def _request(self, endpoint, index, session_id):
+        if endpoint == "chat":
+            body = json.dumps({"message": CHAT_MESSAGES[index % len(CHAT_MESSAGES)]}).encode("utf-8")
+            request = urllib.request.Request(self.base_url + "/chat", data=body, method="POST", headers={
+                "Content-Type": "application/json", "X-Session-ID": session_id})
+        else:
+            request = urllib.request.Request(f"{self.base_url}/api/{endpoint}")
+        start = time.perf_counter()
+        ok = True
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = response.read()
+            if endpoint == "chat" and json.loads(payload).get("response", "").startswith("Error:"):
+                ok = False
+        except (urllib.error.URLError, OSError, ValueError):
+            ok = False
+        return endpoint, (time.perf_counter() - start) * 1000, ok
+
+    def _worker(self, deadline):
+        # Each virtual user keeps its own conversation
+        session_id = uuid.uuid4().hex
+        samples = []
+        while True:
+            index = self._next_index(deadline)
+            if index is None:
+                break
+            samples.append(self._request(self.plan[index % len(self.plan)], index, session_id))
+        with self._lock:
+            self.samples.extend(samples)
+
+    def run(self):
+        started = time.perf_counter()
+        deadline = started + self.duration if self.duration else None
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for _ in range(self.concurrency):
+                pool.submit(self._worker, deadline)
+        return self.report(time.perf_counter() - started)
+
+    def report(self, elapsed):
+        def summarize(samples):
+            latencies = sorted(latency for _, latency, _ in samples)
+            errors = sum(1 for _, _, ok in samples if not ok)
+            return {
+                "requests": len(samples),
+                "errors": errors,
+                "error_rate": errors / len(samples) if samples else 0.0,
+                "throughput_rps": len(samples) / elapsed if elapsed else 0.0,
+                "p50_ms": percentile(latencies, 50),
+                "p95_ms": percentile(latencies, 95),
+                "p99_ms": percentile(latencies, 99),
+                "max_ms": latencies[-1] if latencies else 0.0,
+            }
+
+        endpoints = sorted({endpoint for endpoint, _, _ in self.samples})
+        return {
+            "concurrency": self.concurrency,
+            "elapsed_s": elapsed,
+            "overall": summarize(self.samples),
+            "endpoints": {name: summarize([s for s in self.samples if s[0] == name]) for name in endpoints},
+        }
+
+def print_report(report):
+    print(f"Concurrency {report['concurrency']}, {report['elapsed_s']:.2f}s")
+    print(f"{'endpoint':<10}{'requests':>10}{'errors':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    rows = list(report["endpoints"].items()) + [("overall", report["overall"])]
+    for name, stats in rows:
+        print(f"{name:<10}{stats['requests']:>10}{stats['errors']:>8}{stats['throughput_rps']:>9.1f}"
+              f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+
+def start_local_stack(latency_ms, jitter_ms):
+    """Fake OpenAI + Flask app on background threads, using a temporary copy of plants.db"""
+    from fake_openai import start_server
+    _, fake_url = start_server(latency_ms=latency_ms, jitter_ms=jitter_ms, seed=0)
+    os.environ["SAGE_OPENAI_BASE_URL"] = fake_url
+    os.environ.setdefault("OPENAI_API_KEY", "sk-local")
+
+    workdir = tempfile.mkdtemp(prefix="sage-loadtest-")
+    db_path = os.path.join(workdir, "plants.db")
+    if os.path.exists("plants.db"):
+        shutil.copy2("plants.db", db_path)
+    from database import set_db_path
+    set_db_path(db_path)
+
+    from werkzeug.serving import make_server, WSGIRequestHandler
+    from app import app
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", workdir
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the Sage HTTP API")
+    parser.add_argument("--url", default="http://localhost:5001")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200, help="total requests (ignored with --duration)")
+    parser.add_argument("--duration", type=float, help="run for this many seconds instead")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="weights, e.g. chat=2,schedule=1,wishlist=1")
+    parser.add_argument("--local", action="store_true", help="start fake OpenAI and the app in-process")
+    parser.add_argument("--fake-latency-ms", type=float, default=200)
+    parser.add_argument("--fake-jitter-ms", type=float, default=50)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--max-error-rate", type=float, help="exit non-zero above this error rate")
+    parser.add_argument("--max-p95-ms", type=float, help="exit non-zero above this overall p95")
+    args = parser.parse_args()
+
+    url, workdir = args.url, None
+    if args.local:
+        url, workdir = start_local_stack(args.fake_latency_ms, args.fake_jitter_ms)
+
+    report = LoadTest(url, args.concurrency, args.requests, args.duration, args.mix).run()
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    if workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    failed = []
+    if args.max_error_rate is not None and report["overall"]["error_rate"] > args.max_error_rate:
+        failed.append(f"error rate {report['overall']['error_rate']:.2%} > {args.max_error_rate:.2%}")
+    if args.max_p95_ms is not None and report["overall"]["p95_ms"] > args.max_p95_ms:
+        failed.append(f"p95 {report['overall']['p95_ms']:.1f}ms > {args.max_p95_ms:.1f}ms")
+    if failed:
+        print("FAILED: " + "; ".join(failed), file=sys.stderr)
+        sys.exit(1)
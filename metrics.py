@@ -0,0 +1,171 @@
+"""In-process latency and token histograms, rendered in the Prometheus text format
+
+Stages of a chat turn, SQLite statements and HTTP routes are timed here. A
+per-request breakdown of stage times is kept in a context variable so slow
+requests can be logged with where their time went.
+"""
+import os
+import json
+import time
+import logging
+import threading
+import contextvars
+from bisect import bisect_left
+from contextlib import contextmanager
+
+METRICS_ENABLED = os.getenv("SAGE_METRICS", "true").lower() == "true"
+# Log requests slower than this many milliseconds with their stage breakdown (0 = off)
+SLOW_REQUEST_MS = float(os.getenv("SAGE_SLOW_REQUEST_MS", "0"))
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (16, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+slow_log = logging.getLogger("sage.slow")
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> per-bucket counts (last one is +Inf) followed by the sum
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((values, list(series)) for values, series in self._series.items())
+        for values, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                labels = _format_labels(self.labels, values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {series[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {value}")
+        return lines
+
+STAGE_SECONDS = Histogram("sage_agent_stage_seconds", "Time spent in each stage of an agent turn",
+                          labels=("stage", "tool"))
+LLM_TOKENS = Histogram("sage_llm_tokens", "Tokens per chat completion call",
+                       labels=("call", "kind"), buckets=TOKEN_BUCKETS)
+CONTEXT_TOKENS = Histogram("sage_prompt_context_tokens", "Estimated tokens of plant context in the system prompt",
+                           buckets=TOKEN_BUCKETS)
+SQL_SECONDS = Histogram("sage_sqlite_statement_seconds",
+                        "SQLite statement time until the first row, by leading keyword", labels=("statement",))
+HTTP_SECONDS = Histogram("sage_http_request_seconds", "HTTP request latency until the response headers",
+                         labels=("route", "method", "status"))
+SLOW_REQUESTS = Counter("sage_slow_requests_total", "Requests slower than SAGE_SLOW_REQUEST_MS", labels=("route",))
+
+REGISTRY = [STAGE_SECONDS, LLM_TOKENS, CONTEXT_TOKENS, SQL_SECONDS, HTTP_SECONDS, SLOW_REQUESTS]
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# (stage, milliseconds) pairs for the request being handled, or None outside a request
+_breakdown = contextvars.ContextVar("sage_breakdown", default=None)
+
+def begin_breakdown():
+    """Start collecting stage times for the request handled in this context"""
+    _breakdown.set([])
+
+def end_breakdown():
+    _breakdown.set(None)
+
+def current_breakdown():
+    """Stage name -> total milliseconds so far in this request"""
+    totals = {}
+    for name, ms in list(_breakdown.get() or ()):
+        totals[name] = totals.get(name, 0.0) + ms
+    return {name: round(ms, 2) for name, ms in totals.items()}
+
+def record_stage(name, seconds, tool=""):
+    if not METRICS_ENABLED:
+        return
+    STAGE_SECONDS.observe(seconds, name, tool)
+    breakdown = _breakdown.get()
+    if breakdown is not None:
+        breakdown.append((f"{name}:{tool}" if tool else name, seconds * 1000))
+
+@contextmanager
+def stage(name, tool=""):
+    """Time the enclosed block as one agent stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started, tool)
+
+def observe_query(sql, seconds):
+    if not METRICS_ENABLED:
+        return
+    keyword = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else "EMPTY"
+    SQL_SECONDS.observe(seconds, keyword)
+    breakdown = _breakdown.get()
+    if breakdown is not None:
+        breakdown.append(("sql", seconds * 1000))
+
+def observe_usage(call, usage):
+    """Token counts from a chat completion's usage block, if the API sent one"""
+    if not METRICS_ENABLED or usage is None:
+        return
+    LLM_TOKENS.observe(getattr(usage, "prompt_tokens", 0) or 0, call, "prompt")
+    LLM_TOKENS.observe(getattr(usage, "completion_tokens", 0) or 0, call, "completion")
+
+def observe_context_tokens(tokens):
+    if METRICS_ENABLED:
+        CONTEXT_TOKENS.observe(tokens)
+
+def observe_request(route, method, status, seconds):
+    """Record one HTTP request and log it with its stage breakdown if it was slow"""
+    if not METRICS_ENABLED:
+        return
+    HTTP_SECONDS.observe(seconds, route, method, str(status))
+    if SLOW_REQUEST_MS and seconds * 1000 >= SLOW_REQUEST_MS:
+        SLOW_REQUESTS.inc(1, route)
+        slow_log.warning("slow request %s %s took %.0fms: %s", method, route, seconds * 1000,
+                         json.dumps(current_breakdown()))
@@ -0,0 +1,50 @@
+import os
+import threading
+from collections import OrderedDict
+
+PAYLOAD_CACHE_MAX_ENTRIES = int(os.getenv("SAGE_PAYLOAD_CACHE_MAX_ENTRIES", "64"))
+
+class PayloadCache:
+    """LRU of serialized API responses keyed on (database, path, query string), valid for one ETag"""
+
+    def __init__(self, max_entries=PAYLOAD_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "not_modified": 0, "evictions": 0}
+
+    def get_or_build(self, key, etag, build):
+        """(body bytes, headers) for `key` at `etag`; build() returns them on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == etag:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[1], entry[2]
+            self._stats["misses"] += 1
+
+        body, headers = build()
+        with self._lock:
+            self._entries[key] = (etag, body, headers)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return body, headers
+
+    def count_not_modified(self):
+        with self._lock:
+            self._stats["not_modified"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        stats["max_entries"] = self.max_entries
+        return stats
+
+payload_cache = PayloadCache()
@@ -0,0 +1,294 @@
+import os
+import json
+import heapq
+import threading
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+import clock
+from tools import get_plants_context_versioned
+from database import current_db_path
+from metrics import stage
+
+# Upper bound on tokens spent on plants, schedules and wishlist in the system prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("SAGE_CONTEXT_TOKEN_BUDGET", "1500"))
+
+# Schedules due within this many days count as relevant on every turn
+SOON_DUE_DAYS = 7
+
+# A section counts as full after this many of its rows in a row don't fit
+MAX_SKIPPED_ROWS = 32
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token for English and JSON)"""
+    return (len(text) + 3) // 4
+
+def _compact(row, keys):
+    return {key: row[key] for key in keys if row.get(key) not in (None, "")}
+
+def _dumps(value):
+    return json.dumps(value, separators=(",", ":"))
+
+def _schedule_json(schedule, days_until):
+    # The plant is named on the row, as its plant row may not fit in the budget
+    return _dumps(dict(_compact(schedule, ("plant_id", "plant_name", "location")), **{
+        "task_type": schedule["task_type"],
+        "frequency_days": schedule["frequency_days"],
+        "next_due_date": schedule["next_due"].isoformat(),
+        "days_until": days_until,
+    }))
+
+def _index_context(context):
+    """Parse, serialize and order rows once per data version; per turn only the top of each order is scored"""
+    plants = {}
+    for plant in context["plants"]:
+        if plant.get("status") == "dead":
+            continue
+        row = _compact(plant, ("id", "name", "species", "location", "notes"))
+        try:
+            created_at = datetime.fromisoformat(plant["created_at"]).timestamp()
+        except (TypeError, ValueError):
+            created_at = 0.0
+        plants[plant["id"]] = {
+            "id": plant["id"],
+            "name": (plant["name"] or "").lower(),
+            "created_at": created_at,
+            "row": row,
+            "json": _dumps(row),
+        }
+
+    schedules = []
+    for schedule in context["schedules"]:
+        if schedule["plant_id"] not in plants:
+            continue
+        try:
+            next_due = date.fromisoformat(schedule["next_due"])
+        except (TypeError, ValueError):
+            continue
+        plant = plants[schedule["plant_id"]]["row"]
+        schedules.append({
+            "plant_id": schedule["plant_id"],
+            "plant_name": plant.get("name"),
+            "location": plant.get("location"),
+            "task_type": schedule["task_type"],
+            "frequency_days": schedule["frequency_days"],
+            "next_due": next_due,
+        })
+    # Soonest due first; unboosted schedules rank in exactly this order whatever the date
+    schedules.sort(key=lambda schedule: schedule["next_due"])
+    for schedule in schedules:
+        # Serialized length less days_until, so a row's cost is known before it is serialized
+        schedule["size"] = len(_schedule_json(schedule, 0)) - 1
+    schedules_by_plant = {}
+    for position, schedule in enumerate(schedules):
+        schedules_by_plant.setdefault(schedule["plant_id"], []).append(position)
+
+    wishlist = []
+    for item in sorted(context["wishlist"], key=lambda w: w.get("created_at") or "", reverse=True):
+        wishlist.append({
+            "name": (item["name"] or "").lower(),
+            "json": _dumps(_compact(item, ("id", "name", "notes"))),
+        })
+
+    # Cheapest row of each section; a section is dropped once less than this is left
+    min_cost = {
+        "plants": min((estimate_tokens(plant["json"]) for plant in plants.values()), default=0) + 1,
+        "schedules": min(((schedule["size"] + 4) // 4 for schedule in schedules), default=0) + 1,
+        "wishlist": min((estimate_tokens(item["json"]) for item in wishlist), default=0) + 1,
+    }
+
+    return {
+        "plants": plants,
+        "plants_by_age": sorted(plants.values(), key=lambda plant: plant["created_at"], reverse=True),
+        "schedules": schedules,
+        "due_dates": [schedule["next_due"] for schedule in schedules],
+        "schedules_by_plant": schedules_by_plant,
+        "wishlist": wishlist,
+        "min_cost": min_cost,
+        # (date, plants with a task due soon, their plants newest first, the other plants newest first)
+        "day": None,
+    }
+
+def _plants_for_day(index, today):
+    """Split plants by whether a task is due within SOON_DUE_DAYS of `today`; cached for the day"""
+    day = index["day"]
+    if day is None or day[0] != today:
+        soon = bisect_right(index["due_dates"], today + timedelta(days=SOON_DUE_DAYS))
+        due_ids = {schedule["plant_id"] for schedule in index["schedules"][:soon]}
+        due, other = [], []
+        for plant in index["plants_by_age"]:
+            (due if plant["id"] in due_ids else other).append(plant)
+        day = index["day"] = (today, due_ids, due, other)
+    return day[1], day[2], day[3]
+
+# database path -> (version, index)
+_index_cache = {}
+_index_lock = threading.Lock()
+
+def _get_index():
+    path = current_db_path()
+    version, context = get_plants_context_versioned()
+    with _index_lock:
+        cached = _index_cache.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+    index = _index_context(context)
+    with _index_lock:
+        _index_cache[path] = (version, index)
+    return index
+
+def clear_index_cache():
+    with _index_lock:
+        _index_cache.clear()
+
+def build_context(user_message, conversation_context, budget=CONTEXT_TOKEN_BUDGET, today=None):
+    """Pick the most relevant plants, schedules and wishlist items that fit in `budget` tokens
+
+    Returns (context_str, info) where info has the tokens used, row counts and
+    the ids of plants named in the message.
+    """
+    with stage("context_load"):
+        index = _get_index()
+    with stage("prompt_build"):
+        return _select_context(index, user_message, conversation_context, budget, today)
+
+def _schedule_candidates(index, positions, today, mentioned_ids, focus_ids):
+    for position in positions:
+        schedule = index["schedules"][position]
+        days_until = (schedule["next_due"] - today).days
+        score = 0
+        if schedule["plant_id"] in mentioned_ids:
+            score += 100
+        if schedule["plant_id"] in focus_ids:
+            score += 80
+        if days_until <= SOON_DUE_DAYS:
+            # Overdue first, then due today, then the rest of the week
+            score += 50 + min(SOON_DUE_DAYS - days_until, 30)
+        yield score, -days_until, "schedules", schedule
+
+def _plant_candidates(plants, base_score, skip_ids):
+    for plant in plants:
+        if plant["id"] not in skip_ids:
+            yield base_score, plant["created_at"], "plants", plant["json"]
+
+def _wishlist_candidates(wishlist, skip_positions):
+    for position, item in enumerate(wishlist):
+        if position in skip_positions:
+            continue
+        # Recent wishlist items outrank older ones
+        yield max(20 - position, 0), 0, "wishlist", item["json"]
+
+def _rank(candidate):
+    return candidate[0], candidate[1]
+
+def _merge(streams, fits):
+    """Merge candidate streams, each in rank order, best first
+
+    `streams` are (section, iterable) pairs; a stream with a single section is
+    dropped as soon as fits(section) says nothing more of it can be packed.
+    """
+    heap = []
+    iterators = []
+    for order, (section, stream) in enumerate(streams):
+        iterator = iter(stream)
+        iterators.append((section, iterator))
+        candidate = next(iterator, None)
+        if candidate is not None:
+            # Ties go to the earlier stream, as in a stable sort
+            heap.append((-candidate[0], -candidate[1], order, candidate))
+    heapq.heapify(heap)
+    while heap:
+        _, _, order, candidate = heapq.heappop(heap)
+        yield candidate
+        section, iterator = iterators[order]
+        if section is not None and not fits(section):
+            continue
+        candidate = next(iterator, None)
+        if candidate is not None:
+            heapq.heappush(heap, (-candidate[0], -candidate[1], order, candidate))
+
+def _select_context(index, user_message, conversation_context, budget, today):
+    today = today or clock.today()
+    message = user_message.lower()
+    focus_ids = {conversation_context.get("last_mentioned_plant_id"),
+                 conversation_context.get("last_added_plant_id")}
+
+    mentioned = [p["id"] for p in index["plants"].values() if p["name"] and p["name"] in message]
+    mentioned_ids = set(mentioned)
+    boosted_ids = {plant_id for plant_id in mentioned_ids | focus_ids if plant_id in index["plants"]}
+    due_plant_ids, due_plants, other_plants = _plants_for_day(index, today)
+
+    # (score, tie-break, section, row) - higher scores are packed first; ties go to
+    # sooner-due schedules and newer plants. Every stream below is already in that
+    # order, so merging them visits only as many rows as the budget can take.
+    boosted_positions = sorted(position for plant_id in boosted_ids
+                               for position in index["schedules_by_plant"].get(plant_id, ()))
+    boosted_set = set(boosted_positions)
+    boosted = sorted(_schedule_candidates(index, boosted_positions, today, mentioned_ids, focus_ids),
+                     key=_rank, reverse=True)
+    for plant_id in boosted_ids:
+        plant = index["plants"][plant_id]
+        score = (100 if plant_id in mentioned_ids else 0) + (80 if plant_id in focus_ids else 0)
+        score += 40 if plant_id in due_plant_ids else 0
+        boosted.append((score, plant["created_at"], "plants", plant["json"]))
+    named_wishlist = {position for position, item in enumerate(index["wishlist"])
+                      if item["name"] and item["name"] in message}
+    for position in sorted(named_wishlist):
+        boosted.append((100 + max(20 - position, 0), 0, "wishlist", index["wishlist"][position]["json"]))
+    boosted.sort(key=_rank, reverse=True)
+
+    streams = [
+        (None, boosted),
+        ("schedules", _schedule_candidates(index, (p for p in range(len(index["schedules"])) if p not in boosted_set),
+                                           today, mentioned_ids, focus_ids)),
+        ("plants", _plant_candidates(due_plants, 40, boosted_ids)),
+        ("plants", _plant_candidates(other_plants, 0, boosted_ids)),
+        ("wishlist", _wishlist_candidates(index["wishlist"], named_wishlist)),
+    ]
+
+    totals = {
+        "plants": len(index["plants"]),
+        "schedules": len(index["schedules"]),
+        "wishlist": len(index["wishlist"]),
+    }
+    labels = {
+        "plants": "User's current plants",
+        "schedules": "Care schedules",
+        "wishlist": "Wishlist",
+    }
+    # Headers are always emitted; reserve room for them up front
+    used = sum(estimate_tokens(f"{labels[s]} (showing {totals[s]} of {totals[s]}): []\n") for s in labels)
+    selected = {"plants": [], "schedules": [], "wishlist": []}
+    min_cost = index["min_cost"]
+    skipped = {"plants": 0, "schedules": 0, "wishlist": 0}
+
+    def fits(section):
+        return budget - used >= min_cost[section] and skipped[section] < MAX_SKIPPED_ROWS
+
+    for _, tiebreak, section, row in _merge(streams, fits):
+        if not fits(section):
+            continue
+        if section == "schedules":
+            cost = (row["size"] + len(str(-tiebreak)) + 3) // 4 + 1
+        else:
+            cost = estimate_tokens(row) + 1
+        if used + cost > budget:
+            skipped[section] += 1
+            continue
+        skipped[section] = 0
+        if section == "schedules":
+            row = _schedule_json(row, -tiebreak)
+        selected[section].append(row)
+        used += cost
+
+    context_str = ""
+    for section, label in labels.items():
+        rows = selected[section]
+        context_str += f"{label} (showing {len(rows)} of {totals[section]}): [{','.join(rows)}]\n"
+
+    info = {
+        "context_tokens": estimate_tokens(context_str),
+        "context_budget": budget,
+        "context_rows": {section: len(rows) for section, rows in selected.items()},
+        "mentioned_plant_ids": mentioned,
+    }
+    return context_str, info
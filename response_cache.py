@@ -0,0 +1,85 @@
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+import clock
+from database import get_data_version, current_db_path
+
+RESPONSE_CACHE_ENABLED = os.getenv("SAGE_RESPONSE_CACHE", "false").lower() == "true"
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("SAGE_RESPONSE_CACHE_TTL_SECONDS", "300"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("SAGE_RESPONSE_CACHE_MAX_ENTRIES", "256"))
+
+# Turns that only called these tools can be answered again from the cache
+READ_ONLY_TOOLS = {"get_care_schedule", "get_care_history"}
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_message(message):
+    """'What needs watering today?' and 'what needs  watering today' share a key"""
+    message = _PUNCTUATION.sub(" ", message.lower())
+    return _WHITESPACE.sub(" ", message).strip()
+
+def is_cacheable(tools_used):
+    """Only turns that ran tools, all of them read-only, are worth caching"""
+    return bool(tools_used) and all(tool in READ_ONLY_TOOLS for tool in tools_used)
+
+class ResponseCache:
+    """LRU of agent replies keyed on (normalized message, date, database, data version)"""
+
+    def __init__(self, enabled=RESPONSE_CACHE_ENABLED, ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+                 max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0}
+
+    def key_for(self, user_message, data_version=None, today=None):
+        if data_version is None:
+            data_version = get_data_version()
+        today = today or clock.today()
+        return (normalize_message(user_message), today.isoformat(), current_db_path(), data_version)
+
+    def get(self, key):
+        """Cached (response, tools_used) or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] > self.ttl_seconds:
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[0]
+
+    def put(self, key, response, tools_used):
+        if not is_cacheable(tools_used):
+            return False
+        with self._lock:
+            self._entries[key] = ((response, list(tools_used)), time.time())
+            self._entries.move_to_end(key)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        stats.update(enabled=self.enabled, ttl_seconds=self.ttl_seconds, max_entries=self.max_entries)
+        return stats
+
+response_cache = ResponseCache()
@@ -0,0 +1,211 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, timedelta
+from operator import itemgetter
+import clock
+from database import get_db, get_pool, get_data_version, current_db_path
+
+SCHEDULE_STATUSES = ("overdue", "due_today", "upcoming")
+
+# Plant ids per IN (...) query when refreshing changed plants
+REFRESH_CHUNK = 500
+
+# Index entries are (next_due, plant_name, task_type, plant_id, location, frequency_days, last_completed);
+# (plant_id, task_type) is unique, so sorting never compares past the fourth field
+_DUE = itemgetter(0)
+
+_ROWS_QUERY = """
+SELECT cs.next_due, p.name, cs.task_type, p.id, p.location, cs.frequency_days, cs.last_completed
+FROM care_schedules cs
+JOIN plants p ON p.id = cs.plant_id
+WHERE (p.status = 'alive' OR p.status IS NULL) AND cs.next_due IS NOT NULL
+"""
+
+def schedule_status(days_until):
+    return "overdue" if days_until < 0 else "due_today" if days_until == 0 else "upcoming"
+
+class ScheduleIndex:
+    """Care tasks of living plants kept sorted by due date in memory
+
+    Loaded once per database and data version; writes made through the tools
+    patch only the plants they touched (see plants_changed). Writes from other
+    processes show up as a data version we did not apply and trigger a reload.
+    """
+
+    def __init__(self):
+        self._entries = []
+        # plant_id -> {task_type: entry}
+        self._by_plant = {}
+        self._version = None
+        self._path = None
+        self._lock = threading.RLock()
+        self._stats = {"loads": 0, "incremental_updates": 0, "queries": 0}
+
+    def _load(self, path):
+        conn = get_db()
+        try:
+            # One read transaction so the version matches the rows it labels
+            conn.execute('BEGIN')
+            version = get_data_version(conn)
+            entries = [tuple(row) for row in conn.execute(_ROWS_QUERY)]
+            conn.commit()
+        finally:
+            conn.close()
+        entries.sort()
+        by_plant = {}
+        for entry in entries:
+            by_plant.setdefault(entry[3], {})[entry[2]] = entry
+        with self._lock:
+            if path == self._path and self._version is not None and self._version > version:
+                return
+            self._entries = entries
+            self._by_plant = by_plant
+            self._version = version
+            self._path = path
+            self._stats["loads"] += 1
+
+    def _sync(self):
+        path = get_pool().path
+        version = get_data_version()
+        with self._lock:
+            current = path == self._path and self._version is not None and self._version >= version
+        if not current:
+            self._load(path)
+
+    def plants_changed(self, plant_ids, version):
+        """Re-read the schedules of `plant_ids` after a committed write that produced `version`"""
+        with self._lock:
+            if self._version is None or version <= self._version:
+                return
+            if version != self._version + 1 or get_pool().path != self._path:
+                # Missed a write made elsewhere; reload on the next query
+                self._version = None
+                return
+            plant_ids = list(set(plant_ids))
+            fresh = []
+            if plant_ids:
+                conn = get_db()
+                try:
+                    for start in range(0, len(plant_ids), REFRESH_CHUNK):
+                        chunk = plant_ids[start:start + REFRESH_CHUNK]
+                        placeholders = ", ".join("?" * len(chunk))
+                        fresh.extend(tuple(row) for row in conn.execute(
+                            f"{_ROWS_QUERY} AND p.id IN ({placeholders})", chunk))
+                finally:
+                    conn.close()
+            for plant_id in plant_ids:
+                for entry in self._by_plant.pop(plant_id, {}).values():
+                    del self._entries[bisect_left(self._entries, entry)]
+            for entry in fresh:
+                self._by_plant.setdefault(entry[3], {})[entry[2]] = entry
+                insort(self._entries, entry)
+            self._version = version
+            self._stats["incremental_updates"] += 1
+
+    def query(self, within_days=None, task_type=None, location=None, status=None,
+              limit=None, offset=0, today=None):
+        """Care tasks ordered by due date, then plant name; returns (rows, has_more)
+
+        Date filters bisect the sorted entries, so the first k matches cost
+        O(log n + k) however large the collection is.
+        """
+        if status is not None and status not in SCHEDULE_STATUSES:
+            raise ValueError(f"status must be one of {', '.join(SCHEDULE_STATUSES)}")
+        today = today or clock.today()
+        today_iso = today.isoformat()
+        location = location.lower() if location else None
+        wanted = None if limit is None else int(limit) + 1
+        skip = int(offset or 0)
+        self._sync()
+
+        matches = []
+        with self._lock:
+            self._stats["queries"] += 1
+            entries = self._entries
+            lo, hi = 0, len(entries)
+            if status == "overdue":
+                hi = bisect_left(entries, today_iso, key=_DUE)
+            elif status == "due_today":
+                lo = bisect_left(entries, today_iso, key=_DUE)
+                hi = bisect_right(entries, today_iso, key=_DUE)
+            elif status == "upcoming":
+                lo = bisect_right(entries, today_iso, key=_DUE)
+            if within_days is not None:
+                last_day = (today + timedelta(days=int(within_days))).isoformat()
+                hi = min(hi, bisect_right(entries, last_day, key=_DUE))
+
+            for i in range(lo, hi):
+                entry = entries[i]
+                if task_type and entry[2] != task_type:
+                    continue
+                if location and (entry[4] or "").lower() != location:
+                    continue
+                if skip:
+                    skip -= 1
+                    continue
+                matches.append(entry)
+                if wanted is not None and len(matches) == wanted:
+                    break
+
+        # One extra match tells us whether another page exists
+        has_more = wanted is not None and len(matches) == wanted
+        if has_more:
+            matches.pop()
+        rows = []
+        for next_due, plant_name, task, plant_id, plant_location, frequency_days, last_completed in matches:
+            rows.append({
+                "plant_id": plant_id,
+                "plant_name": plant_name,
+                "location": plant_location,
+                "task_type": task,
+                "frequency_days": frequency_days,
+                "last_completed": last_completed,
+                "next_due_date": next_due,
+                "days_until": (date.fromisoformat(next_due) - today).days,
+            })
+        return rows, has_more
+
+    def clear(self):
+        with self._lock:
+            self._entries = []
+            self._by_plant = {}
+            self._version = None
+            self._path = None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(entries=len(self._entries), version=self._version)
+        return stats
+
+# database path -> index, so concurrent users of different databases don't evict each other
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_schedule_index(path=None):
+    path = path or current_db_path()
+    index = _indexes.get(path)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.setdefault(path, ScheduleIndex())
+    return index
+
+def query_care_schedule(within_days=None, task_type=None, location=None, status=None,
+                        limit=None, offset=0, today=None):
+    """Care tasks for living plants ordered by due date; returns (rows, has_more)"""
+    return get_schedule_index().query(within_days, task_type, location, status, limit, offset, today)
+
+def plants_changed(plant_ids, version):
+    """Tell the index which plants a just-committed write touched"""
+    get_schedule_index().plants_changed(plant_ids, version)
+
+def clear_schedule_index():
+    """Forget every loaded index, e.g. after switching database files"""
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+        _indexes.clear()
+    for index in indexes:
+        index.clear()
+
+def schedule_stats():
+    return get_schedule_index().stats()
\ No newline at end of file
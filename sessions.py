@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from database import get_db, transaction
+
+DEFAULT_SESSION_ID = "default"
+
+SESSION_BACKEND = os.getenv("SAGE_SESSION_BACKEND", "memory").lower()
+SESSION_MAX_SESSIONS = int(os.getenv("SAGE_SESSION_MAX_SESSIONS", "1000"))
+SESSION_MAX_BYTES = int(os.getenv("SAGE_SESSION_MAX_BYTES", str(8 * 1024 * 1024)))
+SESSION_TTL_SECONDS = int(os.getenv("SAGE_SESSION_TTL_SECONDS", str(24 * 60 * 60)))
+
+def new_context():
+    """Fresh per-session conversation state"""
+    return {
+        "last_added_plant_id": None,
+        "pending_care_setup": False,
+        "pending_care_type": None,
+        "last_plant_name": None,
+        "last_mentioned_plant_id": None,
+        "conversation_history": []
+    }
+
+class MemorySessionStore:
+    """In-process LRU store with a TTL and hard caps on session count and bytes"""
+
+    def __init__(self, max_sessions=SESSION_MAX_SESSIONS, max_bytes=SESSION_MAX_BYTES,
+                 ttl_seconds=SESSION_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # session_id -> (serialized context, last access time), oldest first
+        self._sessions = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def _drop(self, session_id):
+        data, _ = self._sessions.pop(session_id)
+        self._bytes -= len(data)
+
+    def get(self, session_id):
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None and now - entry[1] > self.ttl_seconds:
+                self._drop(session_id)
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return new_context()
+            self._sessions.move_to_end(session_id)
+            self._stats["hits"] += 1
+            data = entry[0]
+        return json.loads(data)
+
+    def save(self, session_id, context):
+        data = json.dumps(context, separators=(",", ":"))
+        now = time.time()
+        with self._lock:
+            if session_id in self._sessions:
+                self._drop(session_id)
+            self._sessions[session_id] = (data, now)
+            self._bytes += len(data)
+            # Least recently used sessions go first, the one just saved goes last
+            while len(self._sessions) > 1 and (len(self._sessions) > self.max_sessions
+                                               or self._bytes > self.max_bytes):
+                oldest_id, (_, last_access) = next(iter(self._sessions.items()))
+                self._drop(oldest_id)
+                if now - last_access > self.ttl_seconds:
+                    self._stats["expirations"] += 1
+                else:
+                    self._stats["evictions"] += 1
+
+    def delete(self, session_id):
+        with self._lock:
+            if session_id in self._sessions:
+                self._drop(session_id)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["sessions"] = len(self._sessions)
+            stats["bytes"] = self._bytes
+        stats.update(backend="memory", max_sessions=self.max_sessions,
+                     max_bytes=self.max_bytes, ttl_seconds=self.ttl_seconds)
+        return stats
+
+class SQLiteSessionStore:
+    """Sessions kept in the sessions table so several worker processes can share them"""
+
+    # Pruning is a table scan, so only do it every so many saves
+    PRUNE_EVERY = 50
+
+    def __init__(self, max_sessions=SESSION_MAX_SESSIONS, ttl_seconds=SESSION_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._saves = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def get(self, session_id):
+        conn = get_db()
+        try:
+            row = conn.execute('SELECT data, updated_at FROM sessions WHERE session_id = ?',
+                               (session_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            self._count("misses")
+            return new_context()
+        if time.time() - row[1] > self.ttl_seconds:
+            self.delete(session_id)
+            self._count("expirations")
+            self._count("misses")
+            return new_context()
+        self._count("hits")
+        return json.loads(row[0])
+
+    def save(self, session_id, context):
+        data = json.dumps(context, separators=(",", ":"))
+        with transaction() as conn:
+            conn.execute(
+                '''INSERT INTO sessions (session_id, data, updated_at) VALUES (?, ?, ?)
+                   ON CONFLICT (session_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at''',
+                (session_id, data, time.time())
+            )
+        with self._lock:
+            self._saves += 1
+            prune = self._saves % self.PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+
+    def prune(self):
+        """Drop expired sessions, then the least recently used beyond the cap"""
+        with transaction() as conn:
+            expired = conn.execute('DELETE FROM sessions WHERE updated_at < ?',
+                                   (time.time() - self.ttl_seconds,)).rowcount
+            evicted = conn.execute(
+                '''DELETE FROM sessions WHERE session_id IN
+                   (SELECT session_id FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)''',
+                (self.max_sessions,)
+            ).rowcount
+        self._count("expirations", expired)
+        self._count("evictions", evicted)
+
+    def delete(self, session_id):
+        with transaction() as conn:
+            conn.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+
+    def stats(self):
+        conn = get_db()
+        try:
+            count, size = conn.execute('SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM sessions').fetchone()
+        finally:
+            conn.close()
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update(backend="sqlite", sessions=count, bytes=size,
+                     max_sessions=self.max_sessions, ttl_seconds=self.ttl_seconds)
+        return stats
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_session_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if SESSION_BACKEND == "sqlite":
+                    _store = SQLiteSessionStore()
+                else:
+                    _store = MemorySessionStore()
+    return _store
+
+def set_session_store(store):
+    """Swap the process-wide store (e.g. for evaluation runs)"""
+    global _store
+    with _store_lock:
+        _store = store
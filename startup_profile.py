@@ -0,0 +1,110 @@
+"""Import-time profile of the app, checked against a budget
+
+Imports a module in a fresh interpreter under `python -X importtime` and lists
+what each module costs:
+
+    python startup_profile.py --module app --top 20 --budget-ms 400
+
+Exits non-zero when the import takes longer than the budget or pulls in a
+dependency that should only load on first use (see DEFERRED_MODULES). Tests
+can call check_startup() and assert on `ok`.
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+IMPORT_BUDGET_MS = float(os.getenv("SAGE_IMPORT_BUDGET_MS", "400"))
+
+# Heavy packages that must not be imported until a request needs them
+DEFERRED_MODULES = ("openai", "deepeval", "httpx")
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+_TIMER = ("import sys, time\n"
+          "started = time.perf_counter()\n"
+          "import {module}\n"
+          "print((time.perf_counter() - started) * 1000)\n"
+          "print(','.join(sorted({{name.split('.')[0] for name in sys.modules}} & set({deferred!r}))))\n")
+
+def _parse_importtime(stderr):
+    """Rows of {module, self_ms, cumulative_ms, depth} from -X importtime output, in import order"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append({"module": name.strip(), "self_ms": int(self_us) / 1000,
+                     "cumulative_ms": int(cumulative_us) / 1000, "depth": depth})
+    return rows
+
+def profile_import(module="app", runs=3, deferred=DEFERRED_MODULES):
+    """Import `module` in `runs` fresh interpreters; returns the fastest run as a dict
+
+    Keys: wall_ms, modules (importtime rows) and deferred_loaded (names from
+    `deferred` that the import pulled in).
+    """
+    best = None
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _TIMER.format(module=module, deferred=tuple(deferred))],
+            cwd=ROOT, capture_output=True, text=True, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"})
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+        wall_ms, loaded = result.stdout.splitlines()[-2:]
+        run = {"wall_ms": float(wall_ms), "modules": _parse_importtime(result.stderr),
+               "deferred_loaded": [name for name in loaded.split(",") if name]}
+        if best is None or run["wall_ms"] < best["wall_ms"]:
+            best = run
+    return best
+
+def package_costs(rows):
+    """Self time summed per top-level package, most expensive first"""
+    totals = {}
+    for row in rows:
+        package = row["module"].split(".")[0]
+        totals[package] = totals.get(package, 0.0) + row["self_ms"]
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+def check_startup(module="app", budget_ms=IMPORT_BUDGET_MS, runs=3):
+    """Profile the import and judge it against the budget and DEFERRED_MODULES"""
+    profile = profile_import(module, runs)
+    profile["first_party"] = sorted(
+        (row for row in profile["modules"] if os.path.exists(os.path.join(ROOT, row["module"] + ".py"))),
+        key=lambda row: row["cumulative_ms"], reverse=True)
+    profile["budget_ms"] = budget_ms
+    profile["ok"] = profile["wall_ms"] <= budget_ms and not profile["deferred_loaded"]
+    return profile
+
+def format_report(profile, top=15):
+    lines = [f"import took {profile['wall_ms']:.0f}ms (budget {profile['budget_ms']:.0f}ms)"]
+    lines.append("")
+    lines.append(f"{'package':<28}{'self ms':>10}")
+    for package, self_ms in package_costs(profile["modules"])[:top]:
+        lines.append(f"{package:<28}{self_ms:>10.1f}")
+    lines.append("")
+    lines.append(f"{'first-party module':<28}{'self ms':>10}{'cumulative ms':>15}")
+    for row in profile["first_party"]:
+        lines.append(f"{row['module']:<28}{row['self_ms']:>10.1f}{row['cumulative_ms']:>15.1f}")
+    if profile["deferred_loaded"]:
+        lines.append("")
+        lines.append(f"loaded at import but should be deferred: {', '.join(profile['deferred_loaded'])}")
+    lines.append("")
+    lines.append("OK" if profile["ok"] else "OVER BUDGET" if not profile["deferred_loaded"] else "FAILED")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Report import-time cost per module")
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters to try; the fastest counts")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    profile = check_startup(args.module, args.budget_ms, args.runs)
+    print(format_report(profile, args.top))
+    sys.exit(0 if profile["ok"] else 1)
+
+if __name__ == "__main__":
+    main()
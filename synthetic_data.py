@@ -0,0 +1,100 @@
+"""Fill a plants.db-compatible database with a synthetic collection
+
+    python synthetic_data.py bench.db --plants 100000
+"""
+import os
+import random
+import sqlite3
+import argparse
+from datetime import datetime, timedelta
+from database import set_db_path, init_db, close_pool
+
+PLANT_NAMES = [
+    "Snake Plant", "Pothos", "Monstera", "Fiddle Leaf Fig", "Peace Lily", "Spider Plant", "Aloe Vera",
+    "Calathea", "Begonia", "Basil", "Mint", "Rosemary", "Lavender", "Tomato", "Chilli", "Lemon Tree",
+    "Jade Plant", "Rubber Plant", "ZZ Plant", "Orchid", "Fern", "Cactus", "Succulent", "Petunia",
+]
+LOCATIONS = ["living room", "kitchen", "bedroom", "bathroom", "balcony", "office", "garden", "patio", None]
+SPECIES = [None, None, "Epipremnum aureum", "Dracaena trifasciata", "Ficus lyrata", "Spathiphyllum"]
+
+BATCH_SIZE = 50000
+
+def _batches(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def generate(path, plants=1000, schedules_per_plant=2, wishlist=None, dead_fraction=0.05, seed=0, now=None):
+    """Create `path` with the app schema and `plants` synthetic plants; returns row counts"""
+    if os.path.exists(path):
+        raise FileExistsError(f"{path} already exists")
+    wishlist = plants // 10 if wishlist is None else wishlist
+    rng = random.Random(seed)
+    now = now or datetime.now()
+
+    # Build the schema through the normal migrations so the file matches plants.db
+    set_db_path(path)
+    init_db()
+    close_pool()
+
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA synchronous = OFF')
+    counts = {"plants": 0, "care_schedules": 0, "wishlist": 0}
+
+    def plant_rows():
+        for i in range(1, plants + 1):
+            created = now - timedelta(days=rng.randint(0, 730), seconds=rng.randint(0, 86400))
+            status = "dead" if rng.random() < dead_fraction else "alive"
+            yield (i, f"{rng.choice(PLANT_NAMES)} {i}", rng.choice(SPECIES), rng.choice(LOCATIONS),
+                   None, status, created.isoformat())
+
+    for batch in _batches(plant_rows()):
+        conn.executemany('INSERT INTO plants (id, name, species, location, notes, status, created_at) '
+                         'VALUES (?, ?, ?, ?, ?, ?, ?)', batch)
+        counts["plants"] += len(batch)
+
+    def schedule_rows():
+        tasks = [("watering", 2, 14), ("fertilizing", 14, 60)][:schedules_per_plant]
+        for plant_id in range(1, plants + 1):
+            for task_type, low, high in tasks:
+                last = now - timedelta(days=rng.randint(0, 45), seconds=rng.randint(0, 86400))
+                yield (plant_id, task_type, rng.randint(low, high), last.isoformat())
+
+    for batch in _batches(schedule_rows()):
+        conn.executemany('INSERT INTO care_schedules (plant_id, task_type, frequency_days, last_completed) '
+                         'VALUES (?, ?, ?, ?)', batch)
+        counts["care_schedules"] += len(batch)
+
+    def wishlist_rows():
+        for i in range(1, wishlist + 1):
+            created = now - timedelta(days=rng.randint(0, 365))
+            yield (f"{rng.choice(PLANT_NAMES)} variety {i}", None, created.isoformat())
+
+    for batch in _batches(wishlist_rows()):
+        conn.executemany('INSERT INTO wishlist (name, notes, created_at) VALUES (?, ?, ?)', batch)
+        counts["wishlist"] += len(batch)
+
+    conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'data_version'")
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.close()
+    return counts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic Sage database")
+    parser.add_argument("path")
+    parser.add_argument("--plants", type=int, default=1000)
+    parser.add_argument("--schedules-per-plant", type=int, default=2, choices=[0, 1, 2])
+    parser.add_argument("--wishlist", type=int, help="wishlist items (default: plants / 10)")
+    parser.add_argument("--dead-fraction", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    counts = generate(args.path, args.plants, args.schedules_per_plant, args.wishlist, args.dead_fraction, args.seed)
+    print(f"Wrote {counts['plants']} plants, {counts['care_schedules']} schedules "
+          f"and {counts['wishlist']} wishlist items to {args.path}")
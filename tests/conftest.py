@@ -0,0 +1,32 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+@pytest.fixture
+def db(tmp_path):
+    """A fresh, migrated database that get_db() opens for the length of the test"""
+    path = str(tmp_path / "plants.db")
+    with database.use_db(path):
+        database.init_db()
+        yield path
+    database.close_pool(path)
+
+@pytest.fixture(scope="session")
+def fake_openai_server():
+    import fake_openai
+    server, base_url = fake_openai.start_server()
+    yield server, base_url
+    server.shutdown()
+
+@pytest.fixture
+def fake_openai_client(fake_openai_server, monkeypatch):
+    """Point the agent's OpenAI client at the local stand-in in fake_openai.py"""
+    from openai import OpenAI
+    import agent
+    client = OpenAI(api_key="sk-local", base_url=fake_openai_server[1])
+    monkeypatch.setattr(agent, "_client", client)
+    return fake_openai_server[0].fake
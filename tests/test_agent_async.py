@@ -0,0 +1,37 @@
+import time
+import asyncio
+
+import pytest
+
+import agent_async
+from agent_async import run_agent_conversation_async
+from intent_router import intent_router
+from tools import execute_tool
+
+@pytest.fixture
+def fake_async_client(fake_openai_server, fake_openai_client, monkeypatch):
+    from openai import AsyncOpenAI
+    monkeypatch.setattr(agent_async, "_async_client",
+                        AsyncOpenAI(api_key="sk-local", base_url=fake_openai_server[1]))
+    monkeypatch.setattr(intent_router, "enabled", False)
+    return fake_openai_client
+
+def test_tool_turn_writes_to_the_callers_database(db, fake_async_client):
+    response, tools = asyncio.run(run_agent_conversation_async("add kumquat to my wishlist", session_id="async-a"))
+    assert tools == ["add_to_wishlist"]
+    assert "kumquat" in response.lower()
+    assert "already" in execute_tool("add_to_wishlist", {"name": "kumquat"})["message"]
+
+def test_conversations_overlap_on_one_event_loop(db, fake_async_client, monkeypatch):
+    monkeypatch.setattr(fake_async_client, "latency_ms", 200)
+
+    async def run_all():
+        return await asyncio.gather(*(run_agent_conversation_async("Tell me about ferns", session_id=f"async-{i}")
+                                      for i in range(4)))
+
+    started = time.perf_counter()
+    replies = asyncio.run(run_all())
+    elapsed = time.perf_counter() - started
+    assert len({reply for reply, _ in replies}) == 1
+    # Four 200ms model calls one after another would take 0.8s
+    assert elapsed < 0.6
@@ -0,0 +1,25 @@
+import asyncio
+import threading
+import asgi
+
+def test_first_chat_initialises_the_database_off_the_event_loop(monkeypatch):
+    threads = []
+    monkeypatch.setattr(asgi, "is_initialized", lambda: False)
+    monkeypatch.setattr(asgi, "ensure_initialized", lambda: threads.append(threading.current_thread()))
+
+    async def fake_chat(scope, body, send):
+        pass
+    monkeypatch.setattr(asgi, "_chat", fake_chat)
+
+    async def receive():
+        return {"type": "http.request", "body": b'{"message": "hi"}'}
+
+    async def send(message):
+        pass
+
+    async def main():
+        await asgi.app({"type": "http", "path": "/chat", "method": "POST", "headers": []}, receive, send)
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(main())
+    assert len(threads) == 1 and threads[0] is not loop_thread
@@ -0,0 +1,47 @@
+import os
+import sys
+import json
+import sqlite3
+import subprocess
+
+
+from benchmark import compare
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _python(*args, cwd):
+    return subprocess.run([sys.executable, *args], cwd=cwd, capture_output=True, text=True, timeout=120,
+                          env=dict(os.environ, PYTHONPATH=ROOT))
+
+def test_synthetic_data_matches_the_app_schema(tmp_path):
+    path = str(tmp_path / "bench.db")
+    result = _python(os.path.join(ROOT, "synthetic_data.py"), path, "--plants", "300", "--wishlist", "7",
+                     cwd=tmp_path)
+    assert result.returncode == 0, result.stderr
+    conn = sqlite3.connect(path)
+    try:
+        counts = [conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                  for table in ("plants", "care_schedules", "wishlist")]
+        missing_due = conn.execute('SELECT COUNT(*) FROM care_schedules WHERE next_due IS NULL').fetchone()[0]
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+    finally:
+        conn.close()
+    assert counts == [300, 600, 7] and missing_due == 0
+    from database import MIGRATIONS
+    assert version == MIGRATIONS[-1][0]
+    assert _python(os.path.join(ROOT, "synthetic_data.py"), path, cwd=tmp_path).returncode != 0
+
+def test_small_run_times_every_case(tmp_path):
+    output = tmp_path / "results.json"
+    result = _python(os.path.join(ROOT, "benchmark.py"), "--sizes", "100,200", "--data-dir", str(tmp_path),
+                     "--repeat", "1", "--min-time", "0", "--output", str(output), cwd=tmp_path)
+    assert result.returncode == 0, result.stderr
+    results = json.loads(output.read_text())
+    assert set(results) == {"100", "200"}
+    assert {"get_care_schedule_tool", "build_prompt_context", "GET /api/schedule", "GET /api/schedule cached"} <= set(results["200"])
+    assert all(stats["median_ms"] >= 0 for stats in results["200"].values())
+
+def test_compare_flags_only_slowdowns_past_the_tolerance():
+    baseline = {"1000": {"a": {"median_ms": 10.0}, "b": {"median_ms": 10.0}}}
+    results = {1000: {"a": {"median_ms": 12.0}, "b": {"median_ms": 13.0}, "c": {"median_ms": 99.0}}}
+    assert compare(results, baseline, 0.25) == [(1000, "b", 10.0, 13.0)]
@@ -0,0 +1,56 @@
+import database
+from tools import execute_tool, MAX_BULK_ITEMS
+
+def _count(table):
+    conn = database.get_db()
+    try:
+        return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+    finally:
+        conn.close()
+
+def test_bulk_add_writes_plants_and_schedules_in_one_version(db):
+    version = database.get_data_version()
+    result = execute_tool("bulk_add_plants", {"plants": [
+        {"name": "Basil", "location": "kitchen", "watering_days": 2, "fertilizing_days": 14},
+        {"name": "Mint", "location": "kitchen"},
+        {"name": "Thyme", "watering_days": 4},
+    ]})
+    assert result["success"] and result["schedules_set"] == 3
+    ids = [plant["plant_id"] for plant in result["plants"]]
+    assert [plant["name"] for plant in result["plants"]] == ["Basil", "Mint", "Thyme"]
+    assert ids == list(range(ids[0], ids[0] + 3))
+    assert database.get_data_version() == version + 1
+    assert (_count("plants"), _count("care_schedules")) == (3, 3)
+
+def test_bulk_add_is_all_or_nothing(db):
+    result = execute_tool("bulk_add_plants", {"plants": [{"name": "Basil"}, {"name": "  "}]})
+    assert not result.get("success")
+    assert _count("plants") == 0
+    too_many = execute_tool("bulk_add_plants", {"plants": [{"name": "Fern"}] * (MAX_BULK_ITEMS + 1)})
+    assert not too_many.get("success")
+    assert _count("plants") == 0
+
+def test_bulk_update_upserts_and_reports_missing_plants(db):
+    ids = [plant["plant_id"] for plant in execute_tool("bulk_add_plants", {"plants": [
+        {"name": "Basil", "watering_days": 2}, {"name": "Mint"}]})["plants"]]
+    result = execute_tool("bulk_update_care_schedules", {"schedules": [
+        {"plant_id": ids[0], "watering_days": 3},
+        {"plant_id": ids[1], "watering_days": 5, "fertilizing_days": 30},
+        {"plant_id": 999, "watering_days": 1},
+    ]})
+    assert result["updated_plant_ids"] == ids and result["missing_plant_ids"] == [999]
+    assert result["schedules_set"] == 3
+    conn = database.get_db()
+    try:
+        rows = conn.execute('SELECT plant_id, task_type, frequency_days FROM care_schedules '
+                            'ORDER BY plant_id, task_type').fetchall()
+    finally:
+        conn.close()
+    assert [tuple(row) for row in rows] == [(ids[0], "watering", 3), (ids[1], "fertilizing", 30),
+                                            (ids[1], "watering", 5)]
+
+def test_bulk_update_of_unknown_plants_keeps_the_data_version(db):
+    version = database.get_data_version()
+    result = execute_tool("bulk_update_care_schedules", {"schedules": [{"plant_id": 999, "watering_days": 1}]})
+    assert not result["success"] and result["missing_plant_ids"] == [999]
+    assert database.get_data_version() == version
@@ -0,0 +1,83 @@
+import sqlite3
+from datetime import date, timedelta
+import pytest
+from database import get_db, transaction, get_data_version
+from response_cache import is_cacheable
+from tools import execute_tool
+
+def _plant_with_schedule(watering_days=3):
+    plant_id = execute_tool("add_plant", {"name": "fern"})["plant_id"]
+    execute_tool("update_care_schedule", {"plant_id": plant_id, "watering_days": watering_days})
+    return plant_id
+
+def _days_ago(days):
+    return (date.today() - timedelta(days=days)).isoformat()
+
+def test_completing_a_task_moves_its_schedule_on(db):
+    plant_id = _plant_with_schedule(watering_days=3)
+    result = execute_tool("complete_care_tasks", {"tasks": [{"plant_id": plant_id, "task_type": "watering"},
+                                                            {"plant_id": 9999, "task_type": "watering"}]})
+    assert result["success"] and result["missing_plant_ids"] == [9999]
+    assert result["completed"][0]["next_due_date"] == (date.today() + timedelta(days=3)).isoformat()
+    schedule = execute_tool("get_care_schedule", {"task_type": "watering"})["care_schedule"]
+    assert schedule[0]["days_until"] == 3
+
+def test_rollups_track_streaks_and_average_interval(db):
+    plant_id = _plant_with_schedule(watering_days=3)
+    for days in (9, 6, 3, 0):
+        execute_tool("complete_care_tasks", {"tasks": [{"plant_id": plant_id, "task_type": "watering",
+                                                        "completed_on": _days_ago(days)}]})
+    # Late, then a back-dated entry that counts but leaves the streak alone
+    execute_tool("complete_care_tasks", {"tasks": [{"plant_id": plant_id, "task_type": "watering",
+                                                    "completed_on": _days_ago(30)}]})
+    history = execute_tool("get_care_history", {"plant_id": plant_id, "recent": 2})["care_history"]
+    assert len(history) == 1
+    rollup = history[0]
+    assert rollup["completions"] == 5
+    assert rollup["current_streak"] == 4 and rollup["longest_streak"] == 4
+    assert rollup["first_completed"] == _days_ago(30)
+    assert len(rollup["recent_completions"]) == 2
+
+def test_late_completion_resets_the_streak(db):
+    plant_id = _plant_with_schedule(watering_days=3)
+    for days in (20, 17, 2):
+        execute_tool("complete_care_tasks", {"tasks": [{"plant_id": plant_id, "task_type": "watering",
+                                                        "completed_on": _days_ago(days)}]})
+    rollup = execute_tool("get_care_history", {"plant_id": plant_id})["care_history"][0]
+    assert rollup["current_streak"] == 1 and rollup["longest_streak"] == 2
+    assert rollup["average_interval_days"] == 9.0
+
+def test_future_and_malformed_dates_are_refused(db):
+    plant_id = _plant_with_schedule()
+    for completed_on in ((date.today() + timedelta(days=1)).isoformat(), "last tuesday",
+                         _days_ago(1) + "T25:00", _days_ago(1) + "garbage"):
+        result = execute_tool("complete_care_tasks", {"tasks": [{"plant_id": plant_id, "task_type": "watering",
+                                                                 "completed_on": completed_on}]})
+        assert not result["success"]
+    assert execute_tool("get_care_history", {"plant_id": plant_id})["care_history"] == []
+
+def test_writing_nothing_keeps_the_data_version(db):
+    plant_id = _plant_with_schedule()
+    version = get_data_version()
+    result = execute_tool("complete_care_tasks", {"tasks": [{"plant_id": 9999, "task_type": "watering"}]})
+    assert not result["success"] and get_data_version() == version
+    result = execute_tool("complete_care_tasks", {"tasks": [{"plant_id": plant_id, "task_type": "watering",
+                                                             "completed_on": _days_ago(1) + "T08:30"}]})
+    assert result["success"] and get_data_version() == version + 1
+
+def test_care_events_are_append_only(db):
+    plant_id = _plant_with_schedule()
+    execute_tool("complete_care_tasks", {"tasks": [{"plant_id": plant_id, "task_type": "watering"}]})
+    for statement in ("DELETE FROM care_events", "UPDATE care_events SET task_type = 'fertilizing'"):
+        with pytest.raises(sqlite3.IntegrityError, match="append-only"):
+            with transaction() as conn:
+                conn.execute(statement)
+    conn = get_db()
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM care_events").fetchone()[0] == 1
+    finally:
+        conn.close()
+
+def test_history_only_turns_are_cacheable():
+    assert is_cacheable(["get_care_history", "get_care_schedule"])
+    assert not is_cacheable(["get_care_history", "complete_care_tasks"])
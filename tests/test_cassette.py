@@ -0,0 +1,79 @@
+import os
+import sys
+import json
+import subprocess
+
+import httpx
+
+from cassette import Cassette, CassetteTransport, request_key
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _post(client, body):
+    return client.post("https://api.openai.test/v1/chat/completions", content=json.dumps(body))
+
+def test_key_ignores_key_order_and_whitespace():
+    first = request_key("POST", "/v1/chat/completions", b'{"model": "m", "messages": []}')
+    second = request_key("POST", "/v1/chat/completions", b'{"messages":[],"model":"m"}')
+    assert first == second
+    assert first != request_key("POST", "/v1/chat/completions", b'{"messages":[],"model":"other"}')
+
+def test_records_then_replays_without_the_network(tmp_path):
+    path = str(tmp_path / "calls.jsonl")
+    calls = []
+
+    def api(request):
+        calls.append(request)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "hi"}}]})
+
+    body = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "hello"}]}
+    recorder = httpx.Client(transport=CassetteTransport(Cassette(path, "record"), httpx.MockTransport(api)))
+    assert _post(recorder, body).json()["choices"][0]["message"]["content"] == "hi"
+
+    replayer = Cassette(path, "replay")
+    client = httpx.Client(transport=CassetteTransport(replayer, httpx.MockTransport(api)))
+    assert _post(client, body).json()["choices"][0]["message"]["content"] == "hi"
+    assert len(calls) == 1
+
+    body["messages"].append({"role": "user", "content": "hello"})
+    missed = _post(client, body)
+    assert missed.status_code == 404
+    assert "messages (count 2 vs 1)" in missed.json()["error"]["message"]
+    assert replayer.stats()["hits"] == 1 and replayer.stats()["misses"] == 1
+
+def _pinned_run(script):
+    # evaluation.py pins SAGE_TODAY itself
+    env = dict(os.environ, SAGE_CASSETTE_MODE="off")
+    env.pop("SAGE_TODAY", None)
+    return subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True).stdout.splitlines()[-1]
+
+def test_pinned_date_keeps_evaluation_requests_stable(tmp_path):
+    # What the model is sent for a turn: the prompt context and a schedule lookup
+    script = f"""
+import json, evaluation
+from database import use_db
+from tools import execute_tool
+from prompt_context import build_context
+path = evaluation.clone_database(None, {str(tmp_path)!r})
+with use_db(path):
+    schedule = execute_tool("get_care_schedule", {{"within_days": 7}})
+    context, _ = build_context("Anything I need to water today?", {{}})
+print(json.dumps([schedule, context]))
+"""
+    first = _pinned_run(script)
+    schedule, context = json.loads(first)
+    assert {row["current_date"] for row in schedule["care_schedule"]} == {"2025-12-18"}
+    assert schedule["care_schedule"][0] == {
+        "plant_id": 3, "plant_name": "petunias", "location": "outdoor, sunny side", "task_type": "watering",
+        "frequency_days": 3, "last_completed": "2025-12-15T22:50:24.496599", "next_due_date": "2025-12-18",
+        "days_until": 0, "status": "due_today", "current_date": "2025-12-18"}
+    assert '"days_until":0' in context
+    assert _pinned_run(script) == first
+
+def test_memory_compacts_in_line_under_a_cassette():
+    script = "import conversation_memory; print(conversation_memory.conversation_memory.background)"
+    for mode, background in (("record", "False"), ("replay", "False"), ("off", "True")):
+        output = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=dict(os.environ, SAGE_CASSETTE_MODE=mode),
+                                capture_output=True, text=True, check=True).stdout
+        assert output.strip() == background
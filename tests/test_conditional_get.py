@@ -0,0 +1,49 @@
+import pytest
+
+import app as sage_app
+import database
+from payload_cache import payload_cache
+from tools import execute_tool
+
+@pytest.fixture
+def client(db):
+    payload_cache.clear()
+    return sage_app.app.test_client()
+
+def test_unchanged_data_is_not_sent_again(client):
+    execute_tool("add_to_wishlist", {"name": "Kumquat"})
+    first = client.get("/api/wishlist")
+    assert first.status_code == 200 and first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+    again = client.get("/api/wishlist", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304 and again.data == b""
+    since = client.get("/api/wishlist", headers={"If-Modified-Since": first.headers["Last-Modified"]})
+    assert since.status_code == 304
+
+def test_a_write_changes_the_etag(client):
+    first = client.get("/api/wishlist")
+    execute_tool("add_to_wishlist", {"name": "Kumquat"})
+    changed = client.get("/api/wishlist", headers={"If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != first.headers["ETag"]
+    assert [item["name"] for item in changed.get_json()] == ["Kumquat"]
+
+def test_schedule_etag_includes_the_date(client):
+    etag = client.get("/api/schedule").headers["ETag"]
+    assert sage_app.clock.today().isoformat() in etag
+
+def test_bodies_are_built_once_per_version(client):
+    execute_tool("add_to_wishlist", {"name": "Kumquat"})
+    hits = payload_cache.stats()["hits"]
+    assert client.get("/api/wishlist").data == client.get("/api/wishlist").data
+    assert payload_cache.stats()["hits"] == hits + 1
+
+def test_databases_at_the_same_version_do_not_share_bodies(client, tmp_path):
+    execute_tool("add_to_wishlist", {"name": "Kumquat"})
+    assert len(client.get("/api/wishlist").get_json()) == 1
+    other = str(tmp_path / "other.db")
+    with database.use_db(other):
+        database.init_db()
+        execute_tool("add_to_wishlist", {"name": "Aloe"})
+        assert [item["name"] for item in client.get("/api/wishlist").get_json()] == ["Aloe"]
+    database.close_pool(other)
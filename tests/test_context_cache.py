@@ -0,0 +1,37 @@
+import database
+from tools import execute_tool, get_plants_context_versioned, context_cache_stats
+
+def _counts():
+    stats = context_cache_stats()
+    return stats["hits"], stats["misses"]
+
+def test_context_is_reused_until_the_data_changes(db):
+    execute_tool("add_plant", {"name": "Fern"})
+    version, context = get_plants_context_versioned()
+    hits, misses = _counts()
+    assert get_plants_context_versioned() == (version, context)
+    assert get_plants_context_versioned()[1] is context
+    assert _counts() == (hits + 2, misses)
+
+    execute_tool("add_to_wishlist", {"name": "Kumquat"})
+    new_version, new_context = get_plants_context_versioned()
+    assert new_version == version + 1
+    assert [item["name"] for item in new_context["wishlist"]] == ["Kumquat"]
+    assert _counts() == (hits + 2, misses + 1)
+
+def test_writes_from_other_connections_are_seen(db):
+    execute_tool("add_plant", {"name": "Fern"})
+    get_plants_context_versioned()
+    with database.transaction() as conn:
+        conn.execute("UPDATE plants SET name = 'Boston Fern'")
+        database.bump_data_version(conn)
+    assert [plant["name"] for plant in get_plants_context_versioned()[1]["plants"]] == ["Boston Fern"]
+
+def test_each_database_has_its_own_context(db, tmp_path):
+    execute_tool("add_plant", {"name": "Fern"})
+    other = str(tmp_path / "other.db")
+    with database.use_db(other):
+        database.init_db()
+        assert get_plants_context_versioned()[1]["plants"] == []
+    database.close_pool(other)
+    assert len(get_plants_context_versioned()[1]["plants"]) == 1
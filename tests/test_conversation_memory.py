@@ -0,0 +1,97 @@
+from conversation_memory import ConversationMemory
+from database import transaction, get_db
+
+def _memory(**settings):
+    settings.setdefault("summarize", lambda summary, messages: f"{len(messages)} more messages")
+    return ConversationMemory(enabled=True, **settings)
+
+def _turn(memory, session_id, user, assistant="ok"):
+    memory.record_turn(session_id, {"conversation_history": [
+        {"role": "user", "content": user}, {"role": "assistant", "content": assistant}]})
+
+def _backdate(session_id, seconds):
+    with transaction() as conn:
+        conn.execute('UPDATE conversation_messages SET created_at = created_at - ? WHERE session_id = ?',
+                     (seconds, session_id))
+        conn.execute('UPDATE conversation_summaries SET updated_at = updated_at - ? WHERE session_id = ?',
+                     (seconds, session_id))
+
+def _message_count(session_id):
+    conn = get_db()
+    try:
+        return conn.execute('SELECT COUNT(*) FROM conversation_messages WHERE session_id = ?',
+                            (session_id,)).fetchone()[0]
+    finally:
+        conn.close()
+
+def test_history_is_oldest_first(db):
+    memory = _memory()
+    _turn(memory, "s1", "I have a fern")
+    _turn(memory, "s1", "it is in the kitchen")
+    history, tokens = memory.history("s1")
+    assert [message["content"] for message in history] == ["I have a fern", "ok", "it is in the kitchen", "ok"]
+    assert tokens > 0
+    assert memory.history("s2") == ([], 0)
+    assert _message_count("s1") == 4
+
+def test_compaction_folds_older_messages_into_the_summary(db):
+    memory = _memory(recent_tokens=10, compact_tokens=10000)
+    for i in range(6):
+        _turn(memory, "s1", f"message number {i} " + "x" * 40)
+    assert memory.compact("s1")
+    history, _ = memory.history("s1")
+    assert history[0]["role"] == "system" and "more messages" in history[0]["content"]
+    assert history[-1]["content"] == "ok"
+    assert len(history) < 12
+    assert not memory.compact("s1")
+
+def test_long_sessions_compact_in_the_background(db):
+    memory = _memory(recent_tokens=10, compact_tokens=40)
+    for i in range(6):
+        _turn(memory, "s1", f"message number {i} " + "x" * 40)
+    memory._executor.shutdown(wait=True)
+    assert memory.stats()["compactions"] >= 1
+    assert memory.history("s1")[0][0]["role"] == "system"
+
+def test_compaction_runs_in_line_when_not_in_the_background(db):
+    memory = _memory(recent_tokens=10, compact_tokens=40, background=False)
+    _turn(memory, "s1", "message number 0 " + "x" * 200)
+    # Done by the time the turn is recorded, so the next turn always sees the summary
+    assert memory.stats()["compactions"] == 1
+    assert memory.history("s1")[0][0]["role"] == "system"
+
+def test_compaction_falls_back_without_the_model(db):
+    def unavailable(summary, messages):
+        raise RuntimeError("no model")
+    memory = _memory(recent_tokens=5, summarize=unavailable)
+    _turn(memory, "s1", "my basil is on the balcony")
+    _turn(memory, "s1", "thanks")
+    assert memory.compact("s1")
+    assert "User said: my basil is on the balcony" in memory.history("s1")[0][0]["content"]
+    assert memory.stats()["fallbacks"] == 1
+
+def test_prune_keeps_sessions_that_are_still_active(db):
+    memory = _memory(ttl_seconds=3600, recent_tokens=5)
+    _turn(memory, "active", "started long ago")
+    _turn(memory, "active", "and kept going")
+    memory.compact("active")
+    _backdate("active", 7200)
+    _turn(memory, "active", "still here")
+    _turn(memory, "idle", "gone quiet")
+    _backdate("idle", 7200)
+
+    memory.prune()
+    assert _message_count("active") == 6
+    assert memory.history("active")[0][0]["role"] == "system"
+    assert _message_count("idle") == 0
+    assert memory.history("idle") == ([], 0)
+    assert memory.stats()["expired"] == 2
+
+def test_prune_drops_an_idle_session_with_its_summary(db):
+    memory = _memory(ttl_seconds=3600, recent_tokens=5)
+    _turn(memory, "s1", "first")
+    _turn(memory, "s1", "second")
+    memory.compact("s1")
+    _backdate("s1", 7200)
+    memory.prune()
+    assert memory.history("s1") == ([], 0)
@@ -0,0 +1,35 @@
+import sqlite3
+import pytest
+import database
+
+def test_connections_are_pooled_in_wal_mode(db):
+    conn = database.get_db()
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    conn.close()
+    assert database.get_db() is conn
+    conn.close()
+    stats = database.pool_stats()
+    assert stats["created"] == 1 and stats["reused"] >= 1 and stats["in_use"] == 0
+
+def test_release_rolls_back_open_transaction(db):
+    conn = database.get_db()
+    conn.execute('BEGIN')
+    conn.execute("INSERT INTO plants (name) VALUES ('fern')")
+    conn.close()
+    conn = database.get_db()
+    try:
+        assert conn.execute('SELECT COUNT(*) FROM plants').fetchone()[0] == 0
+    finally:
+        conn.close()
+    assert database.pool_stats()["rollbacks_on_release"] == 1
+
+def test_close_pool_closes_connections_released_afterwards(db):
+    pool = database.get_pool()
+    checked_out = database.get_db()
+    database.close_pool(db)
+    checked_out.close()
+    assert pool.stats()["idle"] == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        checked_out.execute('SELECT 1')
+    # A new pool takes over the path
+    assert database.get_pool() is not pool
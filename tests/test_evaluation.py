@@ -0,0 +1,60 @@
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# evaluation.py sets process-wide environment on import, so it runs in its own interpreter
+SCRIPT = """
+import json, os, sys, tempfile, threading
+import fake_openai
+script = [(r"potatoes", "add_plant", {"name": "potatoes", "location": "balcony"})] + fake_openai.DEFAULT_SCRIPT
+server, base_url = fake_openai.start_server(script=script)
+os.environ["SAGE_OPENAI_BASE_URL"] = base_url
+import evaluation
+from database import use_db, get_db
+cases = evaluation.build_tool_test_cases(workers=3)
+with tempfile.TemporaryDirectory() as directory:
+    paths = [evaluation.clone_database(None, directory) for _ in range(2)]
+    with use_db(paths[0]):
+        conn = get_db()
+        conn.execute("DELETE FROM plants")
+        conn.commit()
+        conn.close()
+    counts = []
+    for path in paths:
+        with use_db(path):
+            conn = get_db()
+            counts.append(conn.execute("SELECT COUNT(*) FROM plants").fetchone()[0])
+            conn.close()
+print(json.dumps({"cases": [[case.input, [tool.name for tool in case.tools_called],
+                             [tool.name for tool in case.expected_tools]] for case in cases],
+                  "inputs": [case[0] for case in evaluation.TOOL_CASES], "counts": counts, "requests": server.fake.stats["requests"]}))
+"""
+
+def test_cases_run_concurrently_on_their_own_databases():
+    env = dict(os.environ, OPENAI_API_KEY="sk-local", SAGE_CASSETTE_MODE="off")
+    result = subprocess.run([sys.executable, "-c", SCRIPT], cwd=ROOT, env=env, capture_output=True, text=True,
+                            timeout=120)
+    assert result.returncode == 0, result.stderr[-2000:]
+    report = json.loads(result.stdout.splitlines()[-1])
+    assert [case[0] for case in report["cases"]] == report["inputs"]
+    # The model (here the stand-in) answers every case: no local routing under evaluation
+    for _, called, expected in report["cases"]:
+        assert called == expected
+    assert report["requests"] >= len(report["cases"])
+    assert report["counts"] == [0, 14]
+
+def test_missing_source_database_is_an_error(tmp_path):
+    script = ("import evaluation, sys\n"
+              "try:\n"
+              "    evaluation.clone_database(sys.argv[1], sys.argv[2])\n"
+              "except FileNotFoundError as error:\n"
+              "    print(error)\n")
+    missing = str(tmp_path / "missing.db")
+    result = subprocess.run([sys.executable, "-c", script, missing, str(tmp_path)], cwd=ROOT,
+                            env=dict(os.environ, OPENAI_API_KEY="sk-local"), capture_output=True, text=True, timeout=60)
+    assert result.stdout.strip() == f"Database to evaluate not found: {missing}"
+    assert not os.path.exists(missing)
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,54 @@
+import pytest
+
+import fast_replies
+from fast_replies import render_reply
+from intent_router import intent_router
+from agent import run_agent_conversation
+
+ADDED = ("add_plant", {"name": "Basil"}, {"success": True, "plant_id": 1, "message": "Added Basil to your collection"})
+REMOVED = ("remove_from_wishlist", {"name": "Basil"}, {"message": "Removed Basil from your wishlist"})
+WISHLIST = ("add_to_wishlist", {"name": "Kumquat"}, {"message": "Added Kumquat to your wishlist"})
+
+def test_outcomes_render_in_order():
+    reply = render_reply("I got basil, drop it and add a kumquat", [REMOVED, WISHLIST], enabled=True)
+    assert reply == "Removed Basil from your wishlist. Added Kumquat to your wishlist."
+
+def test_added_plants_without_schedules_go_to_the_model():
+    # The model offers a care schedule with suggested intervals, as SYSTEM_PROMPT asks
+    assert render_reply("add basil", [ADDED], enabled=True) is None
+    bulk = ("bulk_add_plants", {"plants": [{"name": "Basil"}]},
+            {"success": True, "message": "Added 1 plant", "schedules_set": 0})
+    assert render_reply("add basil", [WISHLIST, bulk], enabled=True) is None
+    bulk[2]["schedules_set"] = 1
+    assert render_reply("add basil", [bulk], enabled=True) == "Added 1 plant. Their care schedules are set too."
+
+def test_schedule_update_names_the_intervals():
+    outcome = ("update_care_schedule", {"plant_id": 1, "watering_days": 3, "fertilizing_days": 14},
+               {"success": True, "message": "Care schedule updated"})
+    assert render_reply("water basil every 3 days, feed it every 14", [outcome], enabled=True) == \
+        "Care schedule updated: water every 3 days and fertilize every 14 days."
+
+@pytest.mark.parametrize("message, outcomes", [
+    ("How often should I water basil?", [ADDED]),
+    ("add basil", [("get_care_schedule", {}, {"care_schedule": []})]),
+    ("add basil", [("add_plant", {"name": "Basil"}, {"error": "Invalid arguments"})]),
+    ("add basil", []),
+])
+def test_anything_needing_judgement_goes_to_the_model(message, outcomes):
+    assert render_reply(message, outcomes, enabled=True) is None
+
+def test_disabled_renders_nothing():
+    assert render_reply("add kumquat to my wishlist", [WISHLIST], enabled=False) is None
+
+def test_templated_turn_makes_one_model_call(db, fake_openai_client, monkeypatch):
+    monkeypatch.setattr(intent_router, "enabled", False)
+    monkeypatch.setattr(fast_replies, "FAST_REPLIES_ENABLED", True)
+    requests = fake_openai_client.stats["requests"]
+    response, tools = run_agent_conversation("add kumquat to my wishlist", session_id="fast")
+    assert tools == ["add_to_wishlist"]
+    assert response == "Added kumquat to your wishlist."
+    assert fake_openai_client.stats["requests"] == requests + 1
+
+    monkeypatch.setattr(fast_replies, "FAST_REPLIES_ENABLED", False)
+    run_agent_conversation("add aloe to my wishlist", session_id="slow")
+    assert fake_openai_client.stats["requests"] == requests + 3
@@ -0,0 +1,60 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+from intent_router import IntentRouter, classify, SCHEDULE_INTENT, WISHLIST_INTENT
+from tools import execute_tool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.mark.parametrize("message, intent, slots", [
+    ("Anything I need to water today?", SCHEDULE_INTENT, {"task_type": "watering", "within_days": 0}),
+    ("anything to fertilize this week?", SCHEDULE_INTENT, {"task_type": "fertilizing", "within_days": 7}),
+    ("what's overdue?", SCHEDULE_INTENT, {"task_type": None, "status": "overdue"}),
+    ("what is on my wishlist?", WISHLIST_INTENT, {}),
+])
+def test_classifies_lookups(message, intent, slots):
+    found, confidence, found_slots = classify(message)
+    assert (found, found_slots) == (intent, slots)
+    assert confidence >= 0.8
+
+@pytest.mark.parametrize("message", [
+    "Why are my leaves yellow?",
+    "water today and add a fern",
+    "is my monstera due for water?",
+    "I bought a new pothos",
+    "I watered the plants today, what's due tomorrow?",
+    "Did I water today?",
+    "have I watered this week?",
+    "Are my plants watered?",
+    "I just fed everything, anything else due?",
+])
+def test_hands_off_anything_else(message):
+    intent, confidence, _ = classify(message)
+    assert intent is None or confidence < 0.8
+
+def test_routes_schedule_lookup_locally(db):
+    plant_id = execute_tool("add_plant", {"name": "Basil"})["plant_id"]
+    execute_tool("update_care_schedule", {"plant_id": plant_id, "watering_days": 1})
+    router = IntentRouter(enabled=True)
+    reply, tools_used, intent = router.route("anything to water tomorrow?", execute_tool)
+    assert "**Basil**: watering" in reply
+    assert tools_used == ["get_care_schedule"] and intent == SCHEDULE_INTENT
+    assert router.route("why is my basil wilting?", execute_tool) is None
+    stats = router.stats()
+    assert (stats["routed"], stats["handed_off"]) == (1, 1)
+
+def test_disabled_router_answers_nothing(db):
+    assert IntentRouter(enabled=False).route("what is on my wishlist?", execute_tool) is None
+
+def test_router_and_fast_replies_are_off_under_evaluation():
+    env = dict(os.environ, DEEPEVAL_EVAL_MODE="true")
+    env.pop("SAGE_INTENT_ROUTER", None)
+    env.pop("SAGE_FAST_REPLIES", None)
+    script = ("import intent_router, fast_replies; "
+              "print(intent_router.intent_router.enabled, fast_replies.FAST_REPLIES_ENABLED)")
+    output = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    assert output.split() == ["False", "False"]
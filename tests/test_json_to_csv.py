@@ -0,0 +1,116 @@
+import io
+import csv
+import json
+
+import pytest
+
+import json_to_csv
+from json_to_csv import StreamReader, iter_rows, convert_deepeval_results, MetricSummary
+
+def _metric(name, score, success=True, reason="fine"):
+    return {"name": name, "score": score, "threshold": 0.5, "success": success, "reason": reason}
+
+TEST_RUN = {
+    "testFile": "evaluation.py",
+    "testRunData": {
+        "testCases": [
+            {"name": "test_case_0", "success": True, "metricsData": [_metric("Tool Correctness", 1.0)]},
+            {"name": "test_case_1", "success": False,
+             "metricsData": [_metric("Tool Correctness", 0.0, False, "x" * 300)]},
+        ],
+        "conversationalTestCases": [
+            {"name": "conversation_0", "success": True,
+             "metricsData": [_metric("Goal Accuracy", 0.9), _metric("Turn Relevancy", 0.75)]},
+        ],
+        "metricsScores": [{"metric": "ignored", "scores": [1, 2, 3]}],
+    },
+}
+
+CACHE = {"test_cases_lookup_map": {
+    json.dumps({"input": "Anything I need to water today?"}): {
+        "cached_metrics_data": [{"metric_data": _metric("Tool Correctness", 1.0)}]},
+}}
+
+def _write(tmp_path, name, payload):
+    path = tmp_path / name
+    path.write_text(json.dumps(payload, indent=2))
+    return str(path)
+
+def test_rows_from_a_test_run():
+    rows = list(iter_rows(io.StringIO(json.dumps(TEST_RUN))))
+    assert [(row["test_case"], row["metric_name"], row["metric_score"]) for row in rows] == [
+        ("regular_0", "Tool Correctness", 1.0),
+        ("regular_1", "Tool Correctness", 0.0),
+        ("conversational_0", "Goal Accuracy", 0.9),
+        ("conversational_0", "Turn Relevancy", 0.75),
+    ]
+    assert rows[1]["metric_reason"] == "x" * 200 + "..."
+
+def test_rows_from_a_cache_file():
+    rows = list(iter_rows(io.StringIO(json.dumps(CACHE))))
+    assert rows == [{"test_case": "test_case1", "prompt": "Anything I need to water today?", "success": True,
+                     "metric_name": "Tool Correctness", "metric_score": 1.0, "metric_threshold": 0.5,
+                     "metric_success": True, "metric_reason": "fine"}]
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_small_reads_give_the_same_rows(monkeypatch, chunk_size):
+    text = json.dumps(TEST_RUN, indent=1)
+    expected = list(iter_rows(io.StringIO(text)))
+    monkeypatch.setattr(json_to_csv, "CHUNK_SIZE", chunk_size)
+    assert list(iter_rows(io.StringIO(text))) == expected
+
+@pytest.mark.parametrize("chunk_size", range(1, 12))
+def test_reader_decodes_numbers_split_across_reads(chunk_size):
+    text = '[12345678, -0.125e3, 0.8333, 1E-5, 2.5e+2, true, "a"]'
+    reader = StreamReader(io.StringIO(text), chunk_size=chunk_size)
+    assert [reader.value() for _ in reader.items()] == json.loads(text)
+
+def test_truncated_input_is_an_error():
+    with pytest.raises(ValueError):
+        list(iter_rows(io.StringIO('{"testRunData": {"testCases": [{"name": "a"')))
+
+def test_csv_output_and_summary(tmp_path):
+    out = str(tmp_path / "results.csv")
+    summary = convert_deepeval_results(_write(tmp_path, "run.json", TEST_RUN), out)
+    with open(out, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 4 and rows[0]["metric_name"] == "Tool Correctness"
+    assert summary["rows"] == 4 and summary["test_cases"] == 3
+    assert summary["metrics"]["Tool Correctness"]["pass_rate"] == 0.5
+
+def test_empty_run_still_writes_a_header(tmp_path):
+    out = str(tmp_path / "empty.csv")
+    convert_deepeval_results(_write(tmp_path, "run.json", {"testRunData": {"testCases": []}}), out)
+    assert open(out).read().strip() == ",".join(json_to_csv.RUN_FIELDS)
+
+def test_empty_cache_writes_the_cache_header(tmp_path):
+    out = str(tmp_path / "empty.csv")
+    convert_deepeval_results(_write(tmp_path, "cache.json", {"test_cases_lookup_map": {}}), out)
+    header = open(out).read().strip()
+    assert header == ",".join(json_to_csv.CACHE_FIELDS) and "prompt" in header
+
+def test_jsonl_and_columnar_hold_the_same_rows(tmp_path):
+    source = _write(tmp_path, "run.json", TEST_RUN)
+    convert_deepeval_results(source, str(tmp_path / "rows.jsonl"))
+    convert_deepeval_results(source, str(tmp_path / "columns.json"))
+    rows = [json.loads(line) for line in open(tmp_path / "rows.jsonl")]
+    table = json.load(open(tmp_path / "columns.json"))
+    assert table["rows"] == len(rows) == 4
+    columns = {}
+    for field, column in table["columns"].items():
+        if "dictionary" in column:
+            columns[field] = [column["dictionary"][code] for code in column["codes"]]
+        else:
+            columns[field] = column["values"]
+    assert [dict(zip(columns, values)) for values in zip(*columns.values())] == rows
+    assert "dictionary" in table["columns"]["metric_name"]
+
+def test_percentiles_are_within_a_bin():
+    summary = MetricSummary()
+    for score in range(101):
+        summary.add(score / 100, score >= 50)
+    result = summary.as_dict()
+    assert result["passed"] == 51
+    assert abs(result["p50_score"] - 0.5) <= 0.011
+    assert abs(result["p90_score"] - 0.9) <= 0.011
+    assert (result["min_score"], result["max_score"]) == (0.0, 1.0)
@@ -0,0 +1,50 @@
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+from fake_openai import FakeOpenAI
+from loadtest import percentile, parse_mix
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _ask(fake, text, tools=True):
+    return fake.respond({"messages": [{"role": "user", "content": text}], "tools": [{}] if tools else None})
+
+def test_fake_calls_the_scripted_tool():
+    message, finish = _ask(FakeOpenAI(), "Add basil to my wishlist")
+    assert finish == "tool_calls"
+    call = message["tool_calls"][0]["function"]
+    assert (call["name"], json.loads(call["arguments"])) == ("add_to_wishlist", {"name": "basil"})
+    message, _ = _ask(FakeOpenAI(), "add a fern in the bathroom")
+    assert json.loads(message["tool_calls"][0]["function"]["arguments"]) == {"name": "fern", "location": "bathroom"}
+
+def test_fake_phrases_tool_results_and_small_talk():
+    fake = FakeOpenAI()
+    reply, finish = fake.respond({"messages": [
+        {"role": "user", "content": "what is due?"},
+        {"role": "tool", "content": json.dumps({"care_schedule": [{"days_until": -1}, {"days_until": 2}]})},
+    ]})
+    assert finish == "stop"
+    assert reply["content"] == "You have 2 care tasks scheduled and 1 of them are overdue."
+    assert _ask(fake, "hello there")[1] == "stop"
+    assert _ask(fake, "what is due?", tools=False)[1] == "stop"
+    assert fake.stats == {"requests": 3, "tool_calls": 0, "replies": 3, "streams": 0}
+
+def test_percentile_and_mix():
+    assert percentile([1, 2, 3, 4], 50) == 2 and percentile([1, 2, 3, 4], 99) == 4 and percentile([], 95) == 0.0
+    assert parse_mix("chat=2,schedule") == ["chat", "chat", "schedule"]
+    with pytest.raises(ValueError):
+        parse_mix("chat,admin")
+
+def test_local_run_has_no_errors():
+    result = subprocess.run(
+        [sys.executable, "loadtest.py", "--local", "--requests", "20", "--concurrency", "2",
+         "--fake-latency-ms", "0", "--fake-jitter-ms", "0", "--json", "--max-error-rate", "0"],
+        cwd=ROOT, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr[-2000:]
+    report = json.loads(result.stdout)
+    assert report["overall"]["requests"] == 20 and report["overall"]["errors"] == 0
+    assert set(report["endpoints"]) == {"chat", "schedule", "wishlist"}
@@ -0,0 +1,24 @@
+import metrics
+from agent import stream_agent_conversation
+
+def _token_sum(call, kind):
+    series = metrics.LLM_TOKENS._series.get((call, kind))
+    return series[-1] if series else 0
+
+def test_streamed_turns_record_token_usage(db, fake_openai_client):
+    before = _token_sum("first", "prompt")
+    events = list(stream_agent_conversation("Tell me about caring for a monstera", session_id="metrics"))
+    assert events[-1][0] == "done"
+    assert _token_sum("first", "prompt") > before
+
+def test_breakdown_collects_stages():
+    metrics.begin_breakdown()
+    try:
+        with metrics.stage("router"):
+            pass
+        metrics.record_stage("tool", 0.002, "add_plant")
+        breakdown = metrics.current_breakdown()
+    finally:
+        metrics.end_breakdown()
+    assert set(breakdown) == {"router", "tool:add_plant"}
+    assert 'sage_agent_stage_seconds_count{stage="tool",tool="add_plant"}' in metrics.render()
@@ -0,0 +1,70 @@
+import sqlite3
+
+import database
+from database import MIGRATIONS, use_db, init_db, schema_version, close_pool
+
+LEGACY_SCHEMA = """
+CREATE TABLE plants (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, scientific_name TEXT,
+                     species TEXT, location TEXT, notes TEXT, created_at TEXT, status TEXT DEFAULT 'alive');
+CREATE TABLE care_schedules (id INTEGER PRIMARY KEY AUTOINCREMENT, plant_id INTEGER, task_type TEXT,
+                             frequency_days INTEGER, last_completed TEXT);
+CREATE TABLE wishlist (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, notes TEXT, created_at TEXT);
+INSERT INTO plants (name, created_at) VALUES ('Fern', '2025-01-01T10:00:00');
+INSERT INTO care_schedules (plant_id, task_type, frequency_days, last_completed)
+    VALUES (1, 'watering', 7, '2025-01-01T10:00:00');
+INSERT INTO care_schedules (plant_id, task_type, frequency_days, last_completed)
+    VALUES (1, 'watering', 3, '2025-01-05T10:00:00');
+"""
+
+def _indexes(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+def test_new_database_gets_every_migration(db):
+    conn = database.get_db()
+    try:
+        assert schema_version(conn) == MIGRATIONS[-1][0]
+        assert {"idx_care_schedules_plant_task", "idx_care_schedules_next_due",
+                "idx_wishlist_name_lower"} <= _indexes(conn)
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == "wal"
+    finally:
+        conn.close()
+    assert init_db() == []
+
+def test_legacy_database_is_upgraded_in_place(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.close()
+
+    with use_db(path):
+        applied = init_db()
+        assert [version for version, _ in applied] == [version for version, _, _ in MIGRATIONS]
+        conn = database.get_db()
+        try:
+            # The duplicate schedule is folded into the newest one before the unique index is built
+            rows = conn.execute('SELECT frequency_days, next_due FROM care_schedules').fetchall()
+            assert [tuple(row) for row in rows] == [(3, "2025-01-08")]
+            assert conn.execute('SELECT name FROM plants').fetchone()[0] == "Fern"
+        finally:
+            conn.close()
+    close_pool(path)
+
+def test_migrations_resume_from_the_recorded_version(tmp_path):
+    path = str(tmp_path / "partial.db")
+    with use_db(path):
+        for version, _, migration in MIGRATIONS[:5]:
+            with database.transaction() as conn:
+                migration(conn)
+                conn.execute(f'PRAGMA user_version = {version}')
+        applied = init_db()
+    close_pool(path)
+    assert [version for version, _ in applied] == [version for version, _, _ in MIGRATIONS[5:]]
+
+def test_next_due_follows_schedule_writes(db):
+    with database.transaction() as conn:
+        conn.execute("INSERT INTO plants (name) VALUES ('Basil')")
+        conn.execute("INSERT INTO care_schedules (plant_id, task_type, frequency_days, last_completed) "
+                     "VALUES (1, 'watering', 2, '2025-03-01T08:00:00')")
+        conn.execute("UPDATE care_schedules SET frequency_days = 5")
+        next_due = conn.execute('SELECT next_due FROM care_schedules').fetchone()[0]
+    assert next_due == "2025-03-06"
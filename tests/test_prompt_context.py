@@ -0,0 +1,81 @@
+import re
+import json
+from datetime import date, timedelta
+
+import prompt_context
+from prompt_context import build_context, estimate_tokens
+from tools import execute_tool
+
+def _add_plants(count, **extra):
+    plants = [dict({"name": f"Fern {i}", "watering_days": 1 + i % 30}, **extra) for i in range(count)]
+    return execute_tool("bulk_add_plants", {"plants": plants})["plants"]
+
+def _section(context_str, label):
+    match = re.search(re.escape(label) + r" \(showing (\d+) of (\d+)\): (\[.*\])", context_str)
+    return int(match.group(1)), int(match.group(2)), json.loads(match.group(3))
+
+def test_context_stays_within_budget(db):
+    _add_plants(300)
+    for budget in (100, 400, 1500):
+        context_str, info = build_context("hello", {}, budget=budget)
+        assert info["context_tokens"] <= budget
+        assert estimate_tokens(context_str) == info["context_tokens"]
+    _, total, _ = _section(context_str, "User's current plants")
+    assert total == 300
+
+def test_soonest_due_schedules_come_first(db):
+    _add_plants(300)
+    today = date.today()
+    context_str, _ = build_context("hello", {}, budget=400, today=today)
+    shown, total, schedules = _section(context_str, "Care schedules")
+    assert 0 < shown < total
+    every_schedule = sorted(1 + i % 30 for i in range(300))
+    assert [schedule["days_until"] for schedule in schedules] == every_schedule[:shown]
+
+def test_mentioned_plant_outranks_due_ones(db):
+    _add_plants(300)
+    plant_id = execute_tool("add_plant", {"name": "Calathea"})["plant_id"]
+    execute_tool("update_care_schedule", {"plant_id": plant_id, "watering_days": 25})
+    context_str, info = build_context("how is my calathea doing?", {}, budget=200)
+    assert info["mentioned_plant_ids"] == [plant_id]
+    _, _, plants = _section(context_str, "User's current plants")
+    _, _, schedules = _section(context_str, "Care schedules")
+    assert plants[0]["id"] == plant_id
+    assert schedules[0]["plant_id"] == plant_id
+
+def test_focus_plant_from_conversation_is_included(db):
+    added = _add_plants(300)
+    focus = added[150]["plant_id"]
+    context_str, _ = build_context("and when should I feed it?", {"last_mentioned_plant_id": focus}, budget=200)
+    _, _, plants = _section(context_str, "User's current plants")
+    assert focus in [plant["id"] for plant in plants]
+
+def test_day_split_follows_the_date(db):
+    _add_plants(40)
+    today = date.today()
+    build_context("hello", {}, today=today)
+    index = prompt_context._get_index()
+    assert index["day"][0] == today
+    later = today + timedelta(days=60)
+    _, _, schedules = _section(build_context("hello", {}, budget=5000, today=later)[0], "Care schedules")
+    assert index["day"][0] == later
+    assert all(schedule["days_until"] < 0 for schedule in schedules)
+
+def test_new_data_rebuilds_the_index(db):
+    _add_plants(5)
+    first = prompt_context._get_index()
+    assert prompt_context._get_index() is first
+    execute_tool("add_plant", {"name": "Cactus"})
+    second = prompt_context._get_index()
+    assert second is not first
+    assert len(second["plants"]) == 6
+
+def test_every_schedule_names_its_plant(db):
+    added = _add_plants(150, location="Balcony")
+    names = {plant["plant_id"]: f"Fern {i}" for i, plant in enumerate(added)}
+    context_str, _ = build_context("anything to water today?", {})
+    _, _, schedules = _section(context_str, "Care schedules")
+    assert schedules
+    for schedule in schedules:
+        assert schedule["plant_name"] == names[schedule["plant_id"]]
+        assert schedule["location"] == "Balcony"
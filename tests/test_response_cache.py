@@ -0,0 +1,60 @@
+from datetime import date, timedelta
+
+import pytest
+
+from response_cache import ResponseCache, normalize_message, response_cache
+from intent_router import intent_router
+from agent import run_agent_conversation
+from tools import execute_tool
+
+def test_punctuation_and_spacing_share_a_key():
+    assert normalize_message("What needs  watering today?") == normalize_message("what needs watering today")
+
+def test_keys_follow_the_date_and_data_version(db):
+    cache = ResponseCache(enabled=True)
+    today = date(2025, 6, 1)
+    key = cache.key_for("anything due?", today=today)
+    assert cache.key_for("Anything due", today=today) == key
+    assert cache.key_for("anything due?", today=today + timedelta(days=1)) != key
+    execute_tool("add_plant", {"name": "Fern"})
+    assert cache.key_for("anything due?", today=today) != key
+
+def test_only_read_only_turns_are_stored():
+    cache = ResponseCache(enabled=True)
+    assert not cache.put("a", "Added!", ["add_plant"])
+    assert not cache.put("b", "Hello!", [])
+    assert cache.put("c", "Water the fern", ["get_care_schedule"])
+    assert cache.get("a") is None
+    assert cache.get("c") == ("Water the fern", ["get_care_schedule"])
+
+def test_least_recently_used_and_expired_entries_go():
+    cache = ResponseCache(enabled=True, max_entries=2, ttl_seconds=60)
+    cache.put("a", "1", ["get_care_schedule"])
+    cache.put("b", "2", ["get_care_schedule"])
+    cache.get("a")
+    cache.put("c", "3", ["get_care_schedule"])
+    assert cache.get("b") is None and cache.get("a") is not None
+    reply, _ = cache._entries["a"]
+    cache._entries["a"] = (reply, 0)
+    assert cache.get("a") is None
+    assert (cache.stats()["evictions"], cache.stats()["expirations"]) == (1, 1)
+
+@pytest.fixture
+def cache_on(monkeypatch):
+    monkeypatch.setattr(response_cache, "enabled", True)
+    monkeypatch.setattr(intent_router, "enabled", False)
+    response_cache.clear()
+    yield response_cache
+    response_cache.clear()
+
+def test_repeated_question_skips_the_model_until_data_changes(db, fake_openai_client, cache_on):
+    plant_id = execute_tool("add_plant", {"name": "Fern"})["plant_id"]
+    execute_tool("update_care_schedule", {"plant_id": plant_id, "watering_days": 2})
+    first = run_agent_conversation("What is due this week?", session_id="cache-a")
+    requests = fake_openai_client.stats["requests"]
+    assert run_agent_conversation("what is due this week", session_id="cache-b") == first
+    assert fake_openai_client.stats["requests"] == requests
+
+    execute_tool("add_plant", {"name": "Basil"})
+    run_agent_conversation("What is due this week?", session_id="cache-c")
+    assert fake_openai_client.stats["requests"] > requests
@@ -0,0 +1,39 @@
+import database
+from schedule_engine import get_schedule_index, query_care_schedule
+from tools import execute_tool
+
+def test_tool_writes_patch_the_index_in_place(db):
+    plant_id = execute_tool("add_plant", {"name": "Fern"})["plant_id"]
+    query_care_schedule()
+    index = get_schedule_index()
+    loads = index.stats()["loads"]
+
+    execute_tool("update_care_schedule", {"plant_id": plant_id, "watering_days": 3})
+    execute_tool("bulk_add_plants", {"plants": [{"name": "Basil", "watering_days": 1}]})
+    rows, _ = query_care_schedule()
+    assert [row["plant_name"] for row in rows] == ["Basil", "Fern"]
+    stats = index.stats()
+    assert stats["loads"] == loads
+    assert stats["incremental_updates"] >= 2
+    assert stats["entries"] == 2
+
+def test_writes_from_elsewhere_trigger_a_reload(db):
+    plant_id = execute_tool("add_plant", {"name": "Fern"})["plant_id"]
+    execute_tool("update_care_schedule", {"plant_id": plant_id, "watering_days": 3})
+    query_care_schedule()
+    loads = get_schedule_index().stats()["loads"]
+    with database.transaction() as conn:
+        conn.execute("UPDATE care_schedules SET frequency_days = 9")
+        database.bump_data_version(conn)
+    assert query_care_schedule()[0][0]["frequency_days"] == 9
+    assert get_schedule_index().stats()["loads"] == loads + 1
+
+def test_sidebar_and_agent_see_the_same_schedule(db):
+    import app
+    for name, days in (("Fern", 3), ("Basil", 1)):
+        plant_id = execute_tool("add_plant", {"name": name})["plant_id"]
+        execute_tool("update_care_schedule", {"plant_id": plant_id, "watering_days": days})
+    sidebar = app.app.test_client().get("/api/schedule").get_json()
+    agent = execute_tool("get_care_schedule", {})["care_schedule"]
+    assert [(row["plant_id"], row["next_due_date"], row["days_until"]) for row in sidebar] == \
+        [(row["plant_id"], row["next_due_date"], row["days_until"]) for row in agent]
@@ -0,0 +1,54 @@
+from datetime import date, timedelta
+
+import pytest
+
+from schedule_engine import query_care_schedule
+from tools import execute_tool
+
+@pytest.fixture
+def garden(db):
+    plants = execute_tool("bulk_add_plants", {"plants": [
+        {"name": "Basil", "location": "Kitchen", "watering_days": 1, "fertilizing_days": 14},
+        {"name": "Fern", "location": "bathroom", "watering_days": 3},
+        {"name": "Cactus", "location": "office", "watering_days": 20},
+    ]})["plants"]
+    return {plant["name"]: plant["plant_id"] for plant in plants}
+
+def _names(rows):
+    return [(row["plant_name"], row["task_type"]) for row in rows]
+
+def test_tasks_come_sorted_by_due_date(garden):
+    rows, has_more = query_care_schedule()
+    assert _names(rows) == [("Basil", "watering"), ("Fern", "watering"), ("Basil", "fertilizing"),
+                            ("Cactus", "watering")]
+    assert [row["days_until"] for row in rows] == [1, 3, 14, 20]
+    assert rows[0]["next_due_date"] == (date.today() + timedelta(days=1)).isoformat()
+    assert not has_more
+
+def test_filters(garden):
+    assert _names(query_care_schedule(within_days=3)[0]) == [("Basil", "watering"), ("Fern", "watering")]
+    assert _names(query_care_schedule(task_type="fertilizing")[0]) == [("Basil", "fertilizing")]
+    assert _names(query_care_schedule(location="kitchen")[0]) == [("Basil", "watering"), ("Basil", "fertilizing")]
+    later = date.today() + timedelta(days=14)
+    assert _names(query_care_schedule(status="overdue", today=later)[0]) == [("Basil", "watering"),
+                                                                            ("Fern", "watering")]
+    assert _names(query_care_schedule(status="due_today", today=later)[0]) == [("Basil", "fertilizing")]
+    assert _names(query_care_schedule(status="upcoming", today=later)[0]) == [("Cactus", "watering")]
+    with pytest.raises(ValueError):
+        query_care_schedule(status="someday")
+
+def test_pages(garden):
+    first, has_more = query_care_schedule(limit=3)
+    second, more_after = query_care_schedule(limit=3, offset=3)
+    assert (len(first), has_more, len(second), more_after) == (3, True, 1, False)
+    assert _names(first + second) == _names(query_care_schedule()[0])
+
+def test_tool_reports_next_page_and_bad_status(garden):
+    result = execute_tool("get_care_schedule", {"limit": 2})
+    assert result["has_more"] and result["next_offset"] == 2
+    assert result["care_schedule"][0]["status"] == "upcoming"
+    assert "error" in execute_tool("get_care_schedule", {"status": "someday"})
+
+def test_dead_plants_drop_out(garden):
+    execute_tool("mark_plant_dead", {"plant_id": garden["Basil"]})
+    assert "Basil" not in {row["plant_name"] for row in query_care_schedule()[0]}
@@ -0,0 +1,62 @@
+import time
+
+from sessions import MemorySessionStore, SQLiteSessionStore, new_context
+
+def _context(plant_id, history=()):
+    context = new_context()
+    context["last_added_plant_id"] = plant_id
+    context["conversation_history"] = list(history)
+    return context
+
+def test_sessions_are_kept_apart():
+    store = MemorySessionStore()
+    store.save("a", _context(1))
+    store.save("b", _context(2))
+    assert store.get("a")["last_added_plant_id"] == 1
+    assert store.get("b")["last_added_plant_id"] == 2
+    assert store.get("c") == new_context()
+    assert (store.stats()["hits"], store.stats()["misses"]) == (2, 1)
+
+def test_saved_context_is_a_copy():
+    store = MemorySessionStore()
+    context = _context(1)
+    store.save("a", context)
+    context["last_added_plant_id"] = 99
+    store.get("a")["last_added_plant_id"] = 42
+    assert store.get("a")["last_added_plant_id"] == 1
+
+def test_least_recently_used_session_is_evicted_first():
+    store = MemorySessionStore(max_sessions=2)
+    store.save("a", _context(1))
+    store.save("b", _context(2))
+    store.get("a")
+    store.save("c", _context(3))
+    assert store.get("b") == new_context()
+    assert store.get("a")["last_added_plant_id"] == 1
+    assert store.stats()["evictions"] == 1
+
+def test_byte_cap_bounds_memory():
+    store = MemorySessionStore(max_bytes=2000)
+    for i in range(20):
+        store.save(f"s{i}", _context(i, [{"role": "user", "content": "x" * 200}]))
+    stats = store.stats()
+    assert stats["bytes"] <= 2000
+    assert stats["sessions"] + stats["evictions"] == 20
+    assert store.get("s19")["last_added_plant_id"] == 19
+
+def test_idle_sessions_expire():
+    store = MemorySessionStore(ttl_seconds=60)
+    store.save("a", _context(1))
+    store._sessions["a"] = (store._sessions["a"][0], time.time() - 120)
+    assert store.get("a") == new_context()
+    assert store.stats()["expirations"] == 1
+
+def test_sqlite_store_shares_and_prunes_sessions(db):
+    store = SQLiteSessionStore(max_sessions=2, ttl_seconds=3600)
+    for i in range(3):
+        store.save(f"s{i}", _context(i))
+    assert SQLiteSessionStore().get("s1")["last_added_plant_id"] == 1
+    store.prune()
+    assert store.stats()["sessions"] == 2
+    assert store.get("s0") == new_context()
+    assert store.stats()["evictions"] == 1
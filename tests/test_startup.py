@@ -0,0 +1,18 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+from startup_profile import check_startup, IMPORT_BUDGET_MS, ROOT
+
+@pytest.mark.parametrize("module", ["app", "agent", "asgi"])
+def test_import_defers_heavy_dependencies(module):
+    profile = check_startup(module, budget_ms=IMPORT_BUDGET_MS)
+    assert profile["deferred_loaded"] == []
+    assert profile["wall_ms"] <= IMPORT_BUDGET_MS, f"importing {module} took {profile['wall_ms']:.0f}ms"
+
+def test_import_touches_no_database(tmp_path):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    subprocess.run([sys.executable, "-c", "import app, agent"], cwd=tmp_path, env=env, check=True)
+    assert os.listdir(tmp_path) == []
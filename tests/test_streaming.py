@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+import app as sage_app
+from intent_router import intent_router
+
+def _events(body):
+    events = []
+    for block in body.decode("utf-8").strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+@pytest.fixture
+def client(db, fake_openai_client, monkeypatch):
+    monkeypatch.setattr(intent_router, "enabled", False)
+    return sage_app.app.test_client()
+
+def test_reply_streams_as_server_sent_events(client):
+    response = client.post("/chat/stream", json={"message": "Tell me about caring for a monstera"},
+                           headers={"X-Session-ID": "stream-a"})
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+    events = _events(response.data)
+    tokens = [data for event, data in events if event == "token"]
+    assert len(tokens) > 1
+    assert events[-1][0] == "done" and events[-1][1]["tools_used"] == []
+    plain = client.post("/chat", json={"message": "Tell me about caring for a monstera"},
+                        headers={"X-Session-ID": "stream-b"}).get_json()
+    assert "".join(tokens) == plain["response"]
+
+def test_tool_calls_are_announced_before_the_reply(client):
+    events = _events(client.post("/chat/stream", json={"message": "add kumquat to my wishlist"},
+                                 headers={"X-Session-ID": "stream-c"}).data)
+    names = [event for event, _ in events]
+    assert "tool" in names and names.index("tool") < len(names) - 1
+    assert names[-1] == "done" and events[-1][1]["tools_used"] == ["add_to_wishlist"]
+    reply = "".join(data for event, data in events[names.index("tool"):] if event == "token")
+    assert "kumquat" in reply.lower()
+
+def test_new_clients_get_a_session_cookie(client):
+    response = client.post("/chat/stream", json={"message": "hello"})
+    assert "sage_session=" in response.headers["Set-Cookie"]
@@ -0,0 +1,42 @@
+import pytest
+from tool_registry import ToolRegistry, ToolArgumentError
+
+def make_tool():
+    registry = ToolRegistry()
+
+    @registry.register("water", "Water a plant", {
+        "plant_id": {"type": "integer", "minimum": 1},
+        "task_type": {"type": "string", "enum": ["watering", "fertilizing"]},
+        "plants": {"type": "array", "maxItems": 2, "items": {"type": "integer"}},
+    }, required=["plant_id"])
+    def water(plant_id, task_type=None, plants=None):
+        return {"success": True, "plant_id": plant_id, "task_type": task_type}
+
+    return registry.get("water")
+
+def test_arguments_are_coerced_to_the_schema():
+    tool = make_tool()
+    arguments = tool.prepare('{"plant_id": " 3 ", "task_type": "Watering", "plants": ["4"]}')
+    assert arguments == {"plant_id": 3, "task_type": "watering", "plants": [4]}
+    assert tool.run(arguments)["plant_id"] == 3
+
+@pytest.mark.parametrize("arguments, message", [
+    ({"plant_id": "²"}, "must be an integer"),
+    ({"plant_id": "٣"}, "must be an integer"),
+    ({"plant_id": True}, "must be an integer"),
+    ({"plant_id": 0}, "at least 1"),
+    ({"plant_id": 1, "task_type": "pruning"}, "must be one of"),
+    ({"plant_id": 1, "plants": [1, 2, 3]}, "at most 2"),
+    ({"plant_id": 1, "colour": "green"}, "unexpected argument"),
+    ({}, "missing required argument plant_id"),
+    ("{not json", "not valid JSON"),
+])
+def test_bad_arguments_raise_tool_argument_error(arguments, message):
+    tool = make_tool()
+    with pytest.raises(ToolArgumentError, match=message):
+        tool.prepare(arguments)
+    assert tool.stats()["rejected"] == 1
+
+def test_unknown_tool_is_rejected():
+    with pytest.raises(ToolArgumentError):
+        ToolRegistry().get("nope")
@@ -0,0 +1,77 @@
+import json
+import asyncio
+
+import pytest
+
+import tracing
+from tracing import observe, set_backend, tracing_stats
+
+@observe(type="tool")
+def inner(value):
+    if value < 0:
+        raise ValueError("negative")
+    return value * 2
+
+@observe(type="agent", name="turn")
+def outer(value):
+    return inner(value) + inner(value + 1)
+
+@observe(type="llm")
+async def async_call(value):
+    await asyncio.sleep(0)
+    return inner(value)
+
+@pytest.fixture(autouse=True)
+def restore_tracer(monkeypatch):
+    monkeypatch.setattr(tracing, "_tracer", tracing._tracer)
+
+def _spans():
+    return tracing._tracer.backend.recent()
+
+def test_no_backend_calls_straight_through():
+    set_backend("none")
+    assert outer(1) == 6
+    assert tracing_stats()["spans"] == 0
+
+def test_ring_records_nested_spans():
+    set_backend("ring", 1.0)
+    assert outer(1) == 6
+    first, second, turn = _spans()
+    assert turn["name"] == "turn" and turn["parent_id"] is None
+    assert {first["name"], second["name"]} == {"inner"}
+    assert first["parent_id"] == second["parent_id"] == turn["span_id"]
+    assert len({span["trace_id"] for span in (first, second, turn)}) == 1
+    assert all(span["duration_ms"] >= 0 for span in (first, second, turn))
+
+def test_errors_are_recorded_and_raised():
+    set_backend("ring", 1.0)
+    with pytest.raises(ValueError):
+        inner(-1)
+    assert _spans()[-1]["error"] == "ValueError: negative"
+    assert tracing_stats()["errors"] == 1
+
+def test_coroutines_are_traced():
+    set_backend("ring", 1.0)
+    assert asyncio.run(async_call(2)) == 4
+    child, parent = _spans()
+    assert (child["name"], parent["name"], child["parent_id"]) == ("inner", "async_call", parent["span_id"])
+
+def test_unsampled_traces_record_nothing_inside():
+    set_backend("ring", 0.0)
+    for value in range(10):
+        assert outer(value) == 4 * value + 2
+    stats = tracing_stats()
+    assert (stats["traces"], stats["sampled_traces"], stats["spans"]) == (10, 0, 0)
+
+def test_jsonl_appends_one_span_per_line(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setitem(tracing.BACKENDS, "jsonl", lambda: tracing.JsonlBackend(str(path)))
+    set_backend("jsonl", 1.0)
+    outer(1)
+    set_backend("none")
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [span["name"] for span in spans] == ["inner", "inner", "turn"]
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        set_backend("statsd")
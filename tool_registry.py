@@ -0,0 +1,172 @@
+import re
+import json
+import time
+import threading
+
+class ToolArgumentError(ValueError):
+    """Tool call arguments that don't match the tool's declared schema"""
+
+# ASCII digits only: str.isdigit() also accepts "²" and "٣", which int() rejects
+_INTEGER = re.compile(r"-?\d+", re.ASCII)
+
+def _compile(schema, path):
+    """Turn a JSON schema fragment into a function that coerces or rejects one value"""
+    kind = schema.get("type")
+
+    if kind == "integer":
+        minimum = schema.get("minimum")
+        maximum = schema.get("maximum")
+
+        def check_integer(value):
+            if isinstance(value, bool):
+                raise ToolArgumentError(f"{path} must be an integer")
+            if isinstance(value, float) and value.is_integer():
+                value = int(value)
+            elif isinstance(value, str) and _INTEGER.fullmatch(value.strip()):
+                value = int(value)
+            if not isinstance(value, int):
+                raise ToolArgumentError(f"{path} must be an integer")
+            if minimum is not None and value < minimum:
+                raise ToolArgumentError(f"{path} must be at least {minimum}")
+            if maximum is not None and value > maximum:
+                raise ToolArgumentError(f"{path} must be at most {maximum}")
+            return value
+        return check_integer
+
+    if kind == "string":
+        choices = schema.get("enum")
+        lookup = {choice.lower(): choice for choice in choices} if choices else None
+
+        def check_string(value):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                value = str(value)
+            if not isinstance(value, str):
+                raise ToolArgumentError(f"{path} must be a string")
+            value = value.strip()
+            if lookup is not None:
+                if value.lower() not in lookup:
+                    raise ToolArgumentError(f"{path} must be one of {', '.join(choices)}")
+                value = lookup[value.lower()]
+            return value
+        return check_string
+
+    if kind == "array":
+        check_item = _compile(schema.get("items", {}), f"{path}[]")
+        max_items = schema.get("maxItems")
+
+        def check_array(value):
+            if isinstance(value, dict):
+                value = [value]
+            if not isinstance(value, list):
+                raise ToolArgumentError(f"{path} must be a list")
+            if max_items is not None and len(value) > max_items:
+                raise ToolArgumentError(f"{path} takes at most {max_items} items")
+            return [check_item(item) for item in value]
+        return check_array
+
+    if kind == "object":
+        fields = {name: _compile(prop, f"{path}.{name}" if path else name)
+                  for name, prop in schema.get("properties", {}).items()}
+        required = tuple(schema.get("required", ()))
+
+        def check_object(value):
+            if not isinstance(value, dict):
+                raise ToolArgumentError(f"{path or 'arguments'} must be an object")
+            cleaned = {}
+            for key, item in value.items():
+                # Models sometimes emit keys like "name:"
+                key = key.rstrip(":").strip()
+                if key not in fields:
+                    raise ToolArgumentError(f"unexpected argument {key!r} (allowed: {', '.join(fields) or 'none'})")
+                if item is None:
+                    continue
+                cleaned[key] = fields[key](item)
+            missing = [key for key in required if key not in cleaned or cleaned[key] == ""]
+            if missing:
+                raise ToolArgumentError(f"missing required argument {', '.join(missing)}")
+            return cleaned
+        return check_object
+
+    return lambda value: value
+
+class Tool:
+    """One callable tool: its OpenAI schema, a compiled validator and call stats"""
+
+    def __init__(self, name, description, func, properties=None, required=()):
+        self.name = name
+        self.description = description
+        self.func = func
+        self.parameters = {"type": "object", "properties": properties or {}, "required": list(required)}
+        self.validate = _compile(self.parameters, "")
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "rejected": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0}
+
+    def schema(self):
+        return {
+            "type": "function",
+            "function": {"name": self.name, "description": self.description, "parameters": self.parameters},
+        }
+
+    def prepare(self, arguments):
+        """Validated keyword arguments; raises ToolArgumentError without touching the database"""
+        try:
+            if isinstance(arguments, (str, bytes)):
+                try:
+                    arguments = json.loads(arguments) if arguments.strip() else {}
+                except ValueError:
+                    raise ToolArgumentError("arguments are not valid JSON")
+            return self.validate(arguments)
+        except ToolArgumentError:
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise
+
+    def run(self, arguments):
+        """Call the tool with already validated arguments"""
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = self.func(**arguments)
+            failed = isinstance(result, dict) and "error" in result
+            return result
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self._stats["calls"] += 1
+                self._stats["errors"] += failed
+                self._stats["total_ms"] += elapsed
+                self._stats["max_ms"] = max(self._stats["max_ms"], elapsed)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        attempts = stats["calls"] + stats["rejected"]
+        stats["avg_ms"] = stats["total_ms"] / stats["calls"] if stats["calls"] else 0.0
+        stats["error_rate"] = (stats["errors"] + stats["rejected"]) / attempts if attempts else 0.0
+        return stats
+
+class ToolRegistry:
+    def __init__(self):
+        self._tools = {}
+
+    def register(self, name, description, properties=None, required=()):
+        """Decorator that registers a tool function under `name` with its parameter schema"""
+        def decorator(func):
+            if name in self._tools:
+                raise ValueError(f"Tool {name} is already registered")
+            self._tools[name] = Tool(name, description, func, properties, required)
+            return func
+        return decorator
+
+    def get(self, name):
+        tool = self._tools.get(name)
+        if tool is None:
+            raise ToolArgumentError(f"Unknown tool {name!r}")
+        return tool
+
+    def schemas(self):
+        """OpenAI `tools` list in registration order"""
+        return [tool.schema() for tool in self._tools.values()]
+
+    def stats(self):
+        return {name: tool.stats() for name, tool in self._tools.items()}
@@ -1,273 +1,444 @@
-from database import get_db
-from datetime import datetime, timedelta
-from deepeval.tracing import observe
+import threading
+from database import get_db, transaction, bump_data_version, get_data_version, current_db_path
+from schedule_engine import SCHEDULE_STATUSES, query_care_schedule, schedule_status, plants_changed
+from tool_registry import ToolRegistry, ToolArgumentError
+from datetime import datetime
+import clock
+from tracing import observe
 
+def _schedule_rows(plant_id, watering_days, fertilizing_days, now):
+    return [(plant_id, task_type, days, now)
+            for task_type, days in (('watering', watering_days), ('fertilizing', fertilizing_days))
+            if days]
+
+_UPSERT_SCHEDULE = '''INSERT INTO care_schedules (plant_id, task_type, frequency_days, last_completed) VALUES (?, ?, ?, ?)
+                      ON CONFLICT (plant_id, task_type) DO UPDATE SET frequency_days = excluded.frequency_days'''
+
+registry = ToolRegistry()
+tool = registry.register
+
+# Parameter schemas shared by several tools
+_NAME = {"type": "string", "description": "Common name of the plant"}
+_LOCATION = {"type": "string", "description": "Where the plant is located"}
+_SPECIES = {"type": "string", "description": "Plant species or variety"}
+_NOTES = {"type": "string", "description": "Additional notes about the plant"}
+_PLANT_ID = {"type": "integer", "minimum": 1, "description": "ID of the plant to update"}
+_WATERING_DAYS = {"type": "integer", "minimum": 0, "description": "How often to water in days"}
+_FERTILIZING_DAYS = {"type": "integer", "minimum": 0, "description": "How often to fertilize in days"}
+_TASK_TYPE = {"type": "string", "enum": ["watering", "fertilizing"], "description": "Kind of care task"}
+
+# Largest batch a single bulk tool call may write
+MAX_BULK_ITEMS = 500
+
+@tool("add_plant", "Add a new plant to the user's personal plant collection.",
+      {"name": _NAME, "location": _LOCATION, "species": _SPECIES, "notes": _NOTES}, required=["name"])
 @observe(type="tool")
 def add_plant_tool(name, location=None, species=None, notes=None):
     """Add a new plant to the user's collection"""
-    conn = get_db()
-    conn.execute(
-        'INSERT INTO plants (name, species, location, notes, created_at) VALUES (?, ?, ?, ?, ?)',
-        (name, species, location, notes, datetime.now().isoformat())
-    )
-    conn.commit()
-    plant_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
-    conn.close()
+    with transaction() as conn:
+        cursor = conn.execute(
+            'INSERT INTO plants (name, species, location, notes, created_at) VALUES (?, ?, ?, ?, ?)',
+            (name, species, location, notes, clock.now().isoformat())
+        )
+        plant_id = cursor.lastrowid
+        version = bump_data_version(conn)
+    plants_changed([plant_id], version)
     return {"success": True, "plant_id": plant_id, "message": f"Added {name} to your collection"}
 
+@tool("update_care_schedule", "Update watering and fertilizing schedule for a plant.",
+      {"plant_id": _PLANT_ID, "watering_days": _WATERING_DAYS, "fertilizing_days": _FERTILIZING_DAYS},
+      required=["plant_id"])
 @observe(type="tool")
 def update_care_schedule_tool(plant_id, watering_days=None, fertilizing_days=None):
     """Update or create care schedule for a plant"""
-    conn = get_db()
-    
-    if watering_days:
-        existing = conn.execute('SELECT id FROM care_schedules WHERE plant_id = ? AND task_type = ?', 
-                               (plant_id, 'watering')).fetchone()
-        if existing:
-            conn.execute('UPDATE care_schedules SET frequency_days = ? WHERE id = ?',
-                        (watering_days, existing[0]))
-        else:
-            conn.execute('INSERT INTO care_schedules (plant_id, task_type, frequency_days, last_completed) VALUES (?, ?, ?, ?)',
-                        (plant_id, 'watering', watering_days, datetime.now().isoformat()))
+    schedules = _schedule_rows(plant_id, watering_days, fertilizing_days, clock.now().isoformat())
     
-    if fertilizing_days:
-        existing = conn.execute('SELECT id FROM care_schedules WHERE plant_id = ? AND task_type = ?',
-                               (plant_id, 'fertilizing')).fetchone()
-        if existing:
-            conn.execute('UPDATE care_schedules SET frequency_days = ? WHERE id = ?',
-                        (fertilizing_days, existing[0]))
-        else:
-            conn.execute('INSERT INTO care_schedules (plant_id, task_type, frequency_days, last_completed) VALUES (?, ?, ?, ?)',
-                        (plant_id, 'fertilizing', fertilizing_days, datetime.now().isoformat()))
+    with transaction() as conn:
+        # One upsert per task, backed by the unique (plant_id, task_type) index
+        conn.executemany(_UPSERT_SCHEDULE, schedules)
+        version = bump_data_version(conn)
+    plants_changed([plant_id], version)
     
-    conn.commit()
-    conn.close()
     return {"success": True, "message": "Care schedule updated"}
 
+@tool("bulk_add_plants", "Add several plants to the user's collection in one call, optionally with their "
+      "watering and fertilizing schedules. Use this instead of repeated add_plant calls when the user mentions "
+      "more than one plant.",
+      {"plants": {
+          "type": "array",
+          "description": "Plants to add, one entry per plant",
+          "maxItems": MAX_BULK_ITEMS,
+          "items": {
+              "type": "object",
+              "properties": {"name": _NAME, "location": _LOCATION, "species": _SPECIES, "notes": _NOTES,
+                             "watering_days": _WATERING_DAYS, "fertilizing_days": _FERTILIZING_DAYS},
+              "required": ["name"]
+          }
+      }}, required=["plants"])
 @observe(type="tool")
-def get_care_schedule_tool():
-    """Get detailed care schedule with next care dates including fertilizing"""
+def bulk_add_plants_tool(plants):
+    """Add many plants, and optionally their care schedules, in one transaction"""
+    if not plants:
+        return {"success": False, "message": "No plants given"}
+    if len(plants) > MAX_BULK_ITEMS:
+        return {"success": False, "message": f"At most {MAX_BULK_ITEMS} plants can be added at once"}
+    if any(not (plant.get("name") or "").strip() for plant in plants):
+        return {"success": False, "message": "Every plant needs a name"}
+
+    now = clock.now().isoformat()
+    rows = [(plant["name"], plant.get("species"), plant.get("location"), plant.get("notes"), now)
+            for plant in plants]
+    with transaction() as conn:
+        conn.executemany('INSERT INTO plants (name, species, location, notes, created_at) VALUES (?, ?, ?, ?, ?)',
+                         rows)
+        # BEGIN IMMEDIATE holds the write lock, so AUTOINCREMENT handed out a contiguous block
+        last_id = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'plants'").fetchone()[0]
+        plant_ids = list(range(last_id - len(rows) + 1, last_id + 1))
+        schedules = [row for plant_id, plant in zip(plant_ids, plants)
+                     for row in _schedule_rows(plant_id, plant.get("watering_days"), plant.get("fertilizing_days"), now)]
+        if schedules:
+            conn.executemany(_UPSERT_SCHEDULE, schedules)
+        version = bump_data_version(conn)
+    plants_changed(plant_ids, version)
+
+    added = [{"plant_id": plant_id, "name": plant["name"]} for plant_id, plant in zip(plant_ids, plants)]
+    return {"success": True, "plants": added, "schedules_set": len(schedules),
+            "message": f"Added {len(added)} plants to your collection"}
+
+@tool("bulk_update_care_schedules", "Update watering and fertilizing schedules for several plants in one call.",
+      {"schedules": {
+          "type": "array",
+          "description": "One entry per plant",
+          "maxItems": MAX_BULK_ITEMS,
+          "items": {
+              "type": "object",
+              "properties": {"plant_id": _PLANT_ID, "watering_days": _WATERING_DAYS,
+                             "fertilizing_days": _FERTILIZING_DAYS},
+              "required": ["plant_id"]
+          }
+      }}, required=["schedules"])
+@observe(type="tool")
+def bulk_update_care_schedules_tool(schedules):
+    """Update or create care schedules for many plants in one transaction"""
+    if not schedules:
+        return {"success": False, "message": "No schedules given"}
+    if len(schedules) > MAX_BULK_ITEMS:
+        return {"success": False, "message": f"At most {MAX_BULK_ITEMS} schedules can be updated at once"}
+
+    now = clock.now().isoformat()
+    plant_ids = list(dict.fromkeys(item["plant_id"] for item in schedules))
+    with transaction() as conn:
+        placeholders = ", ".join("?" * len(plant_ids))
+        existing = {row[0] for row in conn.execute(f'SELECT id FROM plants WHERE id IN ({placeholders})', plant_ids)}
+        rows = [row for item in schedules if item["plant_id"] in existing
+                for row in _schedule_rows(item["plant_id"], item.get("watering_days"), item.get("fertilizing_days"), now)]
+        # Nothing written leaves the data version, and so every cache, alone
+        if rows:
+            conn.executemany(_UPSERT_SCHEDULE, rows)
+            version = bump_data_version(conn)
+    if rows:
+        plants_changed(existing, version)
+
+    updated = [plant_id for plant_id in plant_ids if plant_id in existing]
+    missing = [plant_id for plant_id in plant_ids if plant_id not in existing]
+    result = {"success": bool(updated), "updated_plant_ids": updated, "schedules_set": len(rows),
+              "message": f"Care schedules updated for {len(updated)} plants"}
+    if missing:
+        result["missing_plant_ids"] = missing
+    return result
+
+@tool("complete_care_tasks", "Record that care tasks were done, e.g. the user watered or fertilized plants. Put "
+      "every plant and task the user mentions in one call; each schedule's next due date moves on from the "
+      "completion.",
+      {"tasks": {
+          "type": "array",
+          "description": "One entry per plant and task done",
+          "maxItems": MAX_BULK_ITEMS,
+          "items": {
+              "type": "object",
+              "properties": {"plant_id": _PLANT_ID, "task_type": _TASK_TYPE,
+                             "completed_on": {"type": "string",
+                                              "description": "Date done as YYYY-MM-DD, if not today"}},
+              "required": ["plant_id", "task_type"]
+          }
+      }}, required=["tasks"])
+@observe(type="tool")
+def complete_care_tasks_tool(tasks):
+    """Append completed tasks to the care log in one transaction; triggers move the schedules on"""
+    if not tasks:
+        return {"success": False, "message": "No tasks given"}
+    if len(tasks) > MAX_BULK_ITEMS:
+        return {"success": False, "message": f"At most {MAX_BULK_ITEMS} tasks can be completed at once"}
+
+    now = clock.now()
+    completed_at = []
+    for task in tasks:
+        if not task.get("completed_on"):
+            completed_at.append(now.isoformat())
+            continue
+        try:
+            # The whole value must parse; a date followed by a bad time or stray text is refused
+            completed_on = datetime.fromisoformat(task["completed_on"]).date()
+        except (TypeError, ValueError):
+            return {"success": False, "message": f"completed_on must be a date like {now.date().isoformat()}"}
+        if completed_on > now.date():
+            return {"success": False, "message": "Care tasks can't be completed in the future"}
+        completed_at.append(now.isoformat() if completed_on == now.date() else completed_on.isoformat())
+
+    plant_ids = list(dict.fromkeys(task["plant_id"] for task in tasks))
+    next_due = {}
+    with transaction() as conn:
+        placeholders = ", ".join("?" * len(plant_ids))
+        existing = {row[0] for row in conn.execute(
+            f"SELECT id FROM plants WHERE id IN ({placeholders}) AND (status = 'alive' OR status IS NULL)",
+            plant_ids)}
+        rows = [(task["plant_id"], task["task_type"], when, now.isoformat())
+                for task, when in zip(tasks, completed_at) if task["plant_id"] in existing]
+        if rows:
+            conn.executemany('INSERT INTO care_events (plant_id, task_type, completed_at, created_at) '
+                             'VALUES (?, ?, ?, ?)', rows)
+            next_due = {(row[0], row[1]): row[2] for row in conn.execute(
+                f'SELECT plant_id, task_type, next_due FROM care_schedules WHERE plant_id IN ({placeholders})',
+                plant_ids)}
+            version = bump_data_version(conn)
+    if rows:
+        plants_changed(existing, version)
+
+    completed = [{"plant_id": plant_id, "task_type": task_type, "next_due_date": next_due.get((plant_id, task_type))}
+                 for plant_id, task_type, _, _ in rows]
+    result = {"success": bool(completed), "completed": completed,
+              "message": f"Marked {len(completed)} care task{'s' if len(completed) != 1 else ''} as done"}
+    missing = [plant_id for plant_id in plant_ids if plant_id not in existing]
+    if missing:
+        result["missing_plant_ids"] = missing
+    return result
+
+# Most plant/task rollups one history call returns
+HISTORY_PAGE_SIZE = 100
+
+_HISTORY_QUERY = """
+SELECT r.plant_id, p.name AS plant_name, r.task_type, cs.frequency_days, r.completions, r.first_completed,
+       r.last_completed, r.current_streak, r.longest_streak,
+       CASE WHEN r.completions > 1
+            THEN ROUND((julianday(r.last_completed) - julianday(r.first_completed)) / (r.completions - 1), 1)
+       END AS average_interval_days
+FROM care_rollups r
+JOIN plants p ON p.id = r.plant_id
+LEFT JOIN care_schedules cs ON cs.plant_id = r.plant_id AND cs.task_type = r.task_type
+"""
+
+@tool("get_care_history", "Get how plants have been cared for: number of completions, last completion, on-time "
+      "streaks and average days between completions. Use it when the user asks when they last watered or "
+      "fertilized, or how consistent they have been.",
+      {"plant_id": {"type": "integer", "minimum": 1, "description": "Only this plant"},
+       "task_type": _TASK_TYPE,
+       "recent": {"type": "integer", "minimum": 0, "maximum": 50,
+                  "description": "Recent completion dates to include when plant_id is given (default 5)"}})
+@observe(type="tool")
+def get_care_history_tool(plant_id=None, task_type=None, recent=5):
+    """Completion rollups per plant and task, read from care_rollups rather than the event log"""
+    conditions, params = [], []
+    if plant_id is not None:
+        conditions.append("r.plant_id = ?")
+        params.append(plant_id)
+    if task_type is not None:
+        conditions.append("r.task_type = ?")
+        params.append(task_type)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
     conn = get_db()
-    
-    query = """
-    SELECT p.id, p.name, p.location, cs.task_type, cs.frequency_days, cs.last_completed
-    FROM plants p
-    JOIN care_schedules cs ON p.id = cs.plant_id
-    WHERE p.status = 'alive' OR p.status IS NULL
-    """
-    
-    results = conn.execute(query).fetchall()
-    conn.close()
-    
+    try:
+        history = [dict(row) for row in conn.execute(
+            f"{_HISTORY_QUERY} {where} ORDER BY p.name, r.task_type LIMIT ?", params + [HISTORY_PAGE_SIZE])]
+        if plant_id is not None and recent:
+            # Served by the (plant_id, task_type, completed_at) index
+            for item in history:
+                item["recent_completions"] = [row[0] for row in conn.execute(
+                    '''SELECT completed_at FROM care_events WHERE plant_id = ? AND task_type = ?
+                       ORDER BY completed_at DESC LIMIT ?''', (item["plant_id"], item["task_type"], recent))]
+    finally:
+        conn.close()
+    return {"care_history": history}
+
+# Default page for the agent tool so large collections don't flood the prompt
+SCHEDULE_PAGE_SIZE = 100
+
+@tool("get_care_schedule", "Get detailed care schedule for all plants including watering and fertilizing with "
+      "current date context. Results are sorted by due date; use the filters to narrow them down.",
+      {"within_days": {"type": "integer", "minimum": 0,
+                       "description": "Only tasks due within this many days (0 = due today or overdue)"},
+       "task_type": {"type": "string", "enum": ["watering", "fertilizing"], "description": "Only this kind of task"},
+       "location": {"type": "string", "description": "Only plants in this location"},
+       "status": {"type": "string", "enum": list(SCHEDULE_STATUSES), "description": "Only tasks with this status"},
+       "limit": {"type": "integer", "minimum": 1, "description": "Maximum number of tasks to return"},
+       "offset": {"type": "integer", "minimum": 0, "description": "Number of tasks to skip, for paging"}})
+@observe(type="tool")
+def get_care_schedule_tool(within_days=None, task_type=None, location=None, status=None,
+                           limit=SCHEDULE_PAGE_SIZE, offset=0):
+    """Get detailed care schedule with next care dates including fertilizing"""
+    current_date = clock.today()
+    try:
+        rows, has_more = query_care_schedule(within_days, task_type, location, status, limit, offset,
+                                             today=current_date)
+    except ValueError as e:
+        return {"error": str(e)}
+
     schedule_info = []
-    current_date = datetime.now()
-    
-    for row in results:
-        last_completed = datetime.fromisoformat(row[5])
-        next_due = last_completed + timedelta(days=row[4])
-        days_until = (next_due.date() - current_date.date()).days
-        
-        schedule_info.append({
-            "plant_id": row[0],
-            "plant_name": row[1],
-            "location": row[2] or "Unknown location",
-            "task_type": row[3],
-            "frequency_days": row[4],
-            "last_completed": row[5],
-            "next_due_date": next_due.strftime("%Y-%m-%d"),
-            "days_until": days_until,
-            "status": "overdue" if days_until < 0 else "due_today" if days_until == 0 else "upcoming",
-            "current_date": current_date.strftime("%Y-%m-%d")
-        })
-    
-    return {"care_schedule": schedule_info}
+    for row in rows:
+        row["location"] = row["location"] or "Unknown location"
+        row["status"] = schedule_status(row["days_until"])
+        row["current_date"] = current_date.isoformat()
+        schedule_info.append(row)
+
+    result = {"care_schedule": schedule_info}
+    if has_more:
+        result["has_more"] = True
+        result["next_offset"] = (offset or 0) + len(schedule_info)
+    return result
 
+@tool("add_to_wishlist", "Add a plant to the user's wishlist for future purchase or acquisition.",
+      {"name": {"type": "string", "description": "Name of the plant to add to wishlist"},
+       "notes": {"type": "string", "description": "Notes about why they want this plant or where to get it"}},
+      required=["name"])
 @observe(type="tool")
 def add_to_wishlist_tool(name, notes=None):
     """Add a plant to the wishlist"""
-    conn = get_db()
-    
-    # Check if plant already exists in wishlist
-    existing = conn.execute('SELECT id FROM wishlist WHERE LOWER(name) = LOWER(?)', (name,)).fetchone()
-    if existing:
-        conn.close()
-        return {"success": False, "message": f"{name} is already on your wishlist"}
-    
-    conn.execute(
-        'INSERT INTO wishlist (name, notes, created_at) VALUES (?, ?, ?)',
-        (name, notes, datetime.now().isoformat())
-    )
-    conn.commit()
-    wishlist_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
-    conn.close()
+    with transaction() as conn:
+        # Check if plant already exists in wishlist
+        existing = conn.execute('SELECT id FROM wishlist WHERE LOWER(name) = LOWER(?)', (name,)).fetchone()
+        if existing:
+            return {"success": False, "message": f"{name} is already on your wishlist"}
+        
+        cursor = conn.execute(
+            'INSERT INTO wishlist (name, notes, created_at) VALUES (?, ?, ?)',
+            (name, notes, clock.now().isoformat())
+        )
+        wishlist_id = cursor.lastrowid
+        version = bump_data_version(conn)
+    plants_changed([], version)
     return {"success": True, "wishlist_id": wishlist_id, "message": f"Added {name} to your wishlist"}
 
+@tool("remove_from_wishlist", "Remove a plant from the user's wishlist by ID or name.",
+      {"wishlist_id": {"type": "integer", "description": "ID of the wishlist item to remove"},
+       "name": {"type": "string", "description": "Name of the plant to remove from wishlist"}})
 @observe(type="tool")
 def remove_from_wishlist_tool(wishlist_id=None, name=None):
     """Remove a plant from the wishlist by ID or name"""
-    conn = get_db()
+    if not wishlist_id and not name:
+        return {"success": False, "message": "Must provide either wishlist_id or name"}
     
-    if wishlist_id:
-        # Remove by ID
-        plant = conn.execute('SELECT name FROM wishlist WHERE id = ?', (wishlist_id,)).fetchone()
-        if not plant:
-            conn.close()
-            return {"success": False, "message": "Plant not found in wishlist"}
-        
-        conn.execute('DELETE FROM wishlist WHERE id = ?', (wishlist_id,))
-        plant_name = plant[0]
-    elif name:
-        # Remove by name (case-insensitive)
-        plant = conn.execute('SELECT id, name FROM wishlist WHERE LOWER(name) = LOWER(?)', (name,)).fetchone()
-        if not plant:
-            conn.close()
-            return {"success": False, "message": f"{name} not found in wishlist"}
+    with transaction() as conn:
+        if wishlist_id:
+            # Remove by ID
+            plant = conn.execute('SELECT id, name FROM wishlist WHERE id = ?', (wishlist_id,)).fetchone()
+            if not plant:
+                return {"success": False, "message": "Plant not found in wishlist"}
+        else:
+            # Remove by name (case-insensitive)
+            plant = conn.execute('SELECT id, name FROM wishlist WHERE LOWER(name) = LOWER(?)', (name,)).fetchone()
+            if not plant:
+                return {"success": False, "message": f"{name} not found in wishlist"}
         
         conn.execute('DELETE FROM wishlist WHERE id = ?', (plant[0],))
+        version = bump_data_version(conn)
         plant_name = plant[1]
-    else:
-        conn.close()
-        return {"success": False, "message": "Must provide either wishlist_id or name"}
+    plants_changed([], version)
     
-    conn.commit()
-    conn.close()
     return {"success": True, "message": f"Removed {plant_name} from your wishlist"}
 
+@tool("mark_plant_dead", "Mark a plant as dead and automatically remove all its care schedules.",
+      {"plant_id": {"type": "integer", "description": "ID of the plant that has died"}}, required=["plant_id"])
 @observe(type="tool")
 def mark_plant_dead_tool(plant_id):
     """Mark a plant as dead and remove its care schedules"""
-    conn = get_db()
-    
-    # Update plant status to dead
-    conn.execute('UPDATE plants SET status = ? WHERE id = ?', ('dead', plant_id))
-    
-    # Remove all care schedules for this plant
-    conn.execute('DELETE FROM care_schedules WHERE plant_id = ?', (plant_id,))
+    with transaction() as conn:
+        # Update plant status to dead
+        conn.execute('UPDATE plants SET status = ? WHERE id = ?', ('dead', plant_id))
+        
+        # Remove all care schedules for this plant
+        conn.execute('DELETE FROM care_schedules WHERE plant_id = ?', (plant_id,))
+        version = bump_data_version(conn)
+    plants_changed([plant_id], version)
     
-    conn.commit()
-    conn.close()
     return {"success": True, "message": "Plant marked as dead and care schedules removed"}
 
-@observe(type="tool")
-def get_plants_context():
-    """Get all plants, schedules, and wishlist for context"""
+# Last loaded context per database path as (version, context), reused until the data version moves on
+_context_cache = {}
+_context_cache_lock = threading.Lock()
+_context_cache_stats = {"hits": 0, "misses": 0}
+
+def _load_plants_context():
     conn = get_db()
-    plants = conn.execute('SELECT * FROM plants').fetchall()
-    schedules = conn.execute('SELECT * FROM care_schedules').fetchall()
-    wishlist = conn.execute('SELECT * FROM wishlist').fetchall()
-    conn.close()
+    try:
+        # One read transaction so the version matches the rows it labels
+        conn.execute('BEGIN')
+        version = get_data_version(conn)
+        plants = conn.execute('SELECT * FROM plants').fetchall()
+        schedules = conn.execute('SELECT * FROM care_schedules').fetchall()
+        wishlist = conn.execute('SELECT * FROM wishlist').fetchall()
+        conn.commit()
+    finally:
+        conn.close()
     
-    return {
+    context = {
         "plants": [dict(p) for p in plants], 
         "schedules": [dict(s) for s in schedules],
         "wishlist": [dict(w) for w in wishlist]
     }
+    return version, context
 
-TOOLS = [
-    {
-        "type": "function",
-        "function": {
-            "name": "add_plant",
-            "description": "Add a new plant to the user's personal plant collection.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "name": {"type": "string", "description": "Common name of the plant"},
-                    "location": {"type": "string", "description": "Where the plant is located"},
-                    "species": {"type": "string", "description": "Plant species or variety"},
-                    "notes": {"type": "string", "description": "Additional notes about the plant"}
-                },
-                "required": ["name"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "update_care_schedule",
-            "description": "Update watering and fertilizing schedule for a plant.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "plant_id": {"type": "integer", "description": "ID of the plant to update"},
-                    "watering_days": {"type": "integer", "description": "How often to water in days"},
-                    "fertilizing_days": {"type": "integer", "description": "How often to fertilize in days"}
-                },
-                "required": ["plant_id"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_care_schedule",
-            "description": "Get detailed care schedule for all plants including watering and fertilizing with current date context.",
-            "parameters": {
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "add_to_wishlist",
-            "description": "Add a plant to the user's wishlist for future purchase or acquisition.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "name": {"type": "string", "description": "Name of the plant to add to wishlist"},
-                    "notes": {"type": "string", "description": "Notes about why they want this plant or where to get it"}
-                },
-                "required": ["name"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "remove_from_wishlist",
-            "description": "Remove a plant from the user's wishlist by ID or name.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "wishlist_id": {"type": "integer", "description": "ID of the wishlist item to remove"},
-                    "name": {"type": "string", "description": "Name of the plant to remove from wishlist"}
-                },
-                "required": []
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "mark_plant_dead",
-            "description": "Mark a plant as dead and automatically remove all its care schedules.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "plant_id": {"type": "integer", "description": "ID of the plant that has died"}
-                },
-                "required": ["plant_id"]
-            }
-        }
-    }
-]
+def get_plants_context_versioned():
+    """(data version, context) for the current data; the context is shared, do not mutate"""
+    path = current_db_path()
+    version = get_data_version()
+    with _context_cache_lock:
+        cached = _context_cache.get(path)
+        if cached is not None and cached[0] == version:
+            _context_cache_stats["hits"] += 1
+            return cached
+        _context_cache_stats["misses"] += 1
+    
+    version, context = _load_plants_context()
+    with _context_cache_lock:
+        cached = _context_cache.get(path)
+        if cached is None or version >= cached[0]:
+            _context_cache[path] = (version, context)
+    return version, context
+
+@observe(type="tool")
+def get_plants_context():
+    """Get all plants, schedules, and wishlist for context (shared, do not mutate)"""
+    return get_plants_context_versioned()[1]
+
+def clear_context_cache():
+    """Forget the cached context, e.g. after switching database files"""
+    with _context_cache_lock:
+        _context_cache.clear()
+
+def context_cache_stats():
+    with _context_cache_lock:
+        stats = dict(_context_cache_stats)
+        cached = _context_cache.get(current_db_path())
+        stats["version"] = cached[0] if cached else None
+    return stats
+
+TOOLS = registry.schemas()
+
+def validate_tool_arguments(tool_name, arguments):
+    """Coerce a tool call's arguments (dict or JSON string) to its schema; raises ToolArgumentError"""
+    return registry.get(tool_name).prepare(arguments)
+
+def run_tool(tool_name, arguments):
+    """Run a tool with arguments already returned by validate_tool_arguments"""
+    return registry.get(tool_name).run(arguments)
 
 def execute_tool(tool_name, arguments):
     """Execute a tool by name with given arguments"""
-    if tool_name == "add_plant":
-        return add_plant_tool(**arguments)
-    elif tool_name == "update_care_schedule":
-        return update_care_schedule_tool(**arguments)
-    elif tool_name == "get_care_schedule":
-        return get_care_schedule_tool()
-    elif tool_name == "add_to_wishlist":
-        return add_to_wishlist_tool(**arguments)
-    elif tool_name == "remove_from_wishlist":
-        return remove_from_wishlist_tool(**arguments)
-    elif tool_name == "mark_plant_dead":
-        return mark_plant_dead_tool(**arguments)
-    else:
-        return {"error": "Unknown tool"}
\ No newline at end of file
+    try:
+        arguments = validate_tool_arguments(tool_name, arguments)
+    except ToolArgumentError as e:
+        return {"error": f"Invalid arguments: {e}"}
+    return run_tool(tool_name, arguments)
+
+def tool_stats():
+    """Per-tool call counts, latency and error rates"""
+    return registry.stats()
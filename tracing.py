@@ -0,0 +1,218 @@
+"""Function tracing with a pluggable backend and head sampling
+
+`@observe(type=...)` marks tools and model calls. What happens to a call
+depends on SAGE_TRACE_BACKEND:
+
+- `none`: the function is called directly (the default outside evaluation)
+- `ring`: spans are kept in memory, newest last; see /api/traces/stats
+- `jsonl`: spans are appended to SAGE_TRACE_FILE, one JSON object per line
+- `deepeval`: calls go through deepeval's @observe (the default when
+  DEEPEVAL_EVAL_MODE=true); deepeval is only imported for this backend
+
+Whether a trace is recorded is decided once, when its outermost span starts
+(SAGE_TRACE_SAMPLE_RATE); spans inside it follow that decision.
+"""
+import os
+import json
+import time
+import random
+import inspect
+import functools
+import threading
+import contextvars
+from collections import deque
+
+EVAL_MODE = os.getenv("DEEPEVAL_EVAL_MODE", "false").lower() == "true"
+TRACE_BACKEND = os.getenv("SAGE_TRACE_BACKEND", "deepeval" if EVAL_MODE else "none").lower()
+TRACE_SAMPLE_RATE = float(os.getenv("SAGE_TRACE_SAMPLE_RATE", "1.0"))
+TRACE_FILE = os.getenv("SAGE_TRACE_FILE", "traces.jsonl")
+TRACE_RING_SIZE = int(os.getenv("SAGE_TRACE_RING_SIZE", "1000"))
+
+# Spans returned by tracing_stats() for the ring backend
+RECENT_SPANS = 50
+
+# (trace id, span id, sampled) of the innermost open span
+_current = contextvars.ContextVar("sage_span", default=None)
+
+class RingBackend:
+    name = "ring"
+
+    def __init__(self, size=TRACE_RING_SIZE):
+        self.spans = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def recent(self, limit=RECENT_SPANS):
+        with self._lock:
+            return list(self.spans)[-limit:]
+
+    def close(self):
+        pass
+
+class JsonlBackend:
+    name = "jsonl"
+
+    def __init__(self, path=TRACE_FILE):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def record(self, span):
+        line = json.dumps(span, default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+            self._file.write(line)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+class DeepEvalBackend:
+    """Sampled calls run through deepeval's @observe, which records them itself"""
+    name = "deepeval"
+
+    def wrap(self, func, span_type, metrics):
+        from deepeval.tracing import observe as deepeval_observe
+        metrics = metrics() if callable(metrics) else metrics
+        if metrics:
+            return deepeval_observe(type=span_type, metrics=metrics)(func)
+        return deepeval_observe(type=span_type)(func)
+
+    def record(self, span):
+        pass
+
+    def close(self):
+        pass
+
+BACKENDS = {"ring": RingBackend, "jsonl": JsonlBackend, "deepeval": DeepEvalBackend}
+
+class Tracer:
+    def __init__(self, backend=TRACE_BACKEND, sample_rate=TRACE_SAMPLE_RATE):
+        if backend not in BACKENDS and backend != "none":
+            raise ValueError(f"Unknown trace backend: {backend}")
+        self.backend = BACKENDS[backend]() if backend in BACKENDS else None
+        self.sample_rate = sample_rate
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self._stats = {"traces": 0, "sampled_traces": 0, "spans": 0, "errors": 0}
+
+    def sample(self):
+        sampled = self._random.random() < self.sample_rate
+        with self._lock:
+            self._stats["traces"] += 1
+            self._stats["sampled_traces"] += sampled
+        return sampled
+
+    def record(self, span):
+        with self._lock:
+            self._stats["spans"] += 1
+            self._stats["errors"] += "error" in span
+        self.backend.record(span)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update(backend=self.backend.name if self.backend else "none", sample_rate=self.sample_rate)
+        if isinstance(self.backend, RingBackend):
+            stats["recent"] = self.backend.recent()
+        return stats
+
+_tracer = Tracer()
+
+def set_backend(backend, sample_rate=None):
+    """Switch backends at runtime, e.g. `ring` in a debugging session"""
+    global _tracer
+    old = _tracer
+    _tracer = Tracer(backend, old.sample_rate if sample_rate is None else sample_rate)
+    if old.backend is not None:
+        old.backend.close()
+
+def tracing_stats():
+    return _tracer.stats()
+
+def _new_id():
+    return f"{random.getrandbits(64):016x}"
+
+def _begin(tracer, name, span_type):
+    """Open a span under the current one; returns (token, span), span None when not sampled"""
+    parent = _current.get()
+    if parent is None:
+        trace_id, parent_id, sampled = _new_id(), None, tracer.sample()
+    else:
+        trace_id, parent_id, sampled = parent
+    span_id = _new_id()
+    token = _current.set((trace_id, span_id, sampled))
+    if not sampled:
+        return token, None
+    return token, {"trace_id": trace_id, "span_id": span_id, "parent_id": parent_id, "name": name,
+                   "type": span_type, "start": time.time(), "_started": time.perf_counter()}
+
+def _end(tracer, token, span, error=None):
+    _current.reset(token)
+    if span is None:
+        return
+    span["duration_ms"] = round((time.perf_counter() - span.pop("_started")) * 1000, 3)
+    if error is not None:
+        span["error"] = f"{type(error).__name__}: {error}"
+    tracer.record(span)
+
+def observe(type="span", name=None, metrics=None):
+    """Trace calls to the decorated function or coroutine function
+
+    `metrics` (a list, or a callable returning one) is passed to deepeval's
+    @observe by the deepeval backend and ignored by the others.
+    """
+    span_type = type
+
+    def decorator(func):
+        span_name = name or func.__name__
+        # Tracer -> function wrapped for it; built on first use so deepeval loads lazily
+        targets = {}
+
+        def target_for(tracer):
+            target = targets.get(tracer)
+            if target is None:
+                backend = tracer.backend
+                target = backend.wrap(func, span_type, metrics) if isinstance(backend, DeepEvalBackend) else func
+                targets.clear()
+                targets[tracer] = target
+            return target
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                tracer = _tracer
+                if tracer.backend is None:
+                    return await func(*args, **kwargs)
+                token, span = _begin(tracer, span_name, span_type)
+                try:
+                    result = await (target_for(tracer) if span is not None else func)(*args, **kwargs)
+                except BaseException as e:
+                    _end(tracer, token, span, e)
+                    raise
+                _end(tracer, token, span)
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer.backend is None:
+                return func(*args, **kwargs)
+            token, span = _begin(tracer, span_name, span_type)
+            try:
+                result = (target_for(tracer) if span is not None else func)(*args, **kwargs)
+            except BaseException as e:
+                _end(tracer, token, span, e)
+                raise
+            _end(tracer, token, span)
+            return result
+        return wrapper
+
+    return decorator